@@ -93,6 +93,19 @@ def get_db_url() -> str:
     raise RuntimeError("無法解析資料庫 URL，請使用 -x db_url= 或設定環境變數。")
 
 
+# --------------------------------------------------
+# 4.1 比對過濾：限定方言的索引（Index.ddl_if(dialect=...)）在其他方言下略過，
+#     避免 SQLite autogenerate 把 Postgres 專用索引（如 pg_trgm GIN）當成差異
+# --------------------------------------------------
+def make_include_object(dialect_name: str):
+    def include_object(obj, name, type_, reflected, compare_to):
+        ddl_if = getattr(obj, "_ddl_if", None)
+        if type_ == "index" and ddl_if is not None and ddl_if.dialect:
+            return ddl_if.dialect == dialect_name
+        return True
+    return include_object
+
+
 # --------------------------------------------------
 # 5. 離線模式（產出 SQL 而不實際連線）
 # --------------------------------------------------
@@ -101,6 +114,7 @@ def run_migrations_offline():
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=make_include_object(url.split(":", 1)[0].split("+", 1)[0]),
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
@@ -126,6 +140,7 @@ def run_migrations_online():
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
+            include_object=make_include_object(connection.dialect.name),
             compare_type=True,
             compare_server_default=True,
         )
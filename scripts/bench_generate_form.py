@@ -0,0 +1,137 @@
+# scripts/bench_generate_form.py
+"""
+比較 generate_final_form 的兩種 Excel 產生方式：
+  legacy    : 一般 Workbook + BytesIO + getvalue() 再寫檔（原本做法）
+  streaming : write_only Workbook + yield_per 查詢，直接寫入儲存路徑（目前做法）
+
+每種模式在獨立子行程執行，以 ru_maxrss 取得尖峰 RSS，避免互相影響。
+使用：
+  python scripts/bench_generate_form.py --rows 50000
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def seed(db_url: str, rows: int) -> int:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from src.core.bulk_insert import bulk_insert_rows
+    from src.db import Base
+    from src.models import BudgetItem, TempStandardFile, TempStandardItem
+
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        ids = bulk_insert_rows(
+            db,
+            BudgetItem,
+            ({"budget_id": "BENCH", "name": f"品項{i}", "type": "material"} for i in range(rows)),
+        )["id_ranges"]
+        first = ids[0][0]
+        tfile = TempStandardFile(budget_id="BENCH")
+        db.add(tfile)
+        db.flush()
+        bulk_insert_rows(
+            db,
+            TempStandardItem,
+            (
+                {
+                    "temp_file_id": tfile.temp_file_id,
+                    "budget_item_id": first + i,
+                    "item_name": f"品項{i}",
+                    "item_type": "material",
+                    "inspection_items": ["外觀", "尺寸", "材質證明"],
+                    "inspection_methods": ["目視", "量測"],
+                    "acceptance_criteria": ["符合 CNS 規範", "尺寸公差±2%"],
+                    "frequency": "每批",
+                    "responsible_party": "監造",
+                    "notes": "備註" * 10,
+                }
+                for i in range(rows)
+            ),
+        )
+        db.commit()
+        return tfile.temp_file_id
+
+
+def run_mode(mode: str, db_url: str, temp_file_id: int, out_dir: str) -> dict:
+    from openpyxl import Workbook
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from src.models import TempStandardItem
+    from src.services.form_generation import FORM_HEADERS, _form_row, write_form_xlsx
+
+    engine = create_engine(db_url)
+    path = Path(out_dir) / f"{mode}.xlsx"
+    start = time.perf_counter()
+    with Session(engine) as db:
+        if mode == "legacy":
+            items = db.query(TempStandardItem).filter_by(temp_file_id=temp_file_id).all()
+            wb = Workbook()
+            ws = wb.active
+            ws.title = "品質管理標準"
+            ws.append(FORM_HEADERS)
+            for it in items:
+                ws.append(_form_row(it))
+            bio = io.BytesIO()
+            wb.save(bio)
+            excel_bytes = bio.getvalue()
+            with open(path, "wb") as f:
+                f.write(excel_bytes)
+        else:
+            write_form_xlsx(db, temp_file_id, path)
+    elapsed = time.perf_counter() - start
+    # Linux: ru_maxrss 單位為 KB
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "mode": mode,
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "file_mb": round(os.path.getsize(path) / 1024 / 1024, 2),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark form Excel generation.")
+    p.add_argument("--rows", type=int, default=20000)
+    p.add_argument("--child", choices=["legacy", "streaming"], help=argparse.SUPPRESS)
+    p.add_argument("--db-url", help=argparse.SUPPRESS)
+    p.add_argument("--temp-file-id", type=int, help=argparse.SUPPRESS)
+    p.add_argument("--out-dir", help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, args.db_url, args.temp_file_id, args.out_dir)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = f"sqlite:///{tmp}/bench.sqlite"
+        temp_file_id = seed(db_url, args.rows)
+        print(f"rows={args.rows}")
+        for mode in ("legacy", "streaming"):
+            out = subprocess.check_output([
+                sys.executable, __file__, "--child", mode,
+                "--db-url", db_url, "--temp-file-id", str(temp_file_id), "--out-dir", tmp,
+            ])
+            r = json.loads(out)
+            print(f"{r['mode']:<10} time={r['seconds']:>7}s  peak_rss={r['peak_rss_mb']:>7} MB  file={r['file_mb']} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# scripts/bench_sqlite_concurrent_import.py
+"""
+比較 SQLite 並行匯入（budget_parser.import_complex_budget）在兩種設定下的吞吐量與失敗數：
+  baseline : 僅 check_same_thread=False（rollback journal、無寫入佇列；原本做法）
+  tuned    : WAL + synchronous=NORMAL 等 PRAGMA + 單一寫入者佇列（SQLITE_PRAGMAS / SQLITE_WRITE_QUEUE）
+
+每種模式在獨立子行程、全新的資料庫檔執行（設定以環境變數傳入），--workers 個執行緒同時匯入。
+使用：
+  python scripts/bench_sqlite_concurrent_import.py --workers 8 --imports 16 --rows 5000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+MODES = {
+    "baseline": {"SQLITE_PRAGMAS": "false", "SQLITE_WRITE_QUEUE": "false"},
+    "tuned": {"SQLITE_PRAGMAS": "true", "SQLITE_WRITE_QUEUE": "true"},
+}
+
+
+def make_csv(rows: int) -> bytes:
+    lines = ["項 次,項目及說明,單位,數量,單價,複價,編碼"]
+    for i in range(rows):
+        lines.append(f"{i + 1},電纜{i},M,{i % 50 + 1},100,{(i % 50 + 1) * 100},#C{i:06d}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def run_child(imports: int, workers: int, rows: int) -> dict:
+    from sqlalchemy.exc import OperationalError
+
+    import src.db as db_module
+    from src.db import Base
+    from src.services import budget_parser
+
+    Base.metadata.create_all(db_module.get_engine())
+    data = make_csv(rows)
+
+    def one(i: int) -> str:
+        with db_module.SessionLocal() as db:
+            try:
+                budget_parser.import_complex_budget(db, data, f"b{i}.csv", f"BENCH-{i}")
+                return "ok"
+            except OperationalError as e:
+                db.rollback()
+                return "locked" if "locked" in str(e) else "error"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        outcomes = list(ex.map(one, range(imports)))
+    elapsed = time.perf_counter() - start
+    ok = outcomes.count("ok")
+    return {
+        "seconds": round(elapsed, 3),
+        "ok": ok,
+        "locked": outcomes.count("locked"),
+        "error": outcomes.count("error"),
+        "rows_per_sec": round(ok * rows / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark concurrent SQLite imports.")
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--imports", type=int, default=16)
+    p.add_argument("--rows", type=int, default=5000)
+    p.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.imports, args.workers, args.rows)))
+        return
+
+    print(f"workers={args.workers} imports={args.imports} rows/import={args.rows}")
+    for mode, env_overrides in MODES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                **os.environ,
+                **env_overrides,
+                "DATABASE_URL": f"sqlite:///{tmp}/bench.sqlite",
+                "FILE_STORAGE_ROOT": f"{tmp}/files",
+                "PARSE_CACHE_DIR": "",  # 每次都實際解析
+            }
+            env.pop("TEST_DATABASE_URL", None)
+            out = subprocess.check_output([
+                sys.executable, __file__, "--child",
+                "--workers", str(args.workers), "--imports", str(args.imports), "--rows", str(args.rows),
+            ], env=env)
+            r = json.loads(out.splitlines()[-1])
+            print(
+                f"{mode:<9} time={r['seconds']:>7}s  ok={r['ok']:>3}  locked={r['locked']:>3}  "
+                f"error={r['error']:>3}  rows/s={r['rows_per_sec']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# scripts/load_test_db_pool.py
+"""
+連線池壓力測試：在 N 個並行請求下量測吞吐量、延遲與連線池等待時間。
+
+兩種模式：
+  engine : 本行程內以執行緒模擬請求（checkout → SELECT 1 → 持有連線 --hold-ms → 歸還），
+           可依 --profile 比較 pool profile（dev / test / prod）與個別參數
+  http   : 對執行中的服務送出 GET（預設 /debug/db_ping），結束後讀取 /debug/db_pool
+
+使用：
+  python scripts/load_test_db_pool.py --url postgresql+psycopg2://... --concurrency 1,8,32,64 --profile dev,prod
+  python scripts/load_test_db_pool.py --mode http --base-url http://127.0.0.1:8000 --concurrency 8,32
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def _run(concurrency: int, requests: int, call) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            call()
+        except Exception:  # noqa: BLE001
+            with lock:
+                errors += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        list(ex.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.5) * 1000, 2),
+            "p95": round(_percentile(latencies, 0.95) * 1000, 2),
+            "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        },
+    }
+
+
+def run_engine(args) -> list[dict]:
+    from sqlalchemy import create_engine, text
+
+    from src.core.db_pool import InstrumentedQueuePool, POOL_PROFILES, instrument_pool, pool_status
+
+    results = []
+    for profile in args.profile.split(","):
+        options = dict(POOL_PROFILES[profile])
+        for key in ("pool_size", "max_overflow", "pool_timeout"):
+            if getattr(args, key) is not None:
+                options[key] = getattr(args, key)
+        kwargs = {"poolclass": InstrumentedQueuePool, **options}
+        if args.url.startswith("sqlite"):
+            kwargs["connect_args"] = {"check_same_thread": False}
+
+        for concurrency in args.concurrency:
+            engine = create_engine(args.url, **kwargs)
+            instrument_pool(engine.pool)
+
+            def call():
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1")).scalar()
+                    if args.hold_ms:
+                        time.sleep(args.hold_ms / 1000)  # 模擬請求持有連線的時間
+
+            r = _run(concurrency, args.requests, call)
+            st = pool_status(engine)
+            r.update({
+                "profile": profile,
+                "pool_wait_ms": st["wait_ms"],
+                "overflow_peak": st["overflow_peak"],
+                "timeouts": st["timeouts"],
+                "connects": st["connects"],
+            })
+            engine.dispose()
+            results.append(r)
+    return results
+
+
+def run_http(args) -> list[dict]:
+    base = args.base_url.rstrip("/")
+
+    def call():
+        with urllib.request.urlopen(base + args.path, timeout=30) as resp:
+            resp.read()
+
+    results = []
+    for concurrency in args.concurrency:
+        r = _run(concurrency, args.requests, call)
+        with urllib.request.urlopen(base + "/debug/db_pool", timeout=30) as resp:
+            r["db_pool"] = json.loads(resp.read())  # 服務端累計值
+        results.append(r)
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mode", choices=("engine", "http"), default="engine")
+    ap.add_argument("--url", default="sqlite:///./load_test.sqlite", help="engine 模式的資料庫 URL")
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000", help="http 模式的服務位址")
+    ap.add_argument("--path", default="/debug/db_ping")
+    ap.add_argument("--concurrency", type=lambda s: [int(x) for x in s.split(",")], default=[1, 8, 32])
+    ap.add_argument("--requests", type=int, default=2000, help="每個並行度的請求數")
+    ap.add_argument("--hold-ms", type=float, default=5.0)
+    ap.add_argument("--profile", default="dev,prod", help="engine 模式要比較的 pool profile（逗號分隔）")
+    ap.add_argument("--pool-size", dest="pool_size", type=int)
+    ap.add_argument("--max-overflow", dest="max_overflow", type=int)
+    ap.add_argument("--pool-timeout", dest="pool_timeout", type=float)
+    args = ap.parse_args()
+
+    results = run_engine(args) if args.mode == "engine" else run_http(args)
+    for r in results:
+        print(json.dumps(r, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 # src/api/routes/specs.py
 from fastapi import APIRouter, UploadFile, Form, Depends
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from ...db import get_db
+from ...core.file_storage import save_stream
 from ...services import ingestion
 
 router = APIRouter()
@@ -16,8 +18,9 @@ async def import_specs(
         return {"status": False, "message": "file required"}
     ext = file.filename.lower().rsplit(".", 1)[-1]
     ft = "pdf" if ext == "pdf" else ("docx" if ext == "docx" else "txt")
-    data = await file.read()
-    return ingestion.import_technical_specs(db, data, ft, spec_id)
+    # 分塊串流存檔 → 以檔案 handle 在 threadpool 解析，不阻塞 event loop
+    r = await save_stream(file, file.filename, "spec/raw", db=db)
+    return await run_in_threadpool(ingestion.import_stored_specs, db, r["file_id"], ft, spec_id)
 
 @router.get("/{spec_id}/parsed")
 def get_spec_parsed(spec_id: str, db: Session = Depends(get_db)):
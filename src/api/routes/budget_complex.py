@@ -1,19 +1,52 @@
 # src/api/routes/budget_complex.py
-from fastapi import APIRouter, UploadFile, Form, Depends
+from fastapi import APIRouter, UploadFile, Form, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ...db import get_db
+from ...db import get_async_read_db, get_db
+from ...core.file_storage import save_stream
 from ...services import budget_parser
 
 
 router = APIRouter() # tags=["budget_complex"]  # 可在 main.py 掛載時指定 tags
+# 查詢路由另立 router：main.py 另有不帶 prefix 的 router 掛載（舊路徑），避免 /{budget_id}/items 出現在根路徑
+items_router = APIRouter()
 
 @router.post("/import")
 async def import_complex_budget(
     budget_id: str = Form(...),
     file: UploadFile = None,
+    # 重新匯入同一 budget_id 時只寫入差異（保留未變動項目的 item_id）
+    incremental: bool = Form(False),
     db: Session = Depends(get_db)
 ):
     if not file:
         return {"status": False, "message": "file_required"}
-    data = await file.read()
-    return budget_parser.import_complex_budget(db, data, file.filename, budget_id)
+    # 分塊串流存檔 → 以檔案 handle 在 threadpool 解析，不阻塞 event loop
+    r = await save_stream(file, file.filename, "budget/raw", db=db)
+    return await run_in_threadpool(
+        budget_parser.import_stored_budget, db, r["file_id"], file.filename, budget_id,
+        incremental=incremental,
+    )
+
+@items_router.get("/{budget_id}/items")
+async def list_items(
+    budget_id: str,
+    hierarchy_code: str | None = None,
+    hierarchy_prefix: str | None = None,
+    source_file_id: int | None = None,
+    is_equipment: bool | None = None,
+    after_item_id: int | None = None,
+    limit: int | None = Query(None, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    filters = {
+        "hierarchy_code": hierarchy_code,
+        "hierarchy_prefix": hierarchy_prefix,
+        "source_file_id": source_file_id,
+        "is_equipment": is_equipment,
+    }
+    return await db.run_sync(
+        budget_parser.list_budget_items, budget_id,
+        metadata_filters=filters, after_item_id=after_item_id, limit=limit,
+    )
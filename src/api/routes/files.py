@@ -0,0 +1,107 @@
+# src/api/routes/files.py
+"""
+檔案下載：GeneratedForm.file_id、BudgetItem.source_file_id 等皆可由此取得。
+- 完整下載走 FileResponse（伺服器支援時使用 sendfile / pathsend，不經 Python 記憶體）
+- 支援單一區間的 HTTP Range（206 / 416）與 If-Range
+- ETag 取自內容雜湊，支援 If-None-Match → 304
+- 內容去重後多筆上傳共用同一檔案：?filename= 可指定下載檔名（如 BudgetItem.metadata.source_file_original_name）
+"""
+import mimetypes
+import os
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy.orm import Session
+
+from ...core.file_storage import get_stored_file, iter_file_range
+from ...db import get_db
+
+router = APIRouter()  # 可在 main.py 掛載時指定 prefix="/files", tags=["files"]
+
+
+def _etag(sf, stat: os.stat_result) -> str:
+    if sf.sha256:
+        return f'"{sf.sha256}"'
+    # 舊資料尚無雜湊：以大小 + 修改時間產生弱 ETag
+    return f'W/"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    解析 "bytes=start-end" / "bytes=start-" / "bytes=-suffix"。
+    - 回傳 (start, end)；格式不支援（含多重區間）時回傳 None，改回完整內容
+    - 區間無法滿足時丟出 ValueError（→ 416）
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first or last) or not (first + last).isdigit():
+        return None
+    if first == "":
+        # 後綴區間：最後 N bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError("range not satisfiable")
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+@router.get("/{file_id}")
+def download_file(
+    file_id: int,
+    request: Request,
+    filename: str | None = None,
+    db: Session = Depends(get_db),
+):
+    sf = get_stored_file(file_id, db)
+    if sf is None:
+        raise HTTPException(status_code=404, detail="file not found")
+
+    path = sf.stored_path
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = _etag(sf, stat)
+    # 只取檔名部分，避免路徑字元進入標頭
+    name = os.path.basename((filename or "").replace("\\", "/")) or sf.original_name
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": _content_disposition(name),
+    }
+
+    inm = request.headers.get("if-none-match")
+    if inm and etag in {t.strip() for t in inm.split(",")}:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            rng = _parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if rng is not None:
+            start, end = rng
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                iter_file_range(path, start, end),
+                status_code=206,
+                media_type=media_type,
+                headers=headers,
+            )
+
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
@@ -1,14 +1,23 @@
 # src/api/routes/form.py
-from fastapi import APIRouter, Depends, Form
+from typing import Literal
+from fastapi import APIRouter, Depends, Form, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ...db import get_db
+from ...db import get_async_read_db, get_db, get_read_db
 from ...services import form_generation
 
 router = APIRouter()
 
+# 讀取為主的路由走 AsyncSession：不佔用 threadpool；同步服務函式以 run_sync 在同一連線上執行
+# 唯讀路由使用 read 依賴：有設定 DATABASE_READ_URLS 時查詢分派到唯讀副本
 @router.get("/identify/{budget_id}")
-def identify(budget_id: str, db: Session = Depends(get_db)):
-    return form_generation.identify_management_items(db, budget_id)
+async def identify(budget_id: str, db: AsyncSession = Depends(get_async_read_db)):
+    return await db.run_sync(form_generation.identify_management_items, budget_id)
+
+@router.get("/standards/search")
+def search_standards(item_type: str, item_name: str, fuzzy: bool = True, db: Session = Depends(get_read_db)):
+    return form_generation.search_quality_standards(db, item_type, item_name, fuzzy)
 
 @router.post("/temp/create")
 def create_temp(
@@ -18,9 +27,42 @@ def create_temp(
 ):
     return form_generation.create_temp_standards(db, budget_id, spec_id)
 
+async def _stream_and_close(lines, db: AsyncSession):
+    # StreamingResponse 在依賴結束後才迭代，session 由串流本身負責關閉
+    try:
+        async for line in lines:
+            yield line
+    finally:
+        await db.close()
+
 @router.get("/temp/{temp_file_id}")
-def get_temp(temp_file_id: int, db: Session = Depends(get_db)):
-    return form_generation.get_temp_standards(db, temp_file_id)
+async def get_temp(
+    temp_file_id: int,
+    after_temp_item_id: int | None = None,
+    limit: int | None = Query(None, ge=1, le=5000),
+    format: Literal["json", "ndjson"] = "json",
+    # 依對應預算項目的 metadata 篩選
+    hierarchy_code: str | None = None,
+    hierarchy_prefix: str | None = None,
+    source_file_id: int | None = None,
+    is_equipment: bool | None = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    filters = {
+        "hierarchy_code": hierarchy_code,
+        "hierarchy_prefix": hierarchy_prefix,
+        "source_file_id": source_file_id,
+        "is_equipment": is_equipment,
+    }
+    if format == "ndjson":
+        lines = form_generation.aiter_temp_standards_ndjson(
+            db, temp_file_id, after_temp_item_id=after_temp_item_id, metadata_filters=filters
+        )
+        return StreamingResponse(_stream_and_close(lines, db), media_type="application/x-ndjson")
+    return await db.run_sync(
+        form_generation.get_temp_standards, temp_file_id,
+        after_temp_item_id=after_temp_item_id, limit=limit, metadata_filters=filters,
+    )
 
 @router.post("/temp/item/update")
 def update_temp_item(
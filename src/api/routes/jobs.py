@@ -0,0 +1,63 @@
+# src/api/routes/jobs.py
+from fastapi import APIRouter, UploadFile, Form, Depends
+from sqlalchemy.orm import Session
+from ...db import get_db
+from ...core.file_storage import save_stream
+from ...services import jobs
+
+router = APIRouter()  # 可在 main.py 掛載時指定 prefix="/jobs", tags=["jobs"]
+
+
+@router.post("/budget_complex/import")
+async def submit_budget_import(
+    budget_id: str = Form(...),
+    file: UploadFile = None,
+    incremental: bool = Form(False),
+    db: Session = Depends(get_db)
+):
+    if not file:
+        return {"status": False, "message": "file_required"}
+    r = await save_stream(file, file.filename, "budget/raw", db=db)
+    return jobs.submit_job(db, "budget_complex.import", {
+        "budget_id": budget_id,
+        "file_id": r["file_id"],
+        "filename": file.filename,
+        "incremental": incremental,
+    })
+
+
+@router.post("/specs/import")
+async def submit_specs_import(
+    spec_id: str = Form(...),
+    file: UploadFile = None,
+    db: Session = Depends(get_db)
+):
+    if not file:
+        return {"status": False, "message": "file required"}
+    ext = file.filename.lower().rsplit(".", 1)[-1]
+    ft = "pdf" if ext == "pdf" else ("docx" if ext == "docx" else "txt")
+    r = await save_stream(file, file.filename, "spec/raw", db=db)
+    return jobs.submit_job(db, "specs.import", {
+        "spec_id": spec_id,
+        "file_id": r["file_id"],
+        "file_type": ft,
+    })
+
+
+@router.post("/form/generate")
+def submit_generate_form(
+    temp_file_id: int = Form(...),
+    template_id: int = Form(...),
+    form_name: str = Form(...),
+    db: Session = Depends(get_db)
+):
+    return jobs.submit_job(db, "form.generate", {
+        "temp_file_id": temp_file_id,
+        "template_id": template_id,
+        "form_name": form_name,
+    })
+
+
+@router.get("/{job_id}")
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    return jobs.get_job(db, job_id)
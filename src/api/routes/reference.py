@@ -1,7 +1,10 @@
 # src/api/routes/reference.py
 from fastapi import APIRouter, UploadFile, Form, Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ...db import get_db
+from ...db import get_async_read_db, get_db, get_read_db
+from ...core.file_storage import save_stream
 from ...services import reference_data
 
 router = APIRouter() # 可在 main.py 掛載時指定 prefix="/reference", tags=["reference"]
@@ -13,8 +16,11 @@ async def upload_reference(
     file: UploadFile = None,
     db: Session = Depends(get_db)
 ):
-    data = await file.read()
-    return reference_data.import_reference_data(db, data, file.filename, category, description)
+    r = await save_stream(file, file.filename, "reference/"+category, db=db)
+    return await run_in_threadpool(
+        reference_data.import_reference_data, db, None, file.filename, category, description,
+        file_id=r["file_id"],
+    )
 
 @router.post("/template/upload")
 async def upload_template(
@@ -23,13 +29,21 @@ async def upload_template(
     file: UploadFile = None,
     db: Session = Depends(get_db)
 ):
-    data = await file.read()
-    return reference_data.import_blank_qm_template(db, data, file.filename, template_name, description)
+    r = await save_stream(file, file.filename, "template", db=db)
+    return await run_in_threadpool(
+        reference_data.import_blank_qm_template, db, None, file.filename, template_name, description,
+        file_id=r["file_id"],
+    )
 
 @router.get("/template/list")
-def list_templates(db: Session = Depends(get_db)):
+def list_templates(db: Session = Depends(get_read_db)):
     return reference_data.get_templates(db)
 
 @router.get("/search")
-def search_ref(keyword: str | None = None, category: str | None = None, db: Session = Depends(get_db)):
-    return reference_data.search_reference_data(db, keyword, category)
+async def search_ref(
+    keyword: str | None = None,
+    category: str | None = None,
+    limit: int = 20,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await db.run_sync(reference_data.search_reference_data, keyword, category, limit=limit)
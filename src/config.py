@@ -27,12 +27,70 @@ class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./local.db"
     # 測試專用可選
     TEST_DATABASE_URL: Optional[str] = None
+    # 唯讀副本（逗號分隔）；查詢為主的路由以 round-robin 讀取，寫入一律走主庫
+    DATABASE_READ_URLS: str = ""
+    # 連線池：profile 為 dev / test / prod（空字串依 APP_ENV）；以下各項設定時覆蓋 profile 值
+    DB_POOL_PROFILE: str = ""
+    DB_POOL_SIZE: Optional[int] = None
+    DB_MAX_OVERFLOW: Optional[int] = None
+    DB_POOL_TIMEOUT: Optional[float] = None  # 秒；取得連線的最長等待
+    DB_POOL_RECYCLE: Optional[int] = None    # 秒；-1 表示不汰換
+    DB_POOL_PRE_PING: Optional[bool] = None  # 關閉時建議搭配 DB_POOL_RECYCLE
+    # SQLite 效能模式：每條連線套用下列 PRAGMA（記憶體資料庫略過 journal_mode / mmap_size）
+    SQLITE_PRAGMAS: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # bytes
+    SQLITE_CACHE_SIZE: int = -65536            # 負數為 KiB（64 MiB）
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    # 匯入等寫入服務依序排隊（單一寫入者），避免並行寫入時 "database is locked"
+    SQLITE_WRITE_QUEUE: bool = True
 
     # 檔案/LLM
     FILE_STORAGE_ROOT: str = "./data/files"
-    LLM_PROVIDER: str = "stub"
+    FILE_STORAGE_CHUNK_SIZE: int = 1024 * 1024  # 串流寫入 / 雜湊的 chunk 大小（bytes）
+    LLM_PROVIDER: str = "stub"  # stub / rules（本機規則擷取）/ 其他已註冊的 provider
     LLM_MODEL: str = "gpt-4o-mini"
-    MAX_LLM_TOKENS: int = 2000
+    MAX_LLM_TOKENS: int = 2000  # 每次請求的輸入 token 上限（長文件依此切塊）
+    LLM_MAX_CONCURRENCY: int = 4
+    LLM_REQUESTS_PER_MINUTE: float = 0  # 0 表示不限制
+    LLM_TOKENS_PER_MINUTE: float = 0    # 0 表示不限制
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BACKOFF: float = 0.5      # 秒；第 n 次重試等待約 backoff * 2^n
+    # 回應快取：memory+sqlite / memory / none
+    LLM_CACHE_BACKEND: str = "memory+sqlite"
+    LLM_CACHE_PATH: str = "./data/cache/llm_cache.sqlite3"
+    LLM_CACHE_MAX_ENTRIES: int = 10000         # 記憶體 LRU 筆數上限
+    LLM_CACHE_DISK_MAX_ENTRIES: int = 200000   # SQLite 筆數上限
+    LLM_CACHE_TTL_SECONDS: int = 30 * 86400    # 0 表示不過期
+    # 送往 LLM 前以規則濾掉無規範訊號（規範編號 / 公差 / 試驗 / 應、須）的條文
+    LLM_PREFILTER: bool = False
+
+    # QualityStandard 模糊索引的最長使用時間；本行程的 ORM 寫入會立即失效，此值涵蓋其他行程的寫入
+    STANDARD_INDEX_TTL_SECONDS: int = 300  # 0 表示不過期
+
+    # 匯入：串流解析每累積 N 筆即寫入 DB（控制尖峰記憶體）
+    BUDGET_IMPORT_CHUNK_SIZE: int = 1000
+    # 批次寫入（bulk_insert_rows）預設每批筆數
+    BULK_INSERT_BATCH_SIZE: int = 1000
+
+    # 背景工作：process（CPU-bound 解析，預設）/ thread；僅用本機 DB，不需外部 broker
+    JOB_EXECUTOR: str = "process"
+    JOB_MAX_WORKERS: int = 2
+    # 啟動時將遺留的 running 工作標為 failed、queued 工作重新送出（多個 web 行程時只在一個行程開啟）
+    JOB_RECOVER_ON_STARTUP: bool = True
+
+    # PDF 擷取：頁數 >= PDF_PARALLEL_MIN_PAGES 時依 shard 分派到 process pool；workers=0 表示 CPU 核心數
+    PDF_EXTRACT_WORKERS: int = 0
+    PDF_EXTRACT_SHARD_PAGES: int = 25
+    PDF_PARALLEL_MIN_PAGES: int = 50
+    # 逐頁文字快取（以檔案 SHA-256 為 key）；空字串表示停用
+    PDF_PAGE_CACHE_DIR: str = "./data/cache/pdf_pages"
+    # 解析結果快取（內容雜湊 + 解析器版本 + LLM 模型）；空字串表示停用
+    PARSE_CACHE_DIR: str = "./data/cache/parse"
+    PARSE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    PARSE_CACHE_MAX_AGE_DAYS: int = 30
 
     # 其他可能參數（保留擴充）
     LOG_LEVEL: str = Field("INFO", description="Logging level")
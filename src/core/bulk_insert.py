@@ -0,0 +1,295 @@
+# src/core/bulk_insert.py
+"""
+批次寫入層：取代逐筆 db.add 的 ORM unit-of-work。
+- 一般路徑：ORM-enabled insert() + executemany（SQLAlchemy 2.0 insertmanyvalues），
+  方言支援時以 RETURNING 取回主鍵。
+- Postgres + psycopg2：COPY FROM STDIN 快速路徑，主鍵先由 sequence 預先取號。
+- bulk_upsert_rows：依唯一鍵 upsert；Postgres / SQLite 以多列 INSERT ... ON CONFLICT DO UPDATE
+  每批一次來回，其他方言退回「查既有鍵 → 分批 insert / update」。
+皆在呼叫端 Session 的交易內執行，commit 仍由呼叫端決定。
+"""
+from __future__ import annotations
+
+import io
+import json
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Iterable, Iterator
+
+from sqlalchemy import bindparam, insert, select, text, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+
+
+def _batched(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _id_ranges(ids: list[int]) -> list[list[int]]:
+    """
+    將主鍵清單壓縮為連續區間 [[first, last], ...]。
+    """
+    ranges: list[list[int]] = []
+    for i in sorted(ids):
+        if ranges and i == ranges[-1][1] + 1:
+            ranges[-1][1] = i
+        else:
+            ranges.append([i, i])
+    return ranges
+
+
+def _merge_ranges(ranges: list[list[int]]) -> list[list[int]]:
+    merged: list[list[int]] = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+
+def _use_copy(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "psycopg2"
+
+
+# -----------------------------------------
+# COPY 快速路徑（Postgres / psycopg2）
+# -----------------------------------------
+def _copy_value(v: Any) -> str:
+    if v is None:
+        return r"\N"
+    if isinstance(v, bool):
+        return "t" if v else "f"
+    if isinstance(v, (dict, list)):
+        v = json.dumps(v, ensure_ascii=False)
+    elif isinstance(v, datetime):
+        v = v.isoformat(sep=" ")
+    elif isinstance(v, date):
+        v = v.isoformat()
+    else:
+        v = str(v)
+    return (
+        v.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_line(values: list[Any]) -> str:
+    return "\t".join(_copy_value(v) for v in values) + "\n"
+
+
+def _column_default(column) -> Any:
+    """
+    COPY 不會套用 Python 端 default（如 datetime.utcnow），需自行補上。
+    """
+    default = column.default
+    if default is None:
+        return None
+    if default.is_scalar:
+        return default.arg
+    if default.is_callable:
+        return default.arg(None)
+    return None
+
+
+def _copy_batch(db: Session, model, batch: list[dict]) -> list[int]:
+    mapper = model.__mapper__
+    table = mapper.local_table
+    pk_col = table.primary_key.columns[0]
+
+    # 屬性名稱（如 metadata_json）→ 實際欄位（如 metadata）
+    attr_cols = [(attr.key, attr.columns[0]) for attr in mapper.column_attrs]
+    provided = set().union(*(r.keys() for r in batch))
+
+    conn = db.connection()
+    seq = conn.execute(
+        text("SELECT pg_get_serial_sequence(:t, :c)"),
+        {"t": table.fullname, "c": pk_col.name},
+    ).scalar()
+    ids: list[int] = []
+    if seq and pk_col.key not in provided:
+        ids = list(
+            conn.execute(
+                text("SELECT nextval(CAST(:s AS regclass)) FROM generate_series(1, :n)"),
+                {"s": seq, "n": len(batch)},
+            ).scalars()
+        )
+
+    columns = []
+    for key, col in attr_cols:
+        if col is pk_col:
+            if ids or key in provided:
+                columns.append((key, col))
+            continue
+        if key in provided or col.default is not None:
+            columns.append((key, col))
+
+    buf = io.StringIO()
+    for idx, row in enumerate(batch):
+        values = []
+        for key, col in columns:
+            if col is pk_col and ids:
+                values.append(ids[idx])
+            elif key in row:
+                values.append(row[key])
+            else:
+                values.append(_column_default(col))
+        buf.write(_copy_line(values))
+    buf.seek(0)
+
+    preparer = conn.dialect.identifier_preparer
+    col_sql = ", ".join(preparer.quote(col.name) for _, col in columns)
+    sql = f"COPY {preparer.format_table(table)} ({col_sql}) FROM STDIN"
+    raw = conn.connection.driver_connection
+    with raw.cursor() as cur:
+        cur.copy_expert(sql, buf)
+
+    if not ids and pk_col.key in provided:
+        ids = [r[pk_col.key] for r in batch]
+    return ids
+
+
+# -----------------------------------------
+# insertmanyvalues 路徑
+# -----------------------------------------
+def _insert_batch(db: Session, model, batch: list[dict]) -> list[int]:
+    dialect = db.get_bind().dialect
+    pk_attr = getattr(model, model.__mapper__.primary_key[0].key)
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        stmt = insert(model).returning(pk_attr, sort_by_parameter_order=True)
+        return list(db.execute(stmt, batch).scalars())
+    db.execute(insert(model), batch)
+    return []
+
+
+def bulk_insert_rows(
+    db: Session,
+    model,
+    rows: Iterable[dict],
+    *,
+    batch_size: int | None = None,
+    use_copy: bool = True,
+) -> dict:
+    """
+    批次新增 ORM model 對應的資料列。
+    - rows：以 ORM 屬性名稱為 key 的 dict（可為 generator，依 batch_size 分批消耗）
+    - 回傳：{"inserted": <int>, "id_ranges": [[first, last], ...]}
+      方言不支援 RETURNING 時 id_ranges 為空。
+    """
+    if batch_size is None:
+        batch_size = settings.BULK_INSERT_BATCH_SIZE
+    write = _copy_batch if (use_copy and _use_copy(db)) else _insert_batch
+
+    inserted = 0
+    ranges: list[list[int]] = []
+    for batch in _batched(rows, batch_size):
+        ids = write(db, model, batch)
+        inserted += len(batch)
+        ranges.extend(_id_ranges(ids))
+    return {"inserted": inserted, "id_ranges": _merge_ranges(ranges)}
+
+
+# -----------------------------------------
+# upsert
+# -----------------------------------------
+# 單一多列 INSERT 的綁定參數上限（SQLite 32766、Postgres 65535，取保守值）
+_MAX_PARAMS_PER_STATEMENT = 30000
+
+
+def _dedupe_batch(batch: list[dict], conflict_keys: list[str]) -> list[dict]:
+    # 同一批內重複的鍵：後者覆蓋前者（ON CONFLICT 不允許同一語句更新同列兩次）
+    by_key: dict[tuple, dict] = {}
+    for row in batch:
+        by_key[tuple(row[k] for k in conflict_keys)] = row
+    return list(by_key.values())
+
+
+def _on_conflict_batch(db: Session, model, batch: list[dict], conflict_keys: list[str], update_keys: list[str]) -> None:
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    mapper = model.__mapper__
+    table = mapper.local_table
+    # 屬性名稱（如 metadata_json）→ 實際欄位名稱（如 metadata）
+    col_name = {attr.key: attr.columns[0].name for attr in mapper.column_attrs}
+    keys = sorted(set().union(*(r.keys() for r in batch)))
+    values = [{col_name[k]: r.get(k) for k in keys} for r in batch]
+
+    stmt = dialect_insert(table).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[col_name[k] for k in conflict_keys],
+        set_={col_name[k]: stmt.excluded[col_name[k]] for k in update_keys if k in keys},
+    )
+    db.execute(stmt)
+
+
+def _select_update_batch(db: Session, model, batch: list[dict], conflict_keys: list[str], update_keys: list[str]) -> None:
+    """
+    通用退路：一次查出已存在的鍵，新鍵走 insert executemany，既有鍵走 update executemany。
+    """
+    if len(conflict_keys) != 1:
+        raise ValueError("generic upsert fallback supports a single conflict key")
+    key = conflict_keys[0]
+    key_attr = getattr(model, key)
+    existing = set(
+        db.execute(select(key_attr).where(key_attr.in_([r[key] for r in batch]))).scalars()
+    )
+    new_rows = [r for r in batch if r[key] not in existing]
+    old_rows = [r for r in batch if r[key] in existing]
+    if new_rows:
+        db.execute(insert(model), new_rows)
+    if old_rows:
+        table = model.__mapper__.local_table
+        col = {attr.key: attr.columns[0] for attr in model.__mapper__.column_attrs}
+        cols = [k for k in update_keys if k in old_rows[0]]
+        stmt = (
+            update(table)
+            .where(col[key] == bindparam("_key"))
+            .values({col[k].name: bindparam(f"_v_{k}") for k in cols})
+        )
+        db.execute(stmt, [{"_key": r[key], **{f"_v_{k}": r.get(k) for k in cols}} for r in old_rows])
+
+
+def bulk_upsert_rows(
+    db: Session,
+    model,
+    rows: Iterable[dict],
+    *,
+    conflict_keys: list[str],
+    update_keys: list[str] | None = None,
+    batch_size: int | None = None,
+) -> dict:
+    """
+    依 conflict_keys（須有唯一索引）批次 upsert。
+    - rows：以 ORM 屬性名稱為 key 的 dict（可為 generator）
+    - update_keys：衝突時要更新的屬性；預設為 rows 中除 conflict_keys 與主鍵以外的全部
+    - 回傳：{"upserted": <int>}（跨方言無法可靠區分新增 / 更新筆數）
+    """
+    if batch_size is None:
+        batch_size = settings.BULK_INSERT_BATCH_SIZE
+    dialect = db.get_bind().dialect.name
+    write = _on_conflict_batch if dialect in ("postgresql", "sqlite") else _select_update_batch
+    pk_keys = {c.key for c in model.__mapper__.primary_key}
+
+    upserted = 0
+    for batch in _batched(rows, batch_size):
+        batch = _dedupe_batch(batch, conflict_keys)
+        keys = set().union(*(r.keys() for r in batch))
+        cols = update_keys or sorted(keys - set(conflict_keys) - pk_keys)
+        per_stmt = max(1, _MAX_PARAMS_PER_STATEMENT // max(1, len(keys)))
+        for sub in _batched(batch, per_stmt):
+            write(db, model, sub, conflict_keys, cols)
+        upserted += len(batch)
+    return {"upserted": upserted}
@@ -0,0 +1,181 @@
+# src/core/db_pool.py
+"""
+連線池設定與量測：
+- 依環境的 pool profile（dev / test / prod），個別 DB_POOL_* 設定可覆蓋 profile 值
+- InstrumentedQueuePool / InstrumentedAsyncAdaptedQueuePool（async engine 用）：
+  量測取得連線的等待時間、overflow 使用量與逾時次數
+- instrument_pool()：以 pool events 記錄 connect / checkin / invalidate
+- pool_status()：目前池狀態 + 累計計數（/debug/db_pool）
+prod profile 關閉 pre-ping（每次 checkout 少一次來回），改以 pool_recycle 定期汰換連線。
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter, deque
+
+from sqlalchemy import event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+POOL_PROFILES: dict[str, dict] = {
+    "dev": {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30, "pool_recycle": -1, "pool_pre_ping": True},
+    "test": {"pool_size": 5, "max_overflow": 5, "pool_timeout": 10, "pool_recycle": -1, "pool_pre_ping": True},
+    "prod": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 10, "pool_recycle": 1800, "pool_pre_ping": False},
+}
+_PROFILE_ALIASES = {"ci": "test", "production": "prod", "staging": "prod"}
+
+# 設定名稱 → create_engine 參數
+_SETTING_KEYS = {
+    "DB_POOL_SIZE": "pool_size",
+    "DB_MAX_OVERFLOW": "max_overflow",
+    "DB_POOL_TIMEOUT": "pool_timeout",
+    "DB_POOL_RECYCLE": "pool_recycle",
+    "DB_POOL_PRE_PING": "pool_pre_ping",
+}
+
+
+def resolve_pool_options(settings=None) -> dict:
+    """
+    profile：DB_POOL_PROFILE，未設定時依 APP_ENV；DB_POOL_* 非 None 者覆蓋 profile 值。
+    """
+    name = (getattr(settings, "DB_POOL_PROFILE", "") or getattr(settings, "APP_ENV", "") or "dev").lower()
+    name = _PROFILE_ALIASES.get(name, name)
+    options = dict(POOL_PROFILES.get(name, POOL_PROFILES["dev"]))
+    for key, arg in _SETTING_KEYS.items():
+        value = getattr(settings, key, None)
+        if value is not None:
+            options[arg] = value
+    if not options["pool_pre_ping"] and options["pool_recycle"] < 0:
+        logger.warning("pool_pre_ping is off without pool_recycle; stale connections will surface as errors")
+    return options
+
+
+class PoolMetrics:
+    """
+    執行緒安全的累計計數；等待時間另保留最近 window 筆以計算 p50 / p95。
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+        self._waits: deque[float] = deque(maxlen=window)
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._overflow_peak = 0
+
+    def incr(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def record_checkout(self, wait: float, overflow: int) -> None:
+        with self._lock:
+            self._counts["checkouts"] += 1
+            if overflow > 0:
+                self._counts["overflow_checkouts"] += 1
+            self._overflow_peak = max(self._overflow_peak, overflow)
+            self._waits.append(wait)
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            counts = dict(self._counts)
+            checkouts = counts.get("checkouts", 0)
+            out = {
+                k: counts.get(k, 0)
+                for k in (
+                    "checkouts", "checkins", "connects", "timeouts",
+                    "overflow_checkouts", "invalidations", "soft_invalidations",
+                )
+            }
+            out["overflow_peak"] = self._overflow_peak
+            out["wait_ms"] = {
+                "avg": round(self._wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "max": round(self._wait_max * 1000, 3),
+                "p50": round(waits[len(waits) // 2] * 1000, 3) if waits else 0.0,
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 3) if waits else 0.0,
+            }
+            return out
+
+
+class _InstrumentedPoolMixin:
+    """
+    QueuePool 系列 + 等待時間量測。engine.dispose() 會以 recreate() 重建池，計數沿用同一個 PoolMetrics。
+    """
+
+    def __init__(self, *args, metrics: PoolMetrics | None = None, **kw):
+        self.metrics = metrics or PoolMetrics()
+        super().__init__(*args, **kw)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except sa_exc.TimeoutError:
+            self.metrics.incr("timeouts")
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start, max(0, self.overflow()))
+        return conn
+
+    def recreate(self):
+        new = super().recreate()
+        new.metrics = self.metrics
+        return new
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_pool(pool) -> PoolMetrics:
+    """
+    以 pool events 記錄連線建立 / 歸還 / 失效；非 InstrumentedQueuePool 時只有事件計數。
+    """
+    metrics = getattr(pool, "metrics", None)
+    if metrics is None:
+        metrics = pool.metrics = PoolMetrics()
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_conn, record):
+        metrics.incr("connects")
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_conn, record):
+        metrics.incr("checkins")
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_conn, record, exception):
+        metrics.incr("invalidations")
+
+    @event.listens_for(pool, "soft_invalidate")
+    def _on_soft_invalidate(dbapi_conn, record, exception):
+        metrics.incr("soft_invalidations")
+
+    return metrics
+
+
+def pool_status(engine) -> dict:
+    pool = engine.pool
+    out: dict = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        out.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        out.update(metrics.snapshot())
+    return out
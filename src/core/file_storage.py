@@ -1,43 +1,257 @@
 # src/core/file_storage.py
-import os, uuid
+"""
+內容定址（content-addressed）檔案儲存：
+- 以固定大小 chunk 串流寫入暫存檔，同時計算 SHA-256，整個檔案不需載入記憶體
+- 寫完後以 os.replace 原子性地搬到 <root>/<hash[0:2]>/<hash[2:4]>/<hash><ext>
+- 相同內容只存一份：StoredFile.sha256 唯一，重複上傳僅遞增 ref_count 並回傳既有 file_id
+- 每次 save_* 成功即取得一個參照，由呼叫端在不再引用時 release_file()（歸零時刪除紀錄與實體檔）
+- StoredFile.original_name / mime_type 為第一次上傳的值；各次上傳的檔名記錄在引用端
+  （如 BudgetItem.metadata.source_file_original_name、ReferenceFile.metadata.original_name），
+  下載時以 /files/{id}?filename=... 指定
+"""
+import hashlib
+import io
+import mmap
+import os
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from anyio import to_thread
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
 from ..config import settings
+from .sqlite_perf import queue_writes
 
-def save_file(file_bytes: bytes, filename: str, file_type: str, metadata: dict | None = None, db=None):
+_TMP_DIR = ".tmp"
+_UPSERT_ATTEMPTS = 3
+
+
+def _root() -> Path:
+    return Path(settings.FILE_STORAGE_ROOT)
+
+
+def _blob_path(sha256: str, ext: str) -> Path:
+    # 兩層分片目錄，避免單一目錄檔案過多
+    return _root() / sha256[:2] / sha256[2:4] / f"{sha256}{ext}"
+
+
+def new_storage_path(filename: str) -> Path:
     """
-    保存檔案到檔案系統並記錄到 StoredFile 資料表。
-    - file_type: 建議傳入 MIME 類型或邏輯類型（此版本映射到 mime_type 欄位）
-    - 回傳：{"status": True, "file_id": <int>, "path": <str>}
+    配置一個暫存寫入路徑（位於儲存區內，保留原始擴展名），供呼叫端直接寫入大檔。
+    寫完後呼叫 register_file：依內容雜湊搬到正式位置並建立 / 共用 StoredFile 紀錄。
     """
-    root = Path(settings.FILE_STORAGE_ROOT)
-    root.mkdir(parents=True, exist_ok=True)
-
-    # 用 UUID 作為實際儲存檔名，避免衝突；保留原始擴展名
+    tmp_dir = _root() / _TMP_DIR
+    tmp_dir.mkdir(parents=True, exist_ok=True)
     ext = os.path.splitext(filename)[1]
-    stored_name = f"{uuid.uuid4().hex[:16]}{ext}"
-    path = root / stored_name
+    return tmp_dir / f"{uuid.uuid4().hex}{ext}"
+
+
+def file_sha256(source: str | Path | BinaryIO) -> str:
+    """
+    以 chunk 方式計算檔案（路徑或可 seek 的 file-like）的 SHA-256；file-like 讀完後回到開頭。
+    """
+    h = hashlib.sha256()
+    chunk_size = settings.FILE_STORAGE_CHUNK_SIZE
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            while chunk := f.read(chunk_size):
+                h.update(chunk)
+    else:
+        while chunk := source.read(chunk_size):
+            h.update(chunk)
+        source.seek(0)
+    return h.hexdigest()
+
+
+def _commit_blob(tmp: Path, sha256: str, filename: str, file_type: str, metadata: dict | None, db):
+    """
+    暫存檔已寫完且雜湊已知：去重或搬到正式位置，並記錄到 StoredFile（寫入交易經 SQLite 寫入佇列）。
+    """
+    with queue_writes(db):
+        return _upsert_blob(tmp, sha256, filename, file_type, metadata, db)
+
 
-    with open(path, "wb") as f:
-        f.write(file_bytes)
+def _upsert_blob(tmp: Path, sha256: str, filename: str, file_type: str, metadata: dict | None, db):
+    from ..models import StoredFile
 
-    from .. import models
+    size = os.path.getsize(tmp)
+    # 參照數的增減一律以條件式 UPDATE / DELETE 在資料庫判斷（Postgres 沒有寫入佇列替我們序列化）；
+    # 與 release_file 同時進行時，紀錄可能在查到之後被刪除，此時重新走建立流程
+    for _ in range(_UPSERT_ATTEMPTS):
+        existing = db.query(StoredFile).filter_by(sha256=sha256).populate_existing().first()
+        if existing is None:
+            r = _insert_blob(tmp, sha256, filename, file_type, metadata, size, db)
+            if r is not None:
+                return r
+            continue  # 併發上傳相同內容：另一方已先建立紀錄，改為共用
+        r = _share_blob(existing, tmp, sha256, db)
+        if r is not None:
+            return r
+    raise RuntimeError(f"stored file {sha256} kept changing during upload")
 
-    sf = models.StoredFile(
+
+def _insert_blob(tmp: Path, sha256: str, filename: str, file_type: str, metadata: dict | None, size: int, db):
+    from ..models import StoredFile
+
+    dest = _blob_path(sha256, os.path.splitext(filename)[1])
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if tmp.exists():
+        os.replace(tmp, dest)  # 原子搬移：讀者不會看到寫到一半的檔案
+    sf = StoredFile(
         original_name=filename,
-        stored_path=str(path),
+        stored_path=str(dest),
         mime_type=file_type,          # 對齊模型欄位
-        size_bytes=len(file_bytes),
-        metadata_json=metadata or {}
+        size_bytes=size,
+        sha256=sha256,
+        ref_count=1,
+        metadata_json=metadata or {},
     )
-    db.add(sf)
+    try:
+        # SAVEPOINT：衝突時只回復這筆 insert，不丟棄呼叫端 session 中其他尚未提交的變更
+        with db.begin_nested():
+            db.add(sf)
+    except IntegrityError:
+        return None
     db.commit()
     db.refresh(sf)  # 取得自增主鍵
+    return {"status": True, "file_id": sf.file_id, "path": sf.stored_path,
+            "sha256": sha256, "deduplicated": False}
+
+
+def _share_blob(existing, tmp: Path, sha256: str, db):
+    """
+    共用既有紀錄：原子遞增 ref_count；紀錄已被刪除（rowcount 0）時回傳 None。
+    """
+    from ..models import StoredFile
+
+    path = existing.stored_path
+    restore = not os.path.exists(path) and tmp.exists()
+    if restore:
+        # 紀錄存在但實體檔遺失（或儲存根目錄已搬移）：以本次內容補回
+        path = str(_blob_path(sha256, os.path.splitext(path)[1]))
+    inc = db.execute(
+        update(StoredFile)
+        .where(StoredFile.file_id == existing.file_id)
+        .values(ref_count=StoredFile.ref_count + 1, stored_path=path)
+        .execution_options(synchronize_session="fetch")
+    )
+    if not inc.rowcount:
+        return None  # 暫存檔保留給重新建立流程
+    if restore:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp, path)
+    else:
+        tmp.unlink(missing_ok=True)
+    db.commit()
+    return {"status": True, "file_id": existing.file_id, "path": path,
+            "sha256": sha256, "deduplicated": True}
+
+
+def register_file(path: Path, filename: str, file_type: str, metadata: dict | None = None, db=None):
+    """
+    將 new_storage_path 配置的暫存檔納入儲存區（計算雜湊、去重、原子搬移）。
+    - 回傳：{"status": True, "file_id": <int>, "path": <str>, "sha256": <str>, "deduplicated": <bool>}
+    """
+    return _commit_blob(Path(path), file_sha256(path), filename, file_type, metadata, db)
+
+
+def save_fileobj(fileobj: BinaryIO, filename: str, file_type: str, metadata: dict | None = None, db=None):
+    """
+    由同步 file-like 物件分塊讀取並保存（邊寫邊算 SHA-256）。
+    """
+    tmp = new_storage_path(filename)
+    h = hashlib.sha256()
+    chunk_size = settings.FILE_STORAGE_CHUNK_SIZE
+    try:
+        with open(tmp, "wb") as out:
+            while chunk := fileobj.read(chunk_size):
+                h.update(chunk)
+                out.write(chunk)
+        return _commit_blob(tmp, h.hexdigest(), filename, file_type, metadata, db)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+async def save_stream(source, filename: str, file_type: str, metadata: dict | None = None, db=None):
+    """
+    由非同步來源（如 fastapi.UploadFile，需提供 async read(n)）分塊讀取並保存。
+    磁碟寫入與 DB 提交在 worker thread 執行，不阻塞 event loop。
+    """
+    tmp = new_storage_path(filename)
+    h = hashlib.sha256()
+    chunk_size = settings.FILE_STORAGE_CHUNK_SIZE
+    try:
+        out = await to_thread.run_sync(open, tmp, "wb")
+        try:
+            while chunk := await source.read(chunk_size):
+                h.update(chunk)
+                await to_thread.run_sync(out.write, chunk)
+        finally:
+            out.close()
+        return await to_thread.run_sync(
+            _commit_blob, tmp, h.hexdigest(), filename, file_type, metadata, db
+        )
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def save_file(file_bytes: bytes, filename: str, file_type: str, metadata: dict | None = None, db=None):
+    """
+    保存檔案到檔案系統並記錄到 StoredFile 資料表（相同內容只存一份）。
+    - file_type: 建議傳入 MIME 類型或邏輯類型（此版本映射到 mime_type 欄位）
+    - 回傳：{"status": True, "file_id": <int>, "path": <str>, "sha256": <str>, "deduplicated": <bool>}
+    """
+    return save_fileobj(io.BytesIO(file_bytes), filename, file_type, metadata, db=db)
+
+
+def release_file(file_id: int, db) -> bool:
+    """
+    釋放一次參照；ref_count 歸零時刪除 StoredFile 紀錄與實體檔（Job.stored_file_id 連結一併清除）。
+    回傳：是否已實際刪除
+    """
+    from ..models import Job, StoredFile
+
+    with queue_writes(db):
+        while True:
+            dec = db.execute(
+                update(StoredFile)
+                .where(StoredFile.file_id == file_id, StoredFile.ref_count > 1)
+                .values(ref_count=StoredFile.ref_count - 1)
+                .execution_options(synchronize_session="fetch")
+            )
+            if dec.rowcount:
+                db.commit()
+                return False
+            row = db.execute(
+                select(StoredFile.stored_path, StoredFile.sha256).where(StoredFile.file_id == file_id)
+            ).first()
+            if row is None:
+                return False
+            with db.begin_nested() as sp:
+                db.execute(update(Job).where(Job.stored_file_id == file_id).values(stored_file_id=None))
+                deleted = db.execute(
+                    delete(StoredFile)
+                    .where(StoredFile.file_id == file_id, StoredFile.ref_count <= 1)
+                    .execution_options(synchronize_session="fetch")
+                ).rowcount
+                if not deleted:
+                    sp.rollback()  # 期間被重新上傳而遞增：改為遞減
+            if deleted:
+                break
+        db.commit()
+        # 刪除後若同內容已被重新上傳（新紀錄可能共用同一路徑），保留實體檔
+        if db.execute(select(StoredFile.file_id).where(StoredFile.sha256 == row.sha256)).first() is None:
+            Path(row.stored_path).unlink(missing_ok=True)
+        db.commit()
+    return True
 
-    return {"status": True, "file_id": sf.file_id, "path": str(path)}
 
 def read_file(file_id: int, db):
     """
-    以資料庫主鍵 file_id 讀取檔案。
+    以資料庫主鍵 file_id 讀取檔案（整檔讀入記憶體；大檔請改用 open_mmap 或 /files 下載）。
     回傳：(StoredFile, bytes) 或 None
     """
     from ..models import StoredFile
@@ -49,4 +263,52 @@ def read_file(file_id: int, db):
         return None
     with open(sf.stored_path, "rb") as f:
         data = f.read()
-    return sf, data
\ No newline at end of file
+    return sf, data
+
+
+def get_stored_file(file_id: int, db):
+    """
+    取得 StoredFile 紀錄；紀錄不存在或實體檔遺失時回傳 None。
+    """
+    from ..models import StoredFile
+    sf = db.get(StoredFile, file_id)
+    if sf is None or not os.path.exists(sf.stored_path):
+        return None
+    return sf
+
+
+@contextmanager
+def open_mmap(file_id: int, db) -> Iterator[tuple]:
+    """
+    以唯讀 mmap 開啟儲存檔，供伺服器端解析使用（由 OS page cache 提供資料，不整檔複製到 Python）。
+    用法：
+        with open_mmap(file_id, db) as (sf, buf):
+            header = buf[:1024]
+    檔案不存在時 buf 為 None；空檔案為 b""（mmap 不接受長度 0）。
+    """
+    sf = get_stored_file(file_id, db)
+    if sf is None:
+        yield None, None
+        return
+    with open(sf.stored_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield sf, b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield sf, buf
+
+
+def iter_file_range(path: str, start: int, end: int, chunk_size: int | None = None) -> Iterator[bytes]:
+    """
+    依序讀出 [start, end]（含 end）區間的位元組，每次最多 chunk_size。
+    """
+    chunk_size = chunk_size or settings.FILE_STORAGE_CHUNK_SIZE
+    remaining = end - start + 1
+    with open(path, "rb") as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
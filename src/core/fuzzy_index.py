@@ -0,0 +1,125 @@
+# src/core/fuzzy_index.py
+"""
+行程內模糊比對索引：字元 n-gram 倒排索引 + 候選剪枝 + 有上限的 difflib 重排。
+取代對整個名稱清單做 difflib.get_close_matches（每次查詢 O(N) SequenceMatcher）。
+"""
+from __future__ import annotations
+
+import difflib
+import unicodedata
+from collections import Counter
+from typing import Any
+
+
+def normalize_name(name: str) -> str:
+    """
+    名稱正規化：NFKC（全形→半形）、小寫、移除所有空白。
+    """
+    return "".join(unicodedata.normalize("NFKC", name or "").lower().split())
+
+
+def _ngrams(s: str, n: int) -> set[str]:
+    # 前後補位，讓短名稱（中文品名常為 2~3 字）也有足夠的 gram
+    padded = f"\x02{s}\x03"
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class NgramIndex:
+    """
+    以正規化名稱建立 n-gram 倒排索引。
+    search() 先以共同 gram 數挑出至多 max_candidates 個候選，再以 SequenceMatcher 重排；
+    與原本 difflib 做法相同，名稱包含查詢字串者一律納入（不受 cutoff 限制）。
+    """
+
+    def __init__(self, n: int = 2):
+        self.n = n
+        self._names: list[str] = []
+        self._norms: list[str] = []
+        self._payloads: list[Any] = []
+        self._gram_counts: list[int] = []
+        self._postings: dict[str, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, name: str, payload: Any = None) -> None:
+        idx = len(self._names)
+        norm = normalize_name(name)
+        grams = _ngrams(norm, self.n)
+        self._names.append(name)
+        self._norms.append(norm)
+        self._payloads.append(payload)
+        self._gram_counts.append(len(grams))
+        for g in grams:
+            self._postings.setdefault(g, []).append(idx)
+
+    def _substring_hits(self, norm: str) -> set[int]:
+        # 名稱包含查詢字串 → 必含查詢字串內部的所有 gram（不含補位）
+        inner = {norm[i:i + self.n] for i in range(len(norm) - self.n + 1)}
+        if not inner:
+            # 查詢短於 n，退回線性掃描（僅限單字查詢）
+            return {i for i, d in enumerate(self._norms) if norm in d}
+        postings = sorted((self._postings.get(g, []) for g in inner), key=len)
+        hits = set(postings[0])
+        for p in postings[1:]:
+            hits.intersection_update(p)
+            if not hits:
+                break
+        return {i for i in hits if norm in self._norms[i]}
+
+    def search(
+        self,
+        query: str,
+        *,
+        limit: int = 10,
+        cutoff: float = 0.3,
+        max_candidates: int = 200,
+    ) -> list[dict]:
+        """
+        回傳 [{"name", "score", "payload"}, ...]，依分數由高至低。
+        - limit / cutoff：模糊結果的筆數上限與最低 SequenceMatcher ratio
+        - max_candidates：進入重排的候選上限（以 gram 重疊度排序後截斷）
+        """
+        norm = normalize_name(query)
+        if not norm or not self._names:
+            return []
+
+        qgrams = _ngrams(norm, self.n)
+        overlap: Counter = Counter()
+        for g in qgrams:
+            for idx in self._postings.get(g, ()):
+                overlap[idx] += 1
+
+        # Dice 係數作為剪枝排序依據
+        qn = len(qgrams)
+        ranked = sorted(
+            overlap,
+            key=lambda i: 2 * overlap[i] / (qn + self._gram_counts[i]),
+            reverse=True,
+        )[:max_candidates]
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(norm)
+
+        def score(i: int) -> float:
+            matcher.set_seq1(self._norms[i])
+            return matcher.ratio()
+
+        fuzzy = []
+        for i in ranked:
+            s = score(i)
+            if s >= cutoff:
+                fuzzy.append((s, i))
+        fuzzy.sort(key=lambda t: t[0], reverse=True)
+
+        results: dict[int, float] = {i: s for s, i in fuzzy[:limit]}
+        for i in self._substring_hits(norm):
+            if i not in results:
+                results[i] = score(i)
+
+        return [
+            {"name": self._names[i], "score": round(s, 4), "payload": self._payloads[i]}
+            for i, s in sorted(results.items(), key=lambda t: t[1], reverse=True)
+        ]
@@ -0,0 +1,97 @@
+# src/core/json_types.py
+"""
+JSON 欄位型別與查詢輔助（依資料庫方言）：
+- JSONDocument：一般為 JSON；Postgres 為 JSONB（二進位儲存，讀取不必重新解析，可建 GIN 索引）
+- json_contains(col, {"is_equipment": True})：Postgres 編譯為 col @> '{...}'::jsonb（走 jsonb_path_ops GIN 索引），
+  其他資料庫編譯為逐鍵 JSON_EXTRACT 比對
+- json_text_startswith(col, "hierarchy_code", "1.2")：Postgres 編譯為 (col ->> 'hierarchy_code') LIKE '1.2%'
+  （鍵名以常值輸出，才能對上 text_pattern_ops 運算式索引），其他資料庫為 JSON_EXTRACT LIKE
+"""
+from __future__ import annotations
+
+import re
+
+from sqlalchemy import JSON, Boolean, Text, and_, bindparam, literal_column
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.elements import Grouping
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
+_KEY_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _check_key(key: str) -> str:
+    # 鍵名會以常值寫入 SQL，只允許識別字
+    if not _KEY_RE.match(key):
+        raise ValueError(f"invalid json key: {key!r}")
+    return key
+
+
+class _DialectSwitch(ColumnElement):
+    """
+    依方言選擇兩個預先建好的布林運算式之一；兩者皆參與 cache key，語句快取照常運作。
+    """
+    type = Boolean()
+    inherit_cache = True
+    _is_implicitly_boolean = True  # WHERE 中不再補 "= 1"
+    _traverse_internals = [
+        ("postgresql", InternalTraversal.dp_clauseelement),
+        ("default", InternalTraversal.dp_clauseelement),
+    ]
+
+    def __init__(self, postgresql: ColumnElement, default: ColumnElement):
+        self.postgresql = Grouping(postgresql)
+        self.default = Grouping(default)
+
+
+@compiles(_DialectSwitch)
+def _compile_default(element, compiler, **kw):
+    return compiler.process(element.default, **kw)
+
+
+@compiles(_DialectSwitch, "postgresql")
+def _compile_postgresql(element, compiler, **kw):
+    return compiler.process(element.postgresql, **kw)
+
+
+def _element(column, key: str, value):
+    el = column[_check_key(key)]
+    if isinstance(value, bool):
+        return el.as_boolean() == value
+    if isinstance(value, int):
+        return el.as_integer() == value
+    if isinstance(value, float):
+        return el.as_float() == value
+    return el.as_string() == str(value)
+
+
+def json_contains(column, criteria: dict) -> ColumnElement:
+    """
+    JSON 物件包含 criteria 的所有鍵值（值限 str / int / float / bool）。
+    """
+    if not criteria:
+        raise ValueError("criteria must not be empty")
+    return _DialectSwitch(
+        column.op("@>", is_comparison=True)(bindparam(None, dict(criteria), type_=JSONB)),
+        and_(*(_element(column, k, v) for k, v in criteria.items())),
+    )
+
+
+def json_text(column, key: str) -> ColumnElement:
+    """
+    Postgres 的 column ->> 'key'（鍵名為常值）；運算式索引與查詢須使用同一寫法。
+    """
+    return column.op("->>", return_type=Text)(literal_column(f"'{_check_key(key)}'"))
+
+
+def json_text_startswith(column, key: str, prefix: str) -> ColumnElement:
+    """
+    column[key] 的文字值以 prefix 開頭（% / _ 自動跳脫）。
+    """
+    return _DialectSwitch(
+        json_text(column, key).startswith(prefix, autoescape=True),
+        column[key].as_string().startswith(prefix, autoescape=True),
+    )
@@ -1,22 +1,264 @@
 # src/core/llm.py
+"""
+LLM 用戶端：
+- 依 token 估算切塊（每塊不超過 max_tokens），避免長文件超出 context
+- asyncio 併發送出各塊：Semaphore 限制同時請求數，token bucket 限制每分鐘請求數 / token 數
+- 失敗時指數退避重試，最後依原順序合併各塊的 raw_items
+- provider 以名稱註冊（register_provider）；預設 "stub" 為本機規則，不呼叫外部 API
+- 各塊先查回應快取（llm_cache），命中則不送 provider、也不佔用速率額度
+- "rules" provider 為本機規則擷取（core.spec_rules）：不切塊、不快取、不限速；
+  prefilter=True 時，送往其他 provider 前先以同一套規則濾掉無規範訊號的條文
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable
+
+from .llm_cache import ResponseCache, build_cache, make_key
+from .spec_rules import extract_spec_items, prefilter_text
+
+logger = logging.getLogger(__name__)
+
+# prompt / 輸出格式版本（回應快取 key 的一部分）；修改 prompt 時請遞增
+PROMPT_VERSION = "1"
+
+
+class LLMError(RuntimeError):
+    pass
+
+
+# -----------------------------------------
+# Token 估算與切塊
+# -----------------------------------------
+_CJK_RE = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗估 token 數：CJK 字元約 1 token / 字，其餘約 4 字元 / token。
+    """
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def split_text(text: str, max_tokens: int) -> list[str]:
+    """
+    以行為單位累積，每塊估算不超過 max_tokens；單行過長時再依字元硬切。
+    """
+    chunks: list[str] = []
+    buf: list[str] = []
+    used = 0
+    for line in text.splitlines():
+        n = estimate_tokens(line) + 1  # 換行
+        if n > max_tokens:
+            if buf:
+                chunks.append("\n".join(buf))
+                buf, used = [], 0
+            # 依比例換算字元數硬切
+            step = max(1, len(line) * max_tokens // n)
+            chunks.extend(line[i:i + step] for i in range(0, len(line), step))
+            continue
+        if used + n > max_tokens and buf:
+            chunks.append("\n".join(buf))
+            buf, used = [], 0
+        buf.append(line)
+        used += n
+    if buf:
+        chunks.append("\n".join(buf))
+    return [c for c in chunks if c.strip()]
+
+
+# -----------------------------------------
+# 速率限制
+# -----------------------------------------
+class TokenBucket:
+    """
+    以 rate_per_minute 持續補充、容量 capacity 的 token bucket。
+    以 threading.Lock 保護狀態，可跨多個 event loop / 執行緒共用（每次 parse_text 各自 asyncio.run）。
+    rate_per_minute <= 0 表示不限制。
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(rate_per_minute, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _try_take(self, amount: float) -> float:
+        """
+        成功取用回傳 0，否則回傳需等待的秒數。
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # 單次需求超過容量時，以容量計（否則永遠等不到）
+            amount = min(amount, self.capacity)
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        while (wait := self._try_take(amount)) > 0:
+            await asyncio.sleep(wait)
+
+
+# -----------------------------------------
+# Provider
+# -----------------------------------------
+ProviderFn = Callable[["LLMClient", str, str, dict | None], Awaitable[dict]]
+_PROVIDERS: dict[str, ProviderFn] = {}
+# 本機、確定性的 provider：整份文字一次處理，不經切塊 / 快取 / 速率限制
+_LOCAL_PROVIDERS: set[str] = set()
+
+
+def register_provider(name: str, fn: ProviderFn, *, local: bool = False) -> None:
+    """
+    註冊 provider：async fn(client, text, task_type, context) -> {"raw_items": [...], ...}
+    可重試的錯誤請直接丟出例外。local=True 表示本機規則引擎（不切塊、不快取、不限速）。
+    """
+    _PROVIDERS[name] = fn
+    if local:
+        _LOCAL_PROVIDERS.add(name)
+    else:
+        _LOCAL_PROVIDERS.discard(name)
+
+
+async def _stub_provider(client: "LLMClient", text: str, task_type: str, context: dict | None) -> dict:
+    # Stub: 真實情況呼叫外部 API
+    if task_type == "extract_specs":
+        # 最簡：以行為單位抓關鍵詞 (示例)
+        items = []
+        for l in (l.strip() for l in text.splitlines()):
+            if ":" in l:
+                k, v = l.split(":", 1)
+                items.append({"name": k.strip(), "spec": v.strip()})
+        return {"raw_items": items}
+    return {}
+
+
+register_provider("stub", _stub_provider)
+
+
+async def _rules_provider(client: "LLMClient", text: str, task_type: str, context: dict | None) -> dict:
+    if task_type == "extract_specs":
+        return {"raw_items": extract_spec_items(text)}
+    return {}
+
+
+register_provider("rules", _rules_provider, local=True)
+
+
+# -----------------------------------------
+# Client
+# -----------------------------------------
 class LLMClient:
-    def __init__(self, provider: str, model: str, max_tokens: int):
+    def __init__(
+        self,
+        provider: str,
+        model: str,
+        max_tokens: int,
+        *,
+        max_concurrency: int = 4,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        cache: ResponseCache | None = None,
+        prefilter: bool = False,
+    ):
         self.provider = provider
         self.model = model
         self.max_tokens = max_tokens
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._request_bucket = TokenBucket(requests_per_minute)
+        self._token_bucket = TokenBucket(tokens_per_minute)
+        self.cache = cache
+        self.prefilter = prefilter
 
-    def parse_text(self, text: str, task_type: str, context: dict | None = None) -> dict:
-        # Stub: 真實情況呼叫外部 API
+    def _provider_fn(self) -> ProviderFn:
+        try:
+            return _PROVIDERS[self.provider]
+        except KeyError:
+            raise LLMError(f"unknown LLM provider: {self.provider}") from None
+
+    async def _call_chunk(self, fn: ProviderFn, chunk: str, task_type: str, context: dict | None) -> dict:
+        key = None
+        if self.cache is not None:
+            key = make_key(
+                chunk, task_type=task_type, provider=self.provider, model=self.model,
+                prompt_version=PROMPT_VERSION, context=context,
+            )
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        tokens = estimate_tokens(chunk)
+        for attempt in range(self.max_retries + 1):
+            await self._request_bucket.acquire(1)
+            await self._token_bucket.acquire(tokens)
+            try:
+                result = await fn(self, chunk, task_type, context)
+            except Exception as e:  # noqa: BLE001
+                if attempt >= self.max_retries:
+                    raise LLMError(f"{self.provider} failed after {attempt + 1} attempts: {e}") from e
+                # 指數退避 + jitter，避免同時重試
+                delay = self.retry_backoff * (2 ** attempt) * (0.5 + random.random())
+                logger.warning("LLM chunk failed (attempt %d), retry in %.2fs: %s", attempt + 1, delay, e)
+                await asyncio.sleep(delay)
+                continue
+            if key is not None:
+                self.cache.set(key, result)
+            return result
+        raise AssertionError("unreachable")
+
+    async def aparse_text(self, text: str, task_type: str, context: dict | None = None) -> dict:
+        fn = self._provider_fn()
+        if self.provider in _LOCAL_PROVIDERS:
+            results = [await fn(self, text, task_type, context)]
+        else:
+            if self.prefilter and task_type == "extract_specs":
+                text = prefilter_text(text)
+            sem = asyncio.Semaphore(self.max_concurrency)
+
+            async def run(chunk: str) -> dict:
+                async with sem:
+                    return await self._call_chunk(fn, chunk, task_type, context)
+
+            results = await asyncio.gather(*(run(c) for c in split_text(text, self.max_tokens)))
+
+        raw_items = [it for r in results for it in r.get("raw_items", [])]
         if task_type == "extract_specs":
-            # 最簡：以行為單位抓關鍵詞 (示例)
-            lines = [l.strip() for l in text.splitlines() if l.strip()]
-            items = []
-            for l in lines:
-                if ":" in l:
-                    k, v = l.split(":", 1)
-                    items.append({"name": k.strip(), "spec": v.strip()})
-            return {"status": True, "message": "parsed", "result": {"raw_items": items}}
-        return {"status": True, "message": "noop", "result": {}}
+            return {"status": True, "message": "parsed", "result": {"raw_items": raw_items}, "chunks": len(results)}
+        return {"status": True, "message": "noop", "result": {}, "chunks": len(results)}
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats() if self.cache is not None else {}
+
+    def parse_text(self, text: str, task_type: str, context: dict | None = None) -> dict:
+        """
+        同步介面（供 threadpool / 背景工作中的服務層呼叫）。
+        若目前執行緒已有執行中的 event loop，改在另一執行緒執行以免巢狀 asyncio.run。
+        """
+        coro = self.aparse_text(text, task_type, context)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        with ThreadPoolExecutor(max_workers=1) as ex:
+            return ex.submit(asyncio.run, coro).result()
 
 _llm_client: LLMClient | None = None
 
@@ -24,5 +266,16 @@ def get_llm_client():
     from ..config import settings
     global _llm_client
     if _llm_client is None:
-        _llm_client = LLMClient(settings.LLM_PROVIDER, settings.LLM_MODEL, settings.MAX_LLM_TOKENS)
+        _llm_client = LLMClient(
+            settings.LLM_PROVIDER,
+            settings.LLM_MODEL,
+            settings.MAX_LLM_TOKENS,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+            max_retries=settings.LLM_MAX_RETRIES,
+            retry_backoff=settings.LLM_RETRY_BACKOFF,
+            cache=build_cache(settings),
+            prefilter=settings.LLM_PREFILTER,
+        )
     return _llm_client
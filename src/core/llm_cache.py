@@ -0,0 +1,209 @@
+# src/core/llm_cache.py
+"""
+LLM 回應快取：相同段落（各規範重複出現的制式條文）不再重送 provider。
+- key：sha256(provider | model | prompt 版本 | task_type | context | 正規化後的文字塊)
+- 兩層：行程內 LRU（MemoryLRUCache）+ 磁碟 SQLite（SQLiteCache），TieredCache 組合並回填記憶體層
+- 各層皆有 TTL 與筆數上限；計數（hits / misses / sets / evictions）由 stats() 取得
+介面只需 get(key) / set(key, value) / stats()，可自行替換實作後傳入 LLMClient(cache=...)。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Protocol
+
+
+def normalize_chunk(text: str) -> str:
+    # 只正規化空白：排版差異不影響內容，但不改動字元本身
+    return "\n".join(" ".join(line.split()) for line in text.strip().splitlines() if line.strip())
+
+
+def make_key(
+    text: str, *, task_type: str, provider: str, model: str, prompt_version: str, context: dict | None = None
+) -> str:
+    ctx = json.dumps(context, sort_keys=True, ensure_ascii=False, default=str) if context else ""
+    raw = "\x1f".join([provider, model, prompt_version, task_type, ctx, normalize_chunk(text)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(Protocol):
+    def get(self, key: str) -> dict | None: ...
+    def set(self, key: str, value: dict) -> None: ...
+    def stats(self) -> dict: ...
+
+
+class MemoryLRUCache:
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Counter = Counter()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                self._stats["misses"] += 1
+                return None
+            created, value = hit
+            if self.ttl and time.time() - created > self.ttl:
+                del self._data[key]
+                self._stats["evictions"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key: str, value: dict, created: float | None = None) -> None:
+        with self._lock:
+            self._data[key] = (created or time.time(), value)
+            self._data.move_to_end(key)
+            self._stats["sets"] += 1
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**{k: self._stats[k] for k in ("hits", "misses", "sets", "evictions")}, "entries": len(self._data)}
+
+
+class SQLiteCache:
+    """
+    單檔 SQLite 儲存；每 _EVICT_EVERY 次寫入清除過期與超量項目（依最後存取時間）。
+    """
+
+    _EVICT_EVERY = 100
+
+    def __init__(self, path: str | Path, max_entries: int = 200000, ttl_seconds: float = 0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._stats: Counter = Counter()
+        self._writes = 0
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)")
+
+    def get_with_created(self, key: str) -> tuple[dict, float] | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            if self.ttl and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._stats["evictions"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._stats["hits"] += 1
+            return json.loads(row[0]), row[1]
+
+    def get(self, key: str) -> dict | None:
+        hit = self.get_with_created(key)
+        return hit[0] if hit else None
+
+    def set(self, key: str, value: dict) -> None:
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+            self._stats["sets"] += 1
+            self._writes += 1
+            if self._writes % self._EVICT_EVERY == 0:
+                self._evict_locked(now)
+
+    def evict(self) -> int:
+        with self._lock:
+            return self._evict_locked(time.time())
+
+    def _evict_locked(self, now: float) -> int:
+        removed = 0
+        if self.ttl:
+            removed += self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)
+            ).rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count > self.max_entries:
+            removed += self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,),
+            ).rowcount
+        self._stats["evictions"] += removed
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            return {**{k: self._stats[k] for k in ("hits", "misses", "sets", "evictions")}, "entries": entries}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    """
+    記憶體層優先；未命中再查磁碟層，命中時回填記憶體（保留原建立時間，TTL 不因回填延長）。
+    """
+
+    def __init__(self, memory: MemoryLRUCache, disk: SQLiteCache | None = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> dict | None:
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        hit = self.disk.get_with_created(key)
+        if hit is None:
+            return None
+        self.memory.set(key, hit[0], created=hit[1])
+        return hit[0]
+
+    def set(self, key: str, value: dict) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def stats(self) -> dict:
+        out = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            out["disk"] = self.disk.stats()
+        return out
+
+
+def build_cache(settings) -> ResponseCache | None:
+    """
+    依設定建立快取：LLM_CACHE_BACKEND = "memory+sqlite"（預設）/ "memory" / "none"
+    """
+    backend = settings.LLM_CACHE_BACKEND
+    if backend == "none":
+        return None
+    memory = MemoryLRUCache(settings.LLM_CACHE_MAX_ENTRIES, settings.LLM_CACHE_TTL_SECONDS)
+    disk = None
+    if backend == "memory+sqlite":
+        disk = SQLiteCache(
+            settings.LLM_CACHE_PATH, settings.LLM_CACHE_DISK_MAX_ENTRIES, settings.LLM_CACHE_TTL_SECONDS
+        )
+    return TieredCache(memory, disk)
@@ -0,0 +1,201 @@
+# src/core/parse_cache.py
+"""
+解析結果快取：相同內容的檔案重新匯入時，略過解碼 / 解析 / LLM，直接重放正規化後的項目。
+- key：sha256(kind | 內容雜湊 | 解析器版本 | LLM provider / model 等額外條件)
+- value：gzip JSONL，每行一個項目；最後一行為 {"__meta__": {...}}（如 warnings）
+  寫入時邊解析邊寫暫存檔，完成後 os.replace，讀取端不會看到半份結果
+- 淘汰：超過 PARSE_CACHE_MAX_AGE_DAYS 者刪除；總大小超過 PARSE_CACHE_MAX_BYTES 時
+  依最後使用時間（命中時更新 mtime）由舊到新刪除
+- 計數：hits / misses / writes / evictions（行程內），由 stats() 取得
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from ..config import settings
+
+_SUFFIX = ".jsonl.gz"
+_META_KEY = "__meta__"
+
+_STATS: Counter = Counter()
+_STATS_LOCK = threading.Lock()
+
+
+def _count(name: str, n: int = 1) -> None:
+    with _STATS_LOCK:
+        _STATS[name] += n
+
+
+def _root() -> Path | None:
+    root = settings.PARSE_CACHE_DIR
+    return Path(root) if root else None
+
+
+def cache_key(kind: str, content_sha256: str, parser_version: str, **extra: Any) -> str:
+    """
+    組合快取 key；extra 例如 provider / model（LLM 解析結果依模型而異）。
+    """
+    parts = [kind, content_sha256, parser_version] + [f"{k}={extra[k]}" for k in sorted(extra)]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _entry_path(root: Path, key: str) -> Path:
+    return root / key[:2] / f"{key}{_SUFFIX}"
+
+
+class CacheEntry:
+    """
+    命中的快取項目；逐行讀出項目，讀完後 meta 才可用。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.meta: dict = {}
+
+    def __iter__(self) -> Iterator[dict]:
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                obj = json.loads(line)
+                if _META_KEY in obj:
+                    self.meta = obj[_META_KEY]
+                else:
+                    yield obj
+
+
+def lookup(key: str) -> CacheEntry | None:
+    root = _root()
+    if root is None:
+        return None
+    path = _entry_path(root, key)
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        _count("misses")
+        return None
+    if time.time() - mtime > settings.PARSE_CACHE_MAX_AGE_DAYS * 86400:
+        path.unlink(missing_ok=True)
+        _count("evictions")
+        _count("misses")
+        return None
+    os.utime(path)  # 更新最後使用時間（LRU 淘汰依據）
+    _count("hits")
+    return CacheEntry(path)
+
+
+class CacheWriter:
+    def __init__(self, root: Path, key: str):
+        self.path = _entry_path(root, key)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = self.path.parent / f".{uuid.uuid4().hex}.tmp"
+        self._f = gzip.open(self._tmp, "wt", encoding="utf-8", compresslevel=1)
+        self.done = False
+
+    def tee(self, items: Iterable[dict]) -> Iterator[dict]:
+        """
+        原樣產出 items，同時寫入快取。
+        """
+        for it in items:
+            self._f.write(json.dumps(it, ensure_ascii=False, default=str) + "\n")
+            yield it
+
+    def finish(self, meta: dict | None = None) -> None:
+        self._f.write(json.dumps({_META_KEY: meta or {}}, ensure_ascii=False) + "\n")
+        self._f.close()
+        os.replace(self._tmp, self.path)
+        self.done = True
+        _count("writes")
+        evict()
+
+    def abort(self) -> None:
+        self._f.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+class _NullWriter:
+    done = True
+
+    def tee(self, items: Iterable[dict]) -> Iterator[dict]:
+        return iter(items)
+
+    def finish(self, meta: dict | None = None) -> None:
+        pass
+
+
+@contextmanager
+def writer(key: str):
+    """
+    用法：
+        with parse_cache.writer(key) as w:
+            consume(w.tee(items))
+            w.finish({"warnings": [...]})
+    未呼叫 finish（解析失敗 / 提前結束）時丟棄暫存檔。快取停用時為 no-op。
+    """
+    root = _root()
+    if root is None:
+        yield _NullWriter()
+        return
+    w = CacheWriter(root, key)
+    try:
+        yield w
+    finally:
+        if not w.done:
+            w.abort()
+
+
+def evict() -> int:
+    """
+    依年齡與總大小淘汰；回傳刪除的項目數。
+    """
+    root = _root()
+    if root is None or not root.exists():
+        return 0
+    now = time.time()
+    max_age = settings.PARSE_CACHE_MAX_AGE_DAYS * 86400
+    entries = []
+    removed = 0
+    for path in root.glob(f"*/*{_SUFFIX}"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        if now - st.st_mtime > max_age:
+            path.unlink(missing_ok=True)
+            removed += 1
+        else:
+            entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries, key=lambda e: e[0]):
+        if total <= settings.PARSE_CACHE_MAX_BYTES:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    if removed:
+        _count("evictions", removed)
+    return removed
+
+
+def stats() -> dict:
+    with _STATS_LOCK:
+        counters = {k: _STATS[k] for k in ("hits", "misses", "writes", "evictions")}
+    root = _root()
+    files = list(root.glob(f"*/*{_SUFFIX}")) if root and root.exists() else []
+    counters["entries"] = len(files)
+    counters["bytes"] = sum(p.stat().st_size for p in files if p.exists())
+    return counters
+
+
+def reset_stats() -> None:
+    with _STATS_LOCK:
+        _STATS.clear()
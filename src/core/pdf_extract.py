@@ -0,0 +1,175 @@
+# src/core/pdf_extract.py
+"""
+PDF 逐頁文字擷取：
+- 頁數夠多且來源為檔案路徑時，依頁區間（shard）分派到 ProcessPoolExecutor 平行擷取
+- 依頁序逐頁 yield，呼叫端可邊擷取邊解析，不必等整份文件完成
+- 以檔案 SHA-256 為 key 快取每頁文字（<PDF_PAGE_CACHE_DIR>/<h[0:2]>/<hash>/<page>.txt）與頁數（page_count），
+  同一份規範重新匯入時直接讀取快取，全部命中時完全不開啟 PDF
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from ..config import settings
+
+_EXECUTOR: ProcessPoolExecutor | None = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            workers = settings.PDF_EXTRACT_WORKERS or os.cpu_count() or 1
+            # spawn：避免在多執行緒的 web server 內 fork
+            _EXECUTOR = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _EXECUTOR
+
+
+def shutdown_pdf_executor(wait: bool = False) -> None:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=wait, cancel_futures=not wait)
+            _EXECUTOR = None
+
+
+def _extract_range(path: str, start: int, end: int) -> list[str]:
+    """
+    worker 入口：擷取 [start, end) 頁（0-based）的文字。
+    pdfplumber 的 pages= 參數仍會走完整個頁面樹；這裡改以 islice 走到 end 即停止。
+    """
+    import pdfplumber
+    from pdfminer.pdfpage import PDFPage
+    from pdfplumber.page import Page
+
+    texts = []
+    with pdfplumber.open(path) as pdf:
+        for i, page_obj in enumerate(islice(PDFPage.create_pages(pdf.doc), start, end), start=start):
+            page = Page(pdf, page_obj, page_number=i + 1)
+            texts.append(page.extract_text() or "")
+            page.flush_cache()  # 釋放該頁已解析的物件，控制記憶體
+    return texts
+
+
+class _PageCache:
+    def __init__(self, sha256: str):
+        self.dir = Path(settings.PDF_PAGE_CACHE_DIR) / sha256[:2] / sha256
+
+    def _path(self, page: int) -> Path:
+        return self.dir / f"{page:06d}.txt"
+
+    def get(self, page: int) -> str | None:
+        try:
+            return self._path(page).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def put(self, page: int, text: str) -> None:
+        self._write(self._path(page), text)
+
+    def get_count(self) -> int | None:
+        try:
+            return int((self.dir / "page_count").read_text(encoding="ascii"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put_count(self, n: int) -> None:
+        self._write(self.dir / "page_count", str(n))
+
+    def _write(self, path: Path, text: str) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.dir / f".{uuid.uuid4().hex}.tmp"
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)  # 原子寫入，避免併發匯入讀到半份快取
+
+
+def page_count(source: str | Path | BinaryIO) -> int:
+    import pdfplumber
+
+    with pdfplumber.open(source) as pdf:
+        n = len(pdf.pages)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return n
+
+
+def iter_pdf_pages(
+    source: str | Path | BinaryIO,
+    *,
+    sha256: str | None = None,
+    parallel: bool | None = None,
+) -> Iterator[str]:
+    """
+    依頁序逐頁產生文字。
+    - source：檔案路徑（可平行）或 file-like（僅能在本行程逐頁擷取）
+    - sha256：提供時啟用逐頁快取
+    - parallel：None 表示頁數 >= PDF_PARALLEL_MIN_PAGES 時自動平行
+    """
+    cache = _PageCache(sha256) if sha256 and settings.PDF_PAGE_CACHE_DIR else None
+    # 頁數也先查快取：page_count() 需完整開啟 PDF 並走完頁面樹
+    n = cache.get_count() if cache else None
+    if n is None:
+        n = page_count(source)
+        if cache:
+            cache.put_count(n)
+    if parallel is None:
+        parallel = n >= settings.PDF_PARALLEL_MIN_PAGES
+    parallel = parallel and isinstance(source, (str, Path))
+
+    shard = max(1, settings.PDF_EXTRACT_SHARD_PAGES)
+    if parallel:
+        # 每個 shard 都要從頭走頁面樹（約為擷取成本的 2%/頁），shard 過小時此開銷會主導；
+        # 因此至少讓每個 worker 只分到約兩個 shard
+        workers = settings.PDF_EXTRACT_WORKERS or os.cpu_count() or 1
+        shard = max(shard, -(-n // (workers * 2)))
+
+    shards = []
+    for start in range(0, n, shard):
+        end = min(start + shard, n)
+        cached = [cache.get(i) for i in range(start, end)] if cache else [None] * (end - start)
+        shards.append((start, end, cached))
+
+    # 平行模式：先把所有未命中快取的 shard 送出，再依頁序取回
+    futures: dict[int, Future] = {}
+    if parallel:
+        executor = _get_executor()
+        for start, end, cached in shards:
+            if any(t is None for t in cached):
+                futures[start] = executor.submit(_extract_range, str(source), start, end)
+
+    pdf = None
+    try:
+        for start, end, cached in shards:
+            if all(t is not None for t in cached):
+                yield from cached
+                continue
+            if parallel:
+                texts = futures.pop(start).result()
+            else:
+                if pdf is None:
+                    import pdfplumber
+                    pdf = pdfplumber.open(source)
+                texts = []
+                for page in pdf.pages[start:end]:
+                    texts.append(page.extract_text() or "")
+                    page.flush_cache()
+            for i, text in enumerate(texts, start=start):
+                if cache and cached[i - start] is None:
+                    cache.put(i, text)
+            yield from texts
+    finally:
+        # 呼叫端提前結束（或發生錯誤）時取消尚未開始的 shard
+        for f in futures.values():
+            f.cancel()
+        if pdf is not None:
+            pdf.close()
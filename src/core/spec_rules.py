@@ -0,0 +1,142 @@
+# src/core/spec_rules.py
+"""
+規則式規範擷取（非 LLM）：以預先編譯的 regex 逐行處理，2000 頁規範數秒內完成。
+- 條文切分：「第X條」、「1.2.3」階層編號開頭的行視為新條文，其後各行為條文內容
+- 內容依句分類：
+  standards           ：CNS / ASTM / IEC / ISO / JIS ... 規範編號
+  testing_methods     ：含試驗 / 檢驗 / 量測等字樣的句子
+  acceptance_criteria ：含公差（±2%）或上下限（不得大於 10mm、≧ 50 MPa）的句子
+  requirements        ：其餘句子
+- prefilter_text()：只保留帶有上述訊號的條文，減少送往真正 LLM 的內容
+以 LLM_PROVIDER="rules" 啟用（註冊於 core.llm）。
+"""
+from __future__ import annotations
+
+import re
+from typing import Iterator
+
+_CN_NUM = "一二三四五六七八九十百零〇壹貳參叁肆伍陸柒捌玖拾"
+
+_UNIT = r"(?:%|％|mm²|mm|cm|km|m|kg|g|kN|N|MPa|kPa|Pa|kV|V|mA|A|kW|W|MΩ|kΩ|Ω|Hz|°C|℃|dB|lux|公釐|公分|公尺|公斤|度)"
+
+# 條文標題：第X條 / 1.2.3（至少兩層，避免把「1 個」之類誤判；後接單位者為數值而非條號）/ 第X章、第X節
+_HEADING_RE = re.compile(
+    rf"^\s*(?P<clause>第[{_CN_NUM}\d]+[條章節]|\d+(?:\.\d+){{1,5}}(?!\d|\s*{_UNIT}(?![A-Za-z])))"
+    rf"\.?[\s、．:：]*(?P<title>.*)$"
+)
+# 規範編號：CNS 679、ASTM A615、IEC 60502-1 ...（前面不可緊接英文字母；中文字後可直接接）
+_STANDARD_RE = re.compile(
+    r"(?<![A-Za-z])(?:CNS|ASTM|AASHTO|IEC|ISO|JIS|IEEE|NFPA|ANSI|BS|EN|DIN|UL)"
+    r"(?:\s*[A-Z]{1,2}(?=[\s\-]*\d))?[\s\-]*\d+(?:[\-.:/]\d+)*",
+    re.IGNORECASE,
+)
+_TOLERANCE_RE = re.compile(rf"[±＋－]\s*\d+(?:\.\d+)?\s*{_UNIT}?")
+_LIMIT_RE = re.compile(
+    rf"(?:不得?(?:大於|小於|超過|低於|少於)|不超過|不低於|以上|以下|至少|最大|最小|≦|≧|≤|≥|<=|>=|<|>)"
+    rf"\s*\d+(?:\.\d+)?\s*{_UNIT}|\d+(?:\.\d+)?\s*{_UNIT}\s*(?:以上|以下|以內)"
+)
+_TEST_RE = re.compile(r"試驗|測試|檢驗|檢測|量測|抽驗|抽樣|取樣|test", re.IGNORECASE)
+_REQUIRE_RE = re.compile(r"應|須|需|不得|必須|shall|must", re.IGNORECASE)
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[。；;])\s*")
+
+
+def _sentences(lines: list[str]) -> Iterator[str]:
+    for line in lines:
+        for s in _SENTENCE_SPLIT_RE.split(line.strip()):
+            s = s.strip()
+            if s:
+                yield s
+
+
+def _has_signal(text: str) -> bool:
+    return bool(
+        _STANDARD_RE.search(text)
+        or _TOLERANCE_RE.search(text)
+        or _LIMIT_RE.search(text)
+        or _TEST_RE.search(text)
+        or _REQUIRE_RE.search(text)
+    )
+
+
+def _iter_clauses(text: str) -> Iterator[tuple[str | None, str | None, list[str]]]:
+    """
+    產生 (條號, 標題, 內容行)；第一個標題之前的內容條號為 None（接續上一段文字）。
+    """
+    clause = title = None
+    body: list[str] = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        m = _HEADING_RE.match(line)
+        if m:
+            if clause is not None or body:
+                yield clause, title, body
+            clause, title, body = m["clause"], m["title"].strip(), []
+        else:
+            body.append(line.strip())
+    if clause is not None or body:
+        yield clause, title, body
+
+
+def _split_title(title: str) -> tuple[str, str | None]:
+    # 「電纜：應符合 CNS 679」→ 名稱「電纜」，其餘併入內容
+    for sep in ("：", ":"):
+        if sep in title:
+            name, rest = title.split(sep, 1)
+            return name.strip(), rest.strip() or None
+    return title, None
+
+
+def extract_clause(clause: str | None, title: str | None, body: list[str]) -> dict:
+    name, rest = _split_title(title or "")
+    lines = ([rest] if rest else []) + body
+    standards: list[str] = []
+    requirements: list[str] = []
+    testing: list[str] = []
+    acceptance: list[str] = []
+    for s in _sentences(lines):
+        for m in _STANDARD_RE.finditer(s):
+            ref = " ".join(m.group(0).split()).upper()
+            if ref not in standards:
+                standards.append(ref)
+        if _TEST_RE.search(s):
+            testing.append(s)
+        elif _TOLERANCE_RE.search(s) or _LIMIT_RE.search(s):
+            acceptance.append(s)
+        else:
+            requirements.append(s)
+    return {
+        "name": name or (clause or ""),
+        "clause": clause,
+        "spec": "".join(lines),
+        "requirements": requirements,
+        "standards": standards,
+        "testing_methods": testing,
+        "acceptance_criteria": acceptance,
+        # 文字塊開頭、尚未遇到條文標題的內容：由呼叫端併入上一個條文
+        "continuation": clause is None,
+    }
+
+
+def extract_spec_items(text: str) -> list[dict]:
+    """
+    將規範文字切為條文並分類；僅保留有名稱或內容的條文。
+    """
+    items = []
+    for clause, title, body in _iter_clauses(text):
+        it = extract_clause(clause, title, body)
+        if it["continuation"] or it["spec"] or it["name"]:
+            items.append(it)
+    return items
+
+
+def prefilter_text(text: str) -> str:
+    """
+    只保留含規範編號 / 公差 / 上下限 / 試驗 / 「應、須、不得」等訊號的條文（含標題行）。
+    """
+    kept: list[str] = []
+    for clause, title, body in _iter_clauses(text):
+        block = ([f"{clause} {title}".strip()] if clause else []) + body
+        if _has_signal("\n".join(block)):
+            kept.extend(block)
+    return "\n".join(kept)
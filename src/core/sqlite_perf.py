@@ -0,0 +1,264 @@
+# src/core/sqlite_perf.py
+"""
+SQLite 效能模式（本機 / 離線部署）：
+- apply_sqlite_pragmas()：以 connect 事件對每條新連線設定 journal_mode=WAL、synchronous=NORMAL、
+  mmap_size、cache_size、temp_store、busy_timeout（WAL 下讀寫互不阻塞，commit 不必每次 fsync）
+- SQLiteWriteQueue：單一寫入者佇列。SQLite 同時只允許一個寫入交易，
+  並行匯入改為依序排隊（FIFO），而不是在鎖等待逾時後丟出 "database is locked"。
+  同一行程內以 ticket 排隊；另以 <db>.writelock 檔案鎖（fcntl.flock）跨行程（process 背景工作）排隊。
+  同一執行緒可重入（匯入服務互相呼叫時不會自鎖）。
+用法：
+    with queue_writes(db):
+        ... 解析（不佔佇列）... 寫入並 commit ...
+  區塊內該 Session 第一次寫入（flush / insert / update / delete）時才排入佇列，交易結束（commit / rollback）即釋放，
+  CPU-bound 的解析不佔住佇列。或以 @serialized 裝飾第一個參數為 Session 的服務函式（整段套用 queue_writes）。
+  serialized_writes(db) 則立即排隊並佔住整個區塊。
+非 SQLite 或 SQLITE_WRITE_QUEUE=False 時皆為 no-op。
+"""
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..config import settings
+
+try:
+    import fcntl  # POSIX only
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_TEMP_STORE = {"DEFAULT", "FILE", "MEMORY"}
+
+
+def _is_memory_db(url) -> bool:
+    return not url.database or url.database == ":memory:" or url.query.get("mode") == "memory"
+
+
+def sqlite_pragmas(cfg=settings, *, memory: bool = False) -> list[str]:
+    """
+    依設定組出 PRAGMA 陳述式；值皆經白名單 / int() 驗證後才組字串。
+    """
+    def choice(value: str, allowed: set[str], name: str) -> str:
+        value = str(value).upper()
+        if value not in allowed:
+            raise ValueError(f"invalid {name}: {value}")
+        return value
+
+    pragmas = []
+    if not memory:
+        pragmas.append(f"PRAGMA journal_mode={choice(cfg.SQLITE_JOURNAL_MODE, _JOURNAL_MODES, 'SQLITE_JOURNAL_MODE')}")
+        pragmas.append(f"PRAGMA mmap_size={int(cfg.SQLITE_MMAP_SIZE)}")
+    pragmas += [
+        f"PRAGMA synchronous={choice(cfg.SQLITE_SYNCHRONOUS, _SYNCHRONOUS, 'SQLITE_SYNCHRONOUS')}",
+        f"PRAGMA cache_size={int(cfg.SQLITE_CACHE_SIZE)}",
+        f"PRAGMA temp_store={choice(cfg.SQLITE_TEMP_STORE, _TEMP_STORE, 'SQLITE_TEMP_STORE')}",
+        f"PRAGMA busy_timeout={int(cfg.SQLITE_BUSY_TIMEOUT_MS)}",
+    ]
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine, cfg=settings) -> bool:
+    """
+    對 SQLite engine（同步或 AsyncEngine.sync_engine）註冊 connect 事件；回傳是否有套用。
+    """
+    if engine.dialect.name != "sqlite" or not cfg.SQLITE_PRAGMAS:
+        return False
+    pragmas = sqlite_pragmas(cfg, memory=_is_memory_db(engine.url))
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, record):
+        cur = dbapi_conn.cursor()
+        try:
+            for p in pragmas:
+                cur.execute(p)
+        finally:
+            cur.close()
+
+    return True
+
+
+class SQLiteWriteQueue:
+    """
+    FIFO、可重入的單一寫入者鎖；lock_path 提供時另以檔案鎖跨行程互斥。
+    """
+
+    def __init__(self, lock_path: str | None = None):
+        self.lock_path = lock_path
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self._owner: int | None = None
+        self._depth = 0
+        self._fd = None
+        self._stats: Counter = Counter()
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _lock_file(self) -> None:
+        if self.lock_path and fcntl is not None:
+            self._fd = open(self.lock_path, "a+b")
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def _unlock_file(self) -> None:
+        if self._fd is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            finally:
+                self._fd.close()
+                self._fd = None
+
+    @contextmanager
+    def acquire(self):
+        me = threading.get_ident()
+        start = time.perf_counter()
+        with self._cond:
+            if self._owner == me:
+                self._depth += 1
+                reentrant = True
+            else:
+                reentrant = False
+                ticket = self._next_ticket
+                self._next_ticket += 1
+                while self._serving != ticket:
+                    self._cond.wait()
+                self._owner, self._depth = me, 1
+        if not reentrant:
+            try:
+                self._lock_file()
+            except BaseException:
+                self._release()
+                raise
+            wait = time.perf_counter() - start
+            with self._cond:
+                self._stats["writes"] += 1
+                if wait > 0.001:
+                    self._stats["waited"] += 1
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        with self._cond:
+            self._depth -= 1
+            if self._depth == 0:
+                self._unlock_file()
+                self._owner = None
+                self._serving += 1
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            writes = self._stats["writes"]
+            return {
+                "writes": writes,
+                "waited": self._stats["waited"],
+                # 目前排隊中（不含正在寫入者）
+                "queued": max(0, self._next_ticket - self._serving - (1 if self._owner is not None else 0)),
+                "wait_ms": {
+                    "avg": round(self._wait_total / writes * 1000, 3) if writes else 0.0,
+                    "max": round(self._wait_max * 1000, 3),
+                },
+            }
+
+
+_QUEUES: dict[str, SQLiteWriteQueue] = {}
+_QUEUES_LOCK = threading.Lock()
+
+
+def write_queue_for(bind) -> SQLiteWriteQueue | None:
+    """
+    依 engine / connection 取得該 SQLite 資料庫的寫入佇列（每個資料庫檔一個）；非 SQLite 回傳 None。
+    """
+    if bind is None or bind.dialect.name != "sqlite" or not settings.SQLITE_WRITE_QUEUE:
+        return None
+    url = bind.engine.url if hasattr(bind, "engine") else bind.url
+    memory = _is_memory_db(url)
+    key = "" if memory else str(url.database)
+    with _QUEUES_LOCK:
+        q = _QUEUES.get(key)
+        if q is None:
+            q = _QUEUES[key] = SQLiteWriteQueue(None if memory else f"{url.database}.writelock")
+        return q
+
+
+def serialized_writes(db):
+    """
+    Session 用：SQLite 時回傳排隊的 context manager，其他資料庫為 nullcontext。
+    """
+    q = write_queue_for(db.get_bind())
+    return q.acquire() if q is not None else nullcontext()
+
+
+# Session.info 鍵：queue_writes 巢狀深度 / 本交易已取得的佇列（已進入的 context manager）
+_ENABLED = "sqlite_write_queue"
+_HELD = "sqlite_write_queue_held"
+
+
+@contextmanager
+def queue_writes(db):
+    """
+    區塊內 db 的寫入交易經由寫入佇列：第一次寫入時排隊，交易結束時釋放（可巢狀）。
+    區塊結束時交易若仍未結束，佇列持續佔用到該交易 commit / rollback 為止。
+    """
+    db.info[_ENABLED] = db.info.get(_ENABLED, 0) + 1
+    try:
+        yield
+    finally:
+        db.info[_ENABLED] -= 1
+
+
+def _hold(session) -> None:
+    if not session.info.get(_ENABLED) or _HELD in session.info:
+        return
+    q = write_queue_for(session.get_bind())
+    if q is None:
+        return
+    held = q.acquire()
+    held.__enter__()
+    session.info[_HELD] = held
+
+
+@event.listens_for(Session, "before_flush")
+def _before_flush(session, flush_context, instances) -> None:
+    _hold(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _before_dml(state) -> None:
+    # session.execute(insert / update / delete)：bulk_insert_rows 等不經 flush 的寫入
+    if state.is_insert or state.is_update or state.is_delete:
+        _hold(state.session)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _after_transaction_end(session, transaction) -> None:
+    # 只在最外層交易結束時釋放（SAVEPOINT 結束時 SQLite 仍持有寫入鎖）
+    if transaction.parent is None and _HELD in session.info:
+        session.info.pop(_HELD).__exit__(None, None, None)
+
+
+def serialized(fn):
+    """
+    裝飾器：fn(db, ...) 在 queue_writes(db) 內執行；寫入交易（至 commit）依序排隊，寫入前的解析不佔佇列。
+    """
+    @functools.wraps(fn)
+    def wrapper(db, *args, **kwargs):
+        with queue_writes(db):
+            return fn(db, *args, **kwargs)
+    return wrapper
+
+
+def write_queue_stats() -> dict:
+    with _QUEUES_LOCK:
+        return {key or ":memory:": q.stats() for key, q in _QUEUES.items()}
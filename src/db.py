@@ -1,10 +1,13 @@
 # src/db.py
 from __future__ import annotations
 
+import itertools
 import os
-from typing import Generator, Optional
+import threading
+from typing import AsyncGenerator, Generator, Optional
 
-from sqlalchemy import create_engine, MetaData, text
+from sqlalchemy import Select, TextClause, create_engine, make_url, MetaData, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import (
     DeclarativeBase,
     sessionmaker,
@@ -17,6 +20,15 @@ try:
 except Exception:  # noqa
     get_settings = None  # type: ignore
 
+from src.core.db_pool import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedQueuePool,
+    instrument_pool,
+    pool_status,
+    resolve_pool_options,
+)
+from src.core.sqlite_perf import apply_sqlite_pragmas, write_queue_stats
+
 # -----------------------------------------
 # 命名慣例：讓 Alembic 在 rename / diff 時更穩定
 # -----------------------------------------
@@ -79,48 +91,107 @@ _ENGINE = None
 _SessionFactory: Optional[sessionmaker] = None
 
 
+def _pool_settings():
+    if get_settings:
+        try:
+            return get_settings()
+        except Exception:
+            pass
+    return None
+
+
+def _uses_queue_pool(url: str) -> bool:
+    # SQLite 記憶體資料庫使用 SingletonThreadPool / StaticPool，不套用連線池設定
+    u = make_url(url)
+    if u.get_backend_name() != "sqlite":
+        return True
+    return bool(u.database) and u.database != ":memory:" and u.query.get("mode") != "memory"
+
+
 def get_engine(
     url: Optional[str] = None,
     *,
     echo: bool = False,
     future: bool = True,
-    pool_pre_ping: bool = True,
+    pool_pre_ping: bool | None = None,
     pool_size: int | None = None,
     max_overflow: int | None = None,
+    pool_timeout: float | None = None,
+    pool_recycle: int | None = None,
 ):
     """
     惰性建立 Engine，若傳入新的 url 與既有不同會重建。
-    pool_size / max_overflow 僅在非 SQLite 時適用。
+    連線池參數預設取自 pool profile（core.db_pool.resolve_pool_options：APP_ENV / DB_POOL_*），
+    明確傳入的參數優先。pool_size / max_overflow / pool_timeout 僅在使用 QueuePool 時適用
+    （SQLite 記憶體資料庫除外），此時連線池換成 InstrumentedQueuePool 以提供 /debug/db_pool 量測。
     """
     global _ENGINE
     if _ENGINE is not None and url is not None:
-        current_url = str(_ENGINE.url)
+        # str(url) 會遮蔽密碼，需以完整字串比較
+        current_url = _ENGINE.url.render_as_string(hide_password=False)
         if current_url != url:
             _ENGINE.dispose()
             _ENGINE = None
 
     if _ENGINE is None:
-        resolved = _resolve_database_url(url)
-        connect_args: dict = {}
-        if resolved.startswith("sqlite"):
-            # 多執行緒 FastAPI + SQLite（測試/開發）
-            connect_args["check_same_thread"] = False
-
-        create_kwargs: dict = {
-            "echo": echo,
-            "future": future,
+        explicit = {
             "pool_pre_ping": pool_pre_ping,
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
         }
-        if not resolved.startswith("sqlite"):
-            if pool_size is not None:
-                create_kwargs["pool_size"] = pool_size
-            if max_overflow is not None:
-                create_kwargs["max_overflow"] = max_overflow
-
-        _ENGINE = create_engine(resolved, connect_args=connect_args, **create_kwargs)
+        _ENGINE = _build_engine(_resolve_database_url(url), echo=echo, future=future, explicit=explicit)
     return _ENGINE
 
 
+def _build_engine(resolved: str, *, echo: bool = False, future: bool = True, explicit: dict | None = None):
+    """
+    建立同步 Engine（主庫與唯讀副本共用）：pool profile + 連線池量測 + SQLite PRAGMA。
+    """
+    connect_args: dict = {}
+    if resolved.startswith("sqlite"):
+        # 多執行緒 FastAPI + SQLite（測試/開發）
+        connect_args["check_same_thread"] = False
+
+    pool_options = resolve_pool_options(_pool_settings())
+    pool_options.update({k: v for k, v in (explicit or {}).items() if v is not None})
+
+    create_kwargs: dict = {
+        "echo": echo,
+        "future": future,
+        "pool_pre_ping": pool_options["pool_pre_ping"],
+        "pool_recycle": pool_options["pool_recycle"],
+    }
+    if _uses_queue_pool(resolved):
+        create_kwargs["poolclass"] = InstrumentedQueuePool
+        for key in ("pool_size", "max_overflow", "pool_timeout"):
+            create_kwargs[key] = pool_options[key]
+
+    engine = create_engine(resolved, connect_args=connect_args, **create_kwargs)
+    instrument_pool(engine.pool)
+    apply_sqlite_pragmas(engine)
+    return engine
+
+
+def get_pool_status() -> dict:
+    """
+    目前 engine 的連線池狀態與累計計數（checkout 等待時間、overflow、失效次數）；
+    async engine 已建立時附於 "async"，唯讀副本附於 "replicas"，SQLite 寫入佇列附於 "sqlite_write_queue"。
+    """
+    engine = get_engine()
+    status = pool_status(engine)
+    if _ASYNC_ENGINE is not None:
+        status["async"] = pool_status(_ASYNC_ENGINE.sync_engine)
+    if _READ_ENGINES:
+        status["replicas"] = [
+            {"url": e.url.render_as_string(hide_password=True), **pool_status(e)} for e in _READ_ENGINES
+        ]
+    if engine.dialect.name == "sqlite":
+        status["sqlite_write_queue"] = write_queue_stats()
+    return status
+
+
 def get_sessionmaker(
     url: Optional[str] = None,
     *,
@@ -164,6 +235,249 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+# -----------------------------------------
+# Async Engine / AsyncSession（讀取為主的路由使用；與同步 engine 指向同一個資料庫）
+# -----------------------------------------
+_ASYNC_ENGINE: Optional[AsyncEngine] = None
+_AsyncSessionFactory: Optional[async_sessionmaker] = None
+
+# 同步 driver → async driver
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """
+    postgresql(+psycopg2) → postgresql+asyncpg；sqlite → sqlite+aiosqlite；已是 async driver 者不變。
+    """
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if u.get_dialect().is_async or backend not in _ASYNC_DRIVERS:
+        return url
+    return u.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def get_async_engine(url: Optional[str] = None, *, echo: bool = False) -> AsyncEngine:
+    """
+    惰性建立 AsyncEngine；未傳入 url 時沿用同步 engine 的 URL（換成 async driver），
+    因此 reset_engine_for_test 切換資料庫後兩者一致。URL 不同時重建。
+    連線池參數同 get_engine（pool profile）；SQLite 沿用 aiosqlite 預設（檔案為 NullPool）。
+    """
+    global _ASYNC_ENGINE
+    resolved = to_async_url(url or get_engine().url.render_as_string(hide_password=False))
+    if _ASYNC_ENGINE is not None:
+        if _ASYNC_ENGINE.url.render_as_string(hide_password=False) == resolved:
+            return _ASYNC_ENGINE
+        # 不在 event loop 內等待關閉：僅捨棄連線池，既有連線由 GC 回收
+        _ASYNC_ENGINE.sync_engine.dispose(close=False)
+        _ASYNC_ENGINE = None
+
+    _ASYNC_ENGINE = _build_async_engine(resolved, echo=echo)
+    return _ASYNC_ENGINE
+
+
+def _build_async_engine(resolved: str, *, echo: bool = False) -> AsyncEngine:
+    pool_options = resolve_pool_options(_pool_settings())
+    create_kwargs: dict = {
+        "echo": echo,
+        "pool_pre_ping": pool_options["pool_pre_ping"],
+        "pool_recycle": pool_options["pool_recycle"],
+    }
+    if not resolved.startswith("sqlite"):
+        create_kwargs["poolclass"] = InstrumentedAsyncAdaptedQueuePool
+        for key in ("pool_size", "max_overflow", "pool_timeout"):
+            create_kwargs[key] = pool_options[key]
+
+    engine = create_async_engine(resolved, **create_kwargs)
+    instrument_pool(engine.sync_engine.pool)
+    apply_sqlite_pragmas(engine.sync_engine)
+    return engine
+
+
+def get_async_sessionmaker(url: Optional[str] = None) -> async_sessionmaker:
+    """
+    回傳（或建立）全域 async_sessionmaker；async engine 重建後自動重綁。
+    expire_on_commit=False：commit 後仍可讀取屬性（async 下不能隱式 lazy load）。
+    """
+    global _AsyncSessionFactory
+    engine = get_async_engine(url)
+    if _AsyncSessionFactory is None or _AsyncSessionFactory.kw.get("bind") is not engine:
+        _AsyncSessionFactory = async_sessionmaker(
+            bind=engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autoflush=True,
+        )
+    return _AsyncSessionFactory
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI 依賴（async 路由用）：不佔用 threadpool。
+    同步服務函式可透過 await db.run_sync(fn, ...) 在同一連線上執行。
+    """
+    db = get_async_sessionmaker()()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+# -----------------------------------------
+# 唯讀副本路由（DATABASE_READ_URLS，逗號分隔；未設定時一律走主庫）
+# -----------------------------------------
+_READ_URLS: Optional[list[str]] = None
+_READ_ENGINES: Optional[list] = None
+_ASYNC_READ_ENGINES: Optional[list[AsyncEngine]] = None
+_READ_LOCK = threading.Lock()
+_READ_COUNTER = itertools.count()
+
+
+def configure_read_replicas(urls: Optional[list[str]] = None) -> None:
+    """
+    設定唯讀副本 URL（None 表示依設定 DATABASE_READ_URLS）；既有副本 engine 會捨棄並於下次使用時重建。
+    """
+    global _READ_URLS, _READ_ENGINES, _ASYNC_READ_ENGINES
+    with _READ_LOCK:
+        for e in _READ_ENGINES or []:
+            e.dispose()
+        for e in _ASYNC_READ_ENGINES or []:
+            e.sync_engine.dispose(close=False)
+        _READ_URLS = list(urls) if urls is not None else None
+        _READ_ENGINES = _ASYNC_READ_ENGINES = None
+
+
+def _read_urls() -> list[str]:
+    if _READ_URLS is not None:
+        return _READ_URLS
+    raw = getattr(_pool_settings(), "DATABASE_READ_URLS", "") or ""
+    return [u.strip() for u in raw.split(",") if u.strip()]
+
+
+def get_read_engines() -> list:
+    global _READ_ENGINES
+    with _READ_LOCK:
+        if _READ_ENGINES is None:
+            _READ_ENGINES = [_build_engine(u) for u in _read_urls()]
+        return _READ_ENGINES
+
+
+def get_async_read_engines() -> list[AsyncEngine]:
+    global _ASYNC_READ_ENGINES
+    with _READ_LOCK:
+        if _ASYNC_READ_ENGINES is None:
+            _ASYNC_READ_ENGINES = [_build_async_engine(to_async_url(u)) for u in _read_urls()]
+        return _ASYNC_READ_ENGINES
+
+
+def _statement_kind(clause) -> str:
+    """
+    "read"（可走副本）/ "write"（DML、SELECT ... FOR UPDATE、非 SELECT 的 text）/ "unknown"（無語句等）。
+    """
+    if clause is None:
+        return "unknown"
+    if isinstance(clause, Select):
+        return "read" if clause._for_update_arg is None else "write"  # FOR UPDATE 需在主庫
+    if getattr(clause, "is_dml", False):
+        return "write"
+    if getattr(clause, "is_select", False):  # UNION / text().columns()
+        return "read"
+    if isinstance(clause, TextClause):
+        return "read" if clause.text.lstrip().upper().startswith(("SELECT", "WITH")) else "write"
+    return "unknown"
+
+
+class RoutingSession(Session):
+    """
+    讀取分派到唯讀副本：每個 session 第一次讀取時以 round-robin 選定一個副本，之後沿用到 close()，
+    同一交易內的 set_config(..., true) 等交易層設定與多段查詢（keyset 分頁、索引建立）都落在同一副本的同一快照；
+    flush / DML / 無法判斷的語句走主庫。
+    一旦實際寫入過（flush、DML、FOR UPDATE），本 session 之後的讀取也固定走主庫（避免讀到副本尚未同步的資料）；
+    無法判斷的語句（如不帶語句的 get_bind()）只走主庫，不影響之後的讀取。
+    self.bind 固定為主庫，供只需方言 / URL 的程式使用。未設定副本時等同一般 Session。
+    """
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        if self.bind is None:
+            self.bind = self._primary()
+
+    def _primary(self):
+        return get_engine()
+
+    def _replicas(self) -> list:
+        return get_read_engines()
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        kind = "write" if self._flushing else _statement_kind(clause)
+        if kind == "write":
+            self.info["wrote"] = True
+        elif kind == "read" and not self.info.get("wrote"):
+            replicas = self._replicas()
+            if replicas:
+                if "replica" not in self.info:
+                    self.info["replica"] = next(_READ_COUNTER)
+                return replicas[self.info["replica"] % len(replicas)]
+        return self._primary()
+
+    def close(self) -> None:
+        super().close()
+        self.info.pop("replica", None)  # 下次使用重新選副本
+
+
+class _AsyncRoutingSession(RoutingSession):
+    # AsyncSession 內部的同步 session：回傳 async engine 的 sync_engine
+    def _primary(self):
+        return get_async_engine().sync_engine
+
+    def _replicas(self) -> list:
+        return [e.sync_engine for e in get_async_read_engines()]
+
+
+_ReadSessionFactory: Optional[sessionmaker] = None
+_AsyncReadSessionFactory: Optional[async_sessionmaker] = None
+
+
+def get_read_sessionmaker() -> sessionmaker:
+    global _ReadSessionFactory
+    if _ReadSessionFactory is None:
+        _ReadSessionFactory = sessionmaker(class_=RoutingSession, expire_on_commit=False, future=True)
+    return _ReadSessionFactory
+
+
+def get_async_read_sessionmaker() -> async_sessionmaker:
+    global _AsyncReadSessionFactory
+    if _AsyncReadSessionFactory is None:
+        _AsyncReadSessionFactory = async_sessionmaker(
+            class_=AsyncSession, sync_session_class=_AsyncRoutingSession, expire_on_commit=False
+        )
+    return _AsyncReadSessionFactory
+
+
+def get_read_db() -> Generator[Session, None, None]:
+    """
+    FastAPI 依賴（查詢為主的路由）：讀取走唯讀副本，寫入與寫入後的讀取走主庫。
+    """
+    db = get_read_sessionmaker()()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    get_read_db 的 async 版本（副本 URL 自動換成 async driver）。
+    """
+    db = get_async_read_sessionmaker()()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
 # -----------------------------------------
 # 測試專用：重置
 # -----------------------------------------
@@ -171,16 +485,24 @@ def reset_engine_for_test(url: str):
     """
     測試 fixture 可呼叫：
         reset_engine_for_test(TEST_DATABASE_URL)
-    確保每個測試 session 獨立（若需要）。
+    確保每個測試 session 獨立（若需要）。async engine 一併重置，下次使用時依新 URL 建立。
     """
-    global _ENGINE, _SessionFactory, SessionLocal
+    global _ENGINE, _SessionFactory, SessionLocal, _ASYNC_ENGINE, _AsyncSessionFactory
     if _ENGINE is not None:
         try:
             _ENGINE.dispose()
         except Exception:
             pass
+    if _ASYNC_ENGINE is not None:
+        try:
+            _ASYNC_ENGINE.sync_engine.dispose(close=False)
+        except Exception:
+            pass
+    configure_read_replicas(None)
     _ENGINE = None
     _SessionFactory = None
+    _ASYNC_ENGINE = None
+    _AsyncSessionFactory = None
     SessionLocal = get_sessionmaker(url)  # type: ignore
 
 
@@ -193,13 +515,28 @@ def test_connection() -> None:
         conn.execute(text("SELECT 1"))
 
 def dispose_engine_on_shutdown():
-    global _ENGINE
+    global _ENGINE, _READ_ENGINES
+    for e in _READ_ENGINES or []:
+        e.dispose()
+    _READ_ENGINES = None
     if _ENGINE is not None:
         try:
             _ENGINE.dispose()
         finally:
             _ENGINE = None
 
+async def dispose_async_engine_on_shutdown():
+    global _ASYNC_ENGINE, _AsyncSessionFactory, _ASYNC_READ_ENGINES
+    for e in _ASYNC_READ_ENGINES or []:
+        await e.dispose()
+    _ASYNC_READ_ENGINES = None
+    if _ASYNC_ENGINE is not None:
+        try:
+            await _ASYNC_ENGINE.dispose()
+        finally:
+            _ASYNC_ENGINE = None
+            _AsyncSessionFactory = None
+
 
 # -----------------------------------------
 # 可選：create_all / drop_all（與 Alembic 併用時建議不啟動）
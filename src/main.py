@@ -6,9 +6,18 @@ from sqlalchemy import text
 from src.api.routes import budget_complex     # 新增 budget_paser.py 後引入 20250825
 
 
-from src.db import get_db, test_connection, dispose_engine_on_shutdown
+from src.db import (
+    get_db, get_pool_status, get_sessionmaker, test_connection,
+    dispose_engine_on_shutdown, dispose_async_engine_on_shutdown,
+)
 # 若已建立這些 router 模組再引入
 from src.api.routes import budget, specs, reference, form, ui #增加 ui 20250825
+from src.api.routes import jobs, files
+from src.config import settings
+from src.services.jobs import recover_jobs, shutdown_executor
+from src.core.pdf_extract import shutdown_pdf_executor
+from src.core import parse_cache
+from src.core.llm import get_llm_client
 
 
 app = FastAPI(title="AutoQM MVP", version="0.1.0")
@@ -24,11 +33,21 @@ def on_startup():
     except Exception as e:
         # 這裡用 RuntimeError 讓部署（例如 Docker healthcheck）快速失敗
         raise RuntimeError(f"Database connection failed: {e}")
+    # jobs 表為唯一的持久佇列：接手上次關機時遺留的工作
+    if settings.JOB_RECOVER_ON_STARTUP:
+        with get_sessionmaker()() as db:
+            recover_jobs(db)
 
 @app.on_event("shutdown")
 def on_shutdown():
+    shutdown_executor()
+    shutdown_pdf_executor()
     dispose_engine_on_shutdown()
 
+@app.on_event("shutdown")
+async def on_shutdown_async():
+    await dispose_async_engine_on_shutdown()
+
 @app.get("/health", tags=["system"])
 def health():
     return {"status": "ok"}
@@ -38,13 +57,28 @@ def db_ping(db: Session = Depends(get_db)):
     value = db.execute(text("SELECT 1")).scalar()
     return {"db_select_1": value}
 
+@app.get("/debug/db_pool", tags=["system"])
+def db_pool_stats():
+    return get_pool_status()
+
+@app.get("/debug/parse_cache", tags=["system"])
+def parse_cache_stats():
+    return parse_cache.stats()
+
+@app.get("/debug/llm_cache", tags=["system"])
+def llm_cache_stats():
+    return get_llm_client().cache_stats()
+
 # Router 掛載（尚未到對應步驟可註解）己先注解
 app.include_router(budget.router, prefix="/budget", tags=["budget"])
 app.include_router(specs.router, prefix="/specs", tags=["specs"])
 app.include_router(reference.router, prefix="/reference", tags=["reference"])
 app.include_router(form.router, prefix="/form", tags=["form"])
 app.include_router(budget_complex.router, prefix="/budget_complex", tags=["budget_complex"])  # 增加 budget_ccomplex 20250825
+app.include_router(budget_complex.items_router, prefix="/budget_complex", tags=["budget_complex"])
 app.include_router(ui.router, prefix="/ui", tags=["ui"])  # 增加 ui 20250825
+app.include_router(jobs.router, prefix="/jobs", tags=["jobs"])  # 背景工作（送出 / 輪詢）
+app.include_router(files.router, prefix="/files", tags=["files"])  # 檔案下載（Range / ETag）
 
 # 可選：根路徑
 @app.get("/")
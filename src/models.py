@@ -13,11 +13,11 @@ from sqlalchemy import (
     DateTime,
     Boolean,
     ForeignKey,
-    JSON,
     Index,
 )
 
 from src.db import Base  # 使用專案統一的 Base（含 naming_convention）
+from src.core.json_types import JSONDocument, json_text  # JSON；Postgres 為 JSONB
 
 
 # ---- Budget ----
@@ -34,7 +34,10 @@ class BudgetItem(Base):
     unit_price: Mapped[float | None] = mapped_column(Float)
     total_price: Mapped[float | None] = mapped_column(Float)
     description: Mapped[str | None] = mapped_column(Text)
-    metadata_json: Mapped[dict | None] = mapped_column("metadata", JSON)
+    metadata_json: Mapped[dict | None] = mapped_column("metadata", JSONDocument)
+    # 增量重新匯入用：row_key 識別同一列（階層碼 + 編碼 + 品名 + 出現序），row_hash 判斷內容是否變動
+    row_key: Mapped[str | None] = mapped_column(String(64))
+    row_hash: Mapped[str | None] = mapped_column(String(64))
 
     temp_items: Mapped[list["TempStandardItem"]] = relationship(
         back_populates="budget_item",
@@ -43,6 +46,20 @@ class BudgetItem(Base):
 
 
 Index("ix_budget_items_name_type", BudgetItem.name, BudgetItem.type)
+Index("ix_budget_items_budget_row_key", BudgetItem.budget_id, BudgetItem.row_key)
+# 僅 Postgres（見 migration JSONB 轉換）：metadata 包含查詢（@>）用 GIN，
+# 涵蓋 hierarchy_code / source_file_id / is_equipment 等鍵值篩選；階層碼前綴查詢用運算式索引
+Index(
+    "ix_budget_items_metadata_gin",
+    BudgetItem.metadata_json,
+    postgresql_using="gin",
+    postgresql_ops={"metadata": "jsonb_path_ops"},
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_budget_items_hierarchy_code",
+    json_text(BudgetItem.metadata_json, "hierarchy_code").label("hierarchy_code"),
+    postgresql_ops={"hierarchy_code": "text_pattern_ops"},
+).ddl_if(dialect="postgresql")
 
 
 # ---- Specifications ----
@@ -54,12 +71,14 @@ class SpecificationItem(Base):
     item_name: Mapped[str] = mapped_column(String(255), index=True)
     item_type: Mapped[str | None] = mapped_column(String(32))
     # JSON 欄位可再細化型別，如 list[str] | None；暫留寬鬆
-    requirements: Mapped[list | None] = mapped_column(JSON)
-    standards: Mapped[list | None] = mapped_column(JSON)
-    testing_methods: Mapped[list | None] = mapped_column(JSON)
-    acceptance_criteria: Mapped[list | None] = mapped_column(JSON)
+    requirements: Mapped[list | None] = mapped_column(JSONDocument)
+    standards: Mapped[list | None] = mapped_column(JSONDocument)
+    testing_methods: Mapped[list | None] = mapped_column(JSONDocument)
+    acceptance_criteria: Mapped[list | None] = mapped_column(JSONDocument)
     notes: Mapped[str | None] = mapped_column(Text)
-    metadata_json: Mapped[dict | None] = mapped_column("metadata", JSON)
+    metadata_json: Mapped[dict | None] = mapped_column("metadata", JSONDocument)
+    # 自然鍵：sha256(spec_id + 正規化品名 + requirements)，重複匯入時 upsert 用
+    natural_key: Mapped[str | None] = mapped_column(String(64), unique=True, index=True)
 
 
 # ---- Quality Standards (Reference) ----
@@ -70,13 +89,13 @@ class QualityStandard(Base):
     item_name: Mapped[str] = mapped_column(String(255), index=True)
     item_type: Mapped[str] = mapped_column(String(32), index=True)
     source: Mapped[str | None] = mapped_column(String(255))
-    inspection_items: Mapped[list | None] = mapped_column(JSON)
-    inspection_methods: Mapped[list | None] = mapped_column(JSON)
-    acceptance_criteria: Mapped[list | None] = mapped_column(JSON)
+    inspection_items: Mapped[list | None] = mapped_column(JSONDocument)
+    inspection_methods: Mapped[list | None] = mapped_column(JSONDocument)
+    acceptance_criteria: Mapped[list | None] = mapped_column(JSONDocument)
     frequency: Mapped[str | None] = mapped_column(String(128))
     responsible_party: Mapped[str | None] = mapped_column(String(128))
     notes: Mapped[str | None] = mapped_column(Text)
-    metadata_json: Mapped[dict | None] = mapped_column("metadata", JSON)
+    metadata_json: Mapped[dict | None] = mapped_column("metadata", JSONDocument)
 
 
 Index(
@@ -84,6 +103,13 @@ Index(
     QualityStandard.item_name,
     QualityStandard.item_type,
 )
+# 僅 Postgres：pg_trgm 模糊搜尋索引（需 pg_trgm extension，見 migration 029d99dcc787）
+Index(
+    "ix_quality_standards_item_name_trgm",
+    QualityStandard.item_name,
+    postgresql_using="gin",
+    postgresql_ops={"item_name": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
 
 
 # ---- Templates ----
@@ -107,7 +133,7 @@ class ReferenceFile(Base):
     file_id: Mapped[str] = mapped_column(String(64), index=True)
     project_name: Mapped[str | None] = mapped_column(String(128))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    metadata_json: Mapped[dict | None] = mapped_column("metadata", JSON)
+    metadata_json: Mapped[dict | None] = mapped_column("metadata", JSONDocument)
 
 
 # ---- Temp Standards ----
@@ -126,24 +152,25 @@ class TempStandardItem(Base):
 
     temp_item_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     temp_file_id: Mapped[int] = mapped_column(ForeignKey("temp_standard_files.temp_file_id"))
-    budget_item_id: Mapped[int] = mapped_column(ForeignKey("budget_items.item_id"))
+    # 增量重新匯入刪除預算項目時，已人工修改的暫存項目保留並設為 NULL
+    budget_item_id: Mapped[int | None] = mapped_column(ForeignKey("budget_items.item_id"))
 
     item_name: Mapped[str] = mapped_column(String(255), index=True)
     item_type: Mapped[str] = mapped_column(String(32), index=True)
     reference_standard_id: Mapped[int | None] = mapped_column(ForeignKey("quality_standards.standard_id"))
 
-    inspection_items: Mapped[list | None] = mapped_column(JSON)
-    inspection_methods: Mapped[list | None] = mapped_column(JSON)
-    acceptance_criteria: Mapped[list | None] = mapped_column(JSON)
+    inspection_items: Mapped[list | None] = mapped_column(JSONDocument)
+    inspection_methods: Mapped[list | None] = mapped_column(JSONDocument)
+    acceptance_criteria: Mapped[list | None] = mapped_column(JSONDocument)
     frequency: Mapped[str | None] = mapped_column(String(128))
     responsible_party: Mapped[str | None] = mapped_column(String(128))
     notes: Mapped[str | None] = mapped_column(Text)
     is_modified: Mapped[bool] = mapped_column(Boolean, default=False)
     last_modified: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    metadata_json: Mapped[dict | None] = mapped_column("metadata", JSON)
+    metadata_json: Mapped[dict | None] = mapped_column("metadata", JSONDocument)
 
     temp_file: Mapped[TempStandardFile] = relationship(back_populates="items")
-    budget_item: Mapped[BudgetItem] = relationship(back_populates="temp_items")
+    budget_item: Mapped[BudgetItem | None] = relationship(back_populates="temp_items")
     reference_standard: Mapped[QualityStandard | None] = relationship()
 
 
@@ -160,7 +187,7 @@ class GeneratedForm(Base):
     creation_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     file_id: Mapped[str] = mapped_column(String(64), index=True)
     file_format: Mapped[str] = mapped_column(String(16))
-    metadata_json: Mapped[dict | None] = mapped_column("metadata", JSON)
+    metadata_json: Mapped[dict | None] = mapped_column("metadata", JSONDocument)
 
 
 # ---- Stored Files (metadata only) ----
@@ -172,5 +199,26 @@ class StoredFile(Base):
     stored_path: Mapped[str] = mapped_column(String(512))
     mime_type: Mapped[str | None] = mapped_column(String(128))
     size_bytes: Mapped[int | None] = mapped_column(Integer)
+    sha256: Mapped[str | None] = mapped_column(String(64), unique=True, index=True)  # 內容雜湊（去重用）
+    ref_count: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    metadata_json: Mapped[dict | None] = mapped_column("metadata", JSONDocument)
+
+
+# ---- Background Jobs ----
+class Job(Base):
+    __tablename__ = "jobs"
+
+    job_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    job_type: Mapped[str] = mapped_column(String(64), index=True)  # form.generate / budget_complex.import / specs.import
+    status: Mapped[str] = mapped_column(String(16), index=True, default="queued")  # queued/running/succeeded/failed
+    progress: Mapped[float] = mapped_column(Float, default=0.0)  # 0.0 ~ 1.0
+    params: Mapped[dict | None] = mapped_column(JSONDocument)
+    result: Mapped[dict | None] = mapped_column(JSONDocument)
+    error: Mapped[str | None] = mapped_column(Text)
+    # 產出物連結
+    stored_file_id: Mapped[int | None] = mapped_column(ForeignKey("stored_files.file_id"))
+    generated_form_id: Mapped[int | None] = mapped_column(ForeignKey("generated_forms.form_id"))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    metadata_json: Mapped[dict | None] = mapped_column("metadata", JSON)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime)
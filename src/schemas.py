@@ -79,7 +79,7 @@ class TempStandardItemUpdate(BaseModel):
 
 class TempStandardItemRead(BaseModel):
     temp_item_id: int
-    budget_item_id: int
+    budget_item_id: Optional[int]
     item_name: str
     item_type: str
     reference_standard_id: Optional[int]
@@ -1,9 +1,18 @@
 # src/services/budget_parser.py
-import csv, io, re
-from typing import List, Dict, Any
+import csv, hashlib, io, json, re
+from collections import Counter
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import List, Dict, Any, BinaryIO, Callable, Iterator
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Session
-from ..models import BudgetItem, StoredFile
-from ..core.file_storage import save_file
+from ..config import settings
+from ..models import BudgetItem, StoredFile, TempStandardItem
+from ..core import parse_cache
+from ..core.bulk_insert import bulk_insert_rows
+from ..core.file_storage import get_stored_file, release_file, save_file, save_fileobj
+from ..core.json_types import json_contains, json_text_startswith
+from ..core.sqlite_perf import serialized
 
 CHINESE_NUM_MAP = {
     "壹":1,"貳":2,"參":3,"叁":3,"肆":4,"伍":5,"陸":6,"柒":7,"捌":8,"玖":9,"拾":10
@@ -20,23 +29,48 @@ MATERIAL_KEYWORDS = [
 ]
 IGNORE_KEYWORDS = ["小計","合計","計   ","計 ","總計"]
 
+_MAX_WARNINGS = 30
+
+# 解析規則版本（解析結果快取 key 的一部分）；調整解析邏輯時請遞增。
+# 關鍵詞清單一併納入，修改清單即自動使舊快取失效。
+PARSER_VERSION = "1:" + hashlib.sha256(
+    repr((INSTALL_KEYWORDS, EQUIP_KEYWORDS, MATERIAL_KEYWORDS, IGNORE_KEYWORDS)).encode("utf-8")
+).hexdigest()[:12]
+
+def _compile_keywords(keywords: List[str]) -> "re.Pattern[str]":
+    # 長詞優先的單一 alternation；re 會以首字集合快速略過不相關字元
+    uniq = sorted(set(keywords), key=len, reverse=True)
+    return re.compile("|".join(re.escape(k) for k in uniq))
+
+# 匯入時編譯一次
+_INSTALL_RE = _compile_keywords(INSTALL_KEYWORDS)
+_EQUIP_RE = _compile_keywords(EQUIP_KEYWORDS)
+_MATERIAL_RE = _compile_keywords(MATERIAL_KEYWORDS)
+_IGNORE_RE = _compile_keywords(IGNORE_KEYWORDS)
+
 def _is_install(name: str) -> bool:
-    return any(k in name for k in INSTALL_KEYWORDS)
+    return _INSTALL_RE.search(name) is not None
 
 def _is_equipment(name: str) -> bool:
-    return any(k in name for k in EQUIP_KEYWORDS)
+    return _EQUIP_RE.search(name) is not None
 
 def _is_material(name: str) -> bool:
-    return any(k in name for k in MATERIAL_KEYWORDS)
+    return _MATERIAL_RE.search(name) is not None
 
+def _is_ignored(name: str) -> bool:
+    return _IGNORE_RE.search(name) is not None
+
+@lru_cache(maxsize=65536)
 def classify_type(name: str) -> str:
+    """
+    優先序：work（安裝類）> equipment > material；皆未命中時 fallback 為 material，
+    因此 material 關鍵詞不影響結果，不需比對。預算書品名重複率高，以 lru_cache 記憶。
+    """
     if _is_install(name):
         return "work"
     if _is_equipment(name):
         return "equipment"
-    if _is_material(name):
-        return "material"
-    return "material"  # default fallback
+    return "material"
 
 def parse_hierarchy(code: str):
     code = code.strip()
@@ -64,33 +98,44 @@ def parse_hierarchy(code: str):
                     pass
     return code, numeric if numeric else None
 
-def import_complex_budget(db: Session, file_bytes: bytes, filename: str, budget_id: str):
-     # 1) 儲存原始檔案
-    file_save = save_file(file_bytes, filename, "budget/raw", db=db)
-    # 明確轉型，確保為 int（防守性作法）
-    source_file_id: int = int(file_save["file_id"])
-
-    text = file_bytes.decode("utf-8", errors="ignore")
-    rows = list(csv.reader(io.StringIO(text)))
-    rows = [r for r in rows if any(c.strip() for c in r)]
-   
-    # 尋找標頭
-    header_idx = None
-    for i, r in enumerate(rows):
+def _iter_csv_rows(source: bytes | BinaryIO) -> Iterator[List[str]]:
+    """
+    逐列讀取 CSV：以 TextIOWrapper 增量解碼位元組串流，不一次 decode 整份檔案。
+    空白列直接略過。
+    """
+    stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    text = io.TextIOWrapper(stream, encoding="utf-8", errors="ignore", newline="")
+    try:
+        for r in csv.reader(text):
+            if any(c.strip() for c in r):
+                yield r
+    finally:
+        # 不關閉呼叫端傳入的 file handle
+        text.detach()
+
+def _skip_to_header(rows: Iterator[List[str]]) -> bool:
+    # 尋找標頭（消耗標頭之前的列），找到回傳 True
+    for r in rows:
         line_join = ",".join(r)
         if "項 次" in line_join and "項" in line_join and "說" in line_join:
-            header_idx = i
-            break
-    if header_idx is None:
-        return {"status": False, "message": "header_not_found"}
+            return True
+    return False
 
-    data_rows = rows[header_idx+1:]
-    inserted = 0
-    warnings: List[str] = []
-    items_buffer: List[Dict[str, Any]] = []
-    last_item = None
-    
-    for raw in data_rows:
+def _iter_budget_records(
+    rows: Iterator[List[str]],
+    *,
+    budget_id: str,
+    filename: str,
+    source_file_id: int,
+    warnings: List[str],
+) -> Iterator[Dict[str, Any]]:
+    """
+    續行合併狀態機：目前項目（pending）要等到下一個非續行出現才確定，
+    因此在那之前不 yield，避免已送出的 record 再被續行修改。
+    """
+    pending: Dict[str, Any] | None = None
+
+    for raw in rows:
         # 正規化欄位長度
         while len(raw) < 7:
             raw.append("")
@@ -102,15 +147,17 @@ def import_complex_budget(db: Session, file_bytes: bytes, filename: str, budget_
         total_price = raw[5].strip()
         code_field = raw[6].strip()
 
-        # 續行判斷：無 code_col 且 (name_col 不是分類關鍵詞) 且 last_item 存在
-        if (not code_col) and name_col and last_item and not any(k in name_col for k in IGNORE_KEYWORDS):
+        is_ignored = _is_ignored(name_col)
+
+        # 續行判斷：無 code_col 且 (name_col 不是分類關鍵詞) 且 pending 存在
+        if (not code_col) and name_col and pending and not is_ignored:
             # 合併續行
-            last_item["merged_segments"].append(name_col)
-            last_item["name"] = last_item["name"] + name_col
+            pending["metadata_json"]["merged_segments"].append(name_col)
+            pending["name"] = pending["name"] + name_col
             continue
 
         # 忽略小計 / 合計等
-        if any(k in name_col for k in IGNORE_KEYWORDS):
+        if is_ignored:
             continue
 
         # 分類行判斷：有階層碼但無數量、無單位、無編碼或明顯為章節
@@ -122,7 +169,9 @@ def import_complex_budget(db: Session, file_bytes: bytes, filename: str, budget_
                 is_pure_section = True
 
         if is_pure_section:
-            last_item = None
+            if pending:
+                yield pending
+            pending = None
             continue
 
         # 真正的可匯入項
@@ -132,18 +181,19 @@ def import_complex_budget(db: Session, file_bytes: bytes, filename: str, budget_
         # 數量解析
         try:
             quantity = float(qty) if qty else None
-        except:
+        except ValueError:
             quantity = None
-            warnings.append(f"quantity_parse_fail:{code_col}:{name_col}")
+            if len(warnings) < _MAX_WARNINGS:
+                warnings.append(f"quantity_parse_fail:{code_col}:{name_col}")
 
         # 單價/複價（MVP 可忽略空值）
         try:
             up = float(unit_price) if unit_price else None
-        except:
+        except ValueError:
             up = None
         try:
             tp = float(total_price) if total_price else None
-        except:
+        except ValueError:
             tp = None
 
         hierarchy_code, hierarchy_numeric = parse_hierarchy(code_col) if code_col else (None, None)
@@ -174,42 +224,405 @@ def import_complex_budget(db: Session, file_bytes: bytes, filename: str, budget_
                 "is_equipment": item_type == "equipment"
             }
         }
-        
-        items_buffer.append(record)
-        last_item = record
-
-    # 寫入 DB
-    for rec in items_buffer:
-        bi = BudgetItem(
-            budget_id=rec["budget_id"],
-            name=rec["name"],
-            type=rec["type"],
-            unit=rec["unit"],
-            quantity=rec["quantity"],
-            unit_price=rec["unit_price"],
-            total_price=rec["total_price"],
-            description=rec["description"],
-            metadata_json=rec["metadata_json"]
+
+        if pending:
+            yield pending
+        pending = record
+
+    if pending:
+        yield pending
+
+def _count_types(
+    records: Iterator[Dict[str, Any]],
+    by_type: Counter,
+    on_progress: Callable[[int], None] | None = None,
+    every: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    # 串流途中統計類型，不保留 record；每 every 筆回報一次進度
+    n = 0
+    for rec in records:
+        by_type[rec["type"]] += 1
+        n += 1
+        if on_progress and n % every == 0:
+            on_progress(n)
+        yield rec
+
+def _rebind_records(
+    cached: Iterator[Dict[str, Any]], budget_id: str, filename: str, source_file_id: int
+) -> Iterator[Dict[str, Any]]:
+    # 快取內容與匯入批次無關，重放時改寫本次的 budget_id / 來源檔資訊
+    for rec in cached:
+        rec["budget_id"] = budget_id
+        rec["metadata_json"]["source_file_id"] = source_file_id
+        rec["metadata_json"]["source_file_original_name"] = filename
+        yield rec
+
+# -----------------------------------------
+# 增量重新匯入
+# -----------------------------------------
+# 來源檔資訊每次匯入都不同，不納入 row_hash（否則每列都會被視為變動）
+_VOLATILE_META = ("source_file_id", "source_file_original_name")
+_HASHED_FIELDS = ("name", "type", "unit", "quantity", "unit_price", "total_price", "description")
+# WHERE id IN (...) 每次的 id 數
+_ID_CHUNK = 1000
+
+def _digest(obj: Any) -> str:
+    return hashlib.sha256(json.dumps(obj, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _fingerprint_records(records: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    為每筆 record 補上 row_key / row_hash：
+    - row_key：hierarchy_code + code_clean + name + 同鍵第幾次出現（同名同碼的重複列依序區分）
+    - row_hash：數量 / 單價 / 複價 / 類型等內容與 metadata（不含來源檔資訊）
+    """
+    seen: Counter = Counter()
+    for rec in records:
+        meta = rec.get("metadata_json") or {}
+        base = (meta.get("hierarchy_code") or "", meta.get("code_clean") or "", rec.get("name") or "")
+        rec["row_key"] = _digest([*base, seen[base]])
+        seen[base] += 1
+        rec["row_hash"] = _digest([
+            [rec.get(f) for f in _HASHED_FIELDS],
+            {k: v for k, v in meta.items() if k not in _VOLATILE_META},
+        ])
+        yield rec
+
+def _existing_fingerprints(db: Session, budget_id: str) -> tuple[Dict[str, tuple[int, str]], List[int]]:
+    """
+    回傳 ({row_key: (item_id, row_hash)}, 多餘的 item_id)。
+    舊版匯入的列沒有 row_key：讀出內容當場計算（row_hash 設為空字串，命中時會順便回填）。
+    同鍵重複者（如同一檔案以附加模式匯入兩次）只保留 id 最小的一筆，其餘列入刪除。
+    """
+    existing: Dict[str, tuple[int, str]] = {}
+    surplus: List[int] = []
+
+    def keep(key: str, item_id: int, row_hash: str) -> None:
+        if key in existing:
+            surplus.append(item_id)
+        else:
+            existing[key] = (item_id, row_hash)
+
+    rows = db.execute(
+        select(BudgetItem.item_id, BudgetItem.row_key, BudgetItem.row_hash)
+        .where(BudgetItem.budget_id == budget_id)
+        .order_by(BudgetItem.item_id)
+    )
+    legacy = []
+    for item_id, key, row_hash in rows:
+        if key is None:
+            legacy.append(item_id)
+        else:
+            keep(key, item_id, row_hash or "")
+
+    if legacy:
+        cols = [BudgetItem.item_id, BudgetItem.metadata_json, *(getattr(BudgetItem, f) for f in _HASHED_FIELDS)]
+
+        def legacy_records() -> Iterator[Dict[str, Any]]:
+            # 依 item_id 順序分段讀出，出現序跨段延續
+            for i in range(0, len(legacy), _ID_CHUNK):
+                chunk = legacy[i:i + _ID_CHUNK]
+                for r in db.execute(select(*cols).where(BudgetItem.item_id.in_(chunk)).order_by(BudgetItem.item_id)):
+                    yield {"item_id": r.item_id, "metadata_json": r.metadata_json,
+                           **{f: getattr(r, f) for f in _HASHED_FIELDS}}
+
+        for rec in _fingerprint_records(legacy_records()):
+            keep(rec["row_key"], rec["item_id"], "")
+    return existing, surplus
+
+def _budget_source_files(db: Session, budget_id: str) -> set[int]:
+    # 該預算項目目前引用的原始檔（metadata.source_file_id）
+    fid = BudgetItem.metadata_json["source_file_id"].as_integer()
+    return {
+        v for v in db.scalars(select(fid).where(BudgetItem.budget_id == budget_id).distinct())
+        if v is not None
+    }
+
+def _release_superseded_files(db: Session, budget_id: str, new_file_id: int, held_before: set[int]) -> None:
+    """
+    每個預算對每個仍被引用的原始檔只持有一個參照：
+    匯入前持有的檔案（held_before）與本次上傳各算一個，匯入後不再被任何列引用者釋放，
+    同一檔案重複持有（同內容再次匯入同一預算）者釋放多出的一個。
+    """
+    held_after = _budget_source_files(db, budget_id)
+    for fid in held_before | {new_file_id}:
+        extra = (fid in held_before) + (fid == new_file_id) - (fid in held_after)
+        for _ in range(extra):
+            release_file(fid, db)
+
+def _delete_budget_items(db: Session, item_ids: List[int]) -> Dict[str, int]:
+    """
+    刪除預算項目；引用它們的暫存品管項目：
+    - 已人工修改（is_modified）者保留，僅解除關聯（budget_item_id 設為 NULL），不丟失審查內容
+    - 未修改者（自動比對產生，可重建）一併刪除
+    回傳受影響的暫存項目筆數。
+    """
+    counts = {"temp_items_detached": 0, "temp_items_deleted": 0}
+    for i in range(0, len(item_ids), _ID_CHUNK):
+        chunk = item_ids[i:i + _ID_CHUNK]
+        linked = TempStandardItem.budget_item_id.in_(chunk)
+        counts["temp_items_detached"] += db.execute(
+            update(TempStandardItem)
+            .where(linked, TempStandardItem.is_modified.is_(True))
+            .values(budget_item_id=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        counts["temp_items_deleted"] += db.execute(
+            delete(TempStandardItem).where(linked).execution_options(synchronize_session=False)
+        ).rowcount
+        db.execute(delete(BudgetItem).where(BudgetItem.item_id.in_(chunk)))
+    return counts
+
+def _apply_incremental(
+    db: Session, budget_id: str, records: Iterator[Dict[str, Any]], batch_size: int
+) -> Dict[str, Any]:
+    """
+    與既有列比對 row_key / row_hash：新鍵批次新增、內容變動者依主鍵批次更新（保留 item_id 與
+    關聯的暫存品管項目）、本次未出現的鍵刪除；內容未變的列完全不寫入。
+    """
+    existing, surplus = _existing_fingerprints(db, budget_id)
+    seen: set[str] = set()
+    updates: List[Dict[str, Any]] = []
+    counts: Counter = Counter()
+
+    def flush_updates() -> None:
+        if updates:
+            # ORM bulk UPDATE by primary key：executemany，每批一次來回
+            db.execute(update(BudgetItem), updates)
+            counts["updated"] += len(updates)
+            updates.clear()
+
+    def new_rows() -> Iterator[Dict[str, Any]]:
+        for rec in records:
+            key = rec["row_key"]
+            seen.add(key)
+            hit = existing.get(key)
+            if hit is None:
+                yield rec
+            elif hit[1] != rec["row_hash"]:
+                updates.append({**rec, "item_id": hit[0]})
+                if len(updates) >= batch_size:
+                    flush_updates()
+            else:
+                counts["unchanged"] += 1
+        flush_updates()
+
+    written = bulk_insert_rows(db, BudgetItem, new_rows(), batch_size=batch_size)
+    stale = surplus + [item_id for key, (item_id, _) in existing.items() if key not in seen]
+    temp_counts = _delete_budget_items(db, stale)
+    return {
+        **written,
+        "updated": counts["updated"],
+        "deleted": len(stale),
+        "unchanged": counts["unchanged"],
+        **temp_counts,
+    }
+
+@serialized
+def import_complex_budget(
+    db: Session,
+    file_bytes: bytes | BinaryIO,
+    filename: str,
+    budget_id: str,
+    *,
+    chunk_size: int | None = None,
+    source_file_id: int | None = None,
+    on_progress: Callable[[int], None] | None = None,
+    incremental: bool = False,
+):
+    """
+    串流匯入：逐列解析、每 chunk_size 筆批次寫入一次，整體記憶體與檔案大小無關。
+    file_bytes 可為 bytes 或可 seek 的二進位 file-like。
+    - source_file_id：原始檔已存入 StoredFile 時傳入，略過重複存檔
+    - on_progress(rows)：每解析 chunk_size 筆回呼一次（背景工作回報進度用）
+    - incremental：與該 budget_id 既有的項目比對，只新增 / 更新 / 刪除有差異的列，
+      未變動的列保留原 item_id（其 metadata 的來源檔資訊仍指向先前的檔案）；
+      被刪除列的暫存品管項目：已修改者解除關聯保留、未修改者刪除（temp_items_detached / temp_items_deleted）
+    """
+    if chunk_size is None:
+        chunk_size = settings.BUDGET_IMPORT_CHUNK_SIZE
+
+    # 1) 儲存原始檔案
+    if source_file_id is None:
+        if isinstance(file_bytes, (bytes, bytearray)):
+            file_save = save_file(bytes(file_bytes), filename, "budget/raw", db=db)
+        else:
+            # file-like：分塊寫入儲存區，不整檔讀入記憶體
+            file_save = save_fileobj(file_bytes, filename, "budget/raw", db=db)
+            file_bytes.seek(0)
+        # 明確轉型，確保為 int（防守性作法）
+        source_file_id = int(file_save["file_id"])
+        content_sha256 = file_save["sha256"]
+    else:
+        sf = db.get(StoredFile, source_file_id)
+        content_sha256 = sf.sha256 if sf else None
+
+    warnings: List[str] = []
+    by_type: Counter = Counter()
+    cache_hit = False
+
+    # 本次上傳的參照歸此匯入所有：失敗時釋放；成功後依實際引用調整（見 _release_superseded_files）
+    held_before = _budget_source_files(db, budget_id)
+    try:
+        # 2) 解析結果快取：相同內容 + 相同解析規則 → 直接重放項目，略過 CSV 解析
+        key = parse_cache.cache_key("budget_complex", content_sha256, PARSER_VERSION) if content_sha256 else None
+        entry = parse_cache.lookup(key) if key else None
+        with (parse_cache.writer(key) if (key and entry is None) else nullcontext()) as cache_w:
+            if entry is not None:
+                cache_hit = True
+                records = _rebind_records(entry, budget_id, filename, source_file_id)
+            else:
+                rows = _iter_csv_rows(file_bytes)
+                if not _skip_to_header(rows):
+                    release_file(source_file_id, db)  # 本次上傳未被引用
+                    return {"status": False, "message": "header_not_found"}
+                records = _iter_budget_records(
+                    rows,
+                    budget_id=budget_id,
+                    filename=filename,
+                    source_file_id=source_file_id,
+                    warnings=warnings,
+                )
+                if cache_w is not None:
+                    records = cache_w.tee(records)
+
+            records = _count_types(_fingerprint_records(records), by_type, on_progress, chunk_size)
+            if incremental:
+                written = _apply_incremental(db, budget_id, records, chunk_size)
+            else:
+                # 每 chunk_size 筆一次批次寫入（Postgres 走 COPY）
+                written = bulk_insert_rows(db, BudgetItem, records, batch_size=chunk_size)
+            if entry is not None:
+                warnings = entry.meta.get("warnings", [])
+            elif cache_w is not None:
+                cache_w.finish({"warnings": warnings[:_MAX_WARNINGS]})
+        inserted = written["inserted"]
+        db.commit()
+    except Exception:
+        db.rollback()
+        release_file(source_file_id, db)
+        raise
+    _release_superseded_files(db, budget_id, source_file_id, held_before)
+
+    if incremental:
+        message = (
+            f"inserted {inserted}, updated {written['updated']}, "
+            f"deleted {written['deleted']}, unchanged {written['unchanged']} items"
         )
-        db.add(bi)
-        inserted += 1
-    db.commit()
+        diff = {
+            k: written[k]
+            for k in ("updated", "deleted", "unchanged", "temp_items_detached", "temp_items_deleted")
+        }
+    else:
+        message = f"imported {inserted} items"
+        diff = {}
 
     return {
         "status": True,
-        "message": f"imported {inserted} items",
+        "message": message,
         "budget_id": budget_id,
         "inserted": inserted,
-        "warnings": warnings[:30],
-        "stats": _summarize(items_buffer),
+        **diff,
+        "warnings": warnings[:_MAX_WARNINGS],
+        "stats": _summarize(by_type),
+        "id_ranges": written["id_ranges"],
         # 可選：將來源檔 id 回傳給前端，方便後續提供「下載原檔」功能
-        "source_file_id": source_file_id
+        "source_file_id": source_file_id,
+        "cache_hit": cache_hit,
     }
-    
-def _summarize(items: List[Dict[str, Any]]):
-    from collections import Counter
-    c = Counter([it["type"] for it in items])
+
+def _summarize(by_type: Counter):
+    total = sum(by_type.values())
+    return {
+        "by_type": dict(by_type),
+        "work_ratio": round(by_type.get("work",0)/total, 4) if total else 0
+    }
+
+
+def import_stored_budget(
+    db: Session,
+    file_id: int,
+    filename: str,
+    budget_id: str,
+    *,
+    chunk_size: int | None = None,
+    incremental: bool = False,
+):
+    """
+    由儲存區的檔案匯入（上傳已串流存檔時使用），以檔案 handle 逐列解析。
+    """
+    sf = get_stored_file(file_id, db)
+    if sf is None:
+        return {"status": False, "message": "file not found"}
+    with open(sf.stored_path, "rb") as fh:
+        return import_complex_budget(
+            db, fh, filename, budget_id,
+            chunk_size=chunk_size, source_file_id=file_id, incremental=incremental,
+        )
+
+
+def budget_item_filters(
+    *,
+    hierarchy_code: str | None = None,
+    hierarchy_prefix: str | None = None,
+    source_file_id: int | None = None,
+    is_equipment: bool | None = None,
+) -> list:
+    """
+    BudgetItem.metadata 的篩選條件；鍵值比對合併為一個包含查詢（Postgres 走 metadata GIN 索引），
+    hierarchy_prefix 取階層碼子樹（Postgres 走 text_pattern_ops 運算式索引）。
+    """
+    criteria: Dict[str, Any] = {}
+    if hierarchy_code is not None:
+        criteria["hierarchy_code"] = hierarchy_code
+    if source_file_id is not None:
+        criteria["source_file_id"] = source_file_id
+    if is_equipment is not None:
+        criteria["is_equipment"] = is_equipment
+    conds = [json_contains(BudgetItem.metadata_json, criteria)] if criteria else []
+    if hierarchy_prefix:
+        conds.append(json_text_startswith(BudgetItem.metadata_json, "hierarchy_code", hierarchy_prefix))
+    return conds
+
+
+def _serialize_budget_item(b: BudgetItem) -> dict:
+    meta = b.metadata_json or {}
     return {
-        "by_type": dict(c),
-        "work_ratio": round(c.get("work",0)/len(items), 4) if items else 0
+        "item_id": b.item_id,
+        "name": b.name,
+        "type": b.type,
+        "unit": b.unit,
+        "quantity": b.quantity,
+        "unit_price": b.unit_price,
+        "total_price": b.total_price,
+        "hierarchy_code": meta.get("hierarchy_code"),
+        "source_file_id": meta.get("source_file_id"),
+        "is_equipment": meta.get("is_equipment"),
     }
+
+
+def list_budget_items(
+    db: Session,
+    budget_id: str,
+    *,
+    metadata_filters: Dict[str, Any] | None = None,
+    after_item_id: int | None = None,
+    limit: int | None = None,
+):
+    """
+    預算項目清單（metadata_filters 見 budget_item_filters）；limit 有值時以 item_id keyset 分頁，
+    並附 next_after_item_id（None 代表已到最後一頁）。
+    """
+    stmt = (
+        select(BudgetItem)
+        .where(BudgetItem.budget_id == budget_id, *budget_item_filters(**(metadata_filters or {})))
+        .order_by(BudgetItem.item_id)
+    )
+    if after_item_id is not None:
+        stmt = stmt.where(BudgetItem.item_id > after_item_id)
+    if limit:
+        stmt = stmt.limit(limit)
+    items = db.scalars(stmt).all()
+    result = {"status": True, "budget_id": budget_id, "items": [_serialize_budget_item(b) for b in items]}
+    if limit:
+        result["next_after_item_id"] = items[-1].item_id if len(items) == limit else None
+    return result
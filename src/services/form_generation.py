@@ -4,9 +4,16 @@ from ..models import (
     BudgetItem, QualityStandard, TempStandardFile, TempStandardItem,
     GeneratedForm, BlankTemplate
 )
-from ..core.file_storage import save_file
-import difflib
-import io
+from ..core.bulk_insert import bulk_insert_rows
+from ..core.file_storage import new_storage_path, register_file
+from ..core.fuzzy_index import normalize_name
+from ..core.sqlite_perf import serialized
+from .budget_parser import budget_item_filters
+from .standard_index import get_standard_index
+from sqlalchemy import func, select
+import json
+from typing import AsyncIterator, Iterator
+from sqlalchemy.ext.asyncio import AsyncSession
 from openpyxl import Workbook
 from datetime import datetime
 
@@ -16,91 +23,222 @@ def identify_management_items(db: Session, budget_id: str):
     return {"status": True, "items": items, "message": "ok"}
 
 def search_quality_standards(db: Session, item_type: str, item_name: str, fuzzy: bool = True):
-    q = db.query(QualityStandard).filter(QualityStandard.item_type == item_type).all()
     if not fuzzy:
-        matched = [r for r in q if r.item_name.lower() == item_name.lower()]
+        q = (
+            db.query(QualityStandard)
+            .filter(QualityStandard.item_type == item_type)
+            .filter(func.lower(QualityStandard.item_name) == item_name.lower())
+            .all()
+        )
+        matched = [
+            {"standard_id": r.standard_id, "item_name": r.item_name, "source": r.source, "score": 1.0}
+            for r in q
+        ]
     else:
-        names = [r.item_name for r in q]
-        close = set(difflib.get_close_matches(item_name, names, n=10, cutoff=0.3))
-        matched = [r for r in q if r.item_name in close or item_name.lower() in r.item_name.lower()]
-    return {"status": True, "standards": [
-        {
-            "standard_id": r.standard_id,
-            "item_name": r.item_name,
-            "source": r.source
-        } for r in matched
-    ]}
-
-def create_temp_standards(db: Session, budget_id: str, spec_id: str | None = None):
-    # 取得預算項目
-    b_items = db.query(BudgetItem).filter(BudgetItem.budget_id == budget_id).all()
+        # n-gram 索引（依 item_type 快取）取代每次對全表做 difflib
+        hits = get_standard_index(db, item_type).search(item_name, limit=10, cutoff=0.3)
+        matched = [
+            {
+                "standard_id": h["payload"]["standard_id"],
+                "item_name": h["payload"]["item_name"],
+                "source": h["payload"]["source"],
+                "score": h["score"],
+            }
+            for h in hits
+        ]
+    return {"status": True, "standards": matched}
+
+_STANDARD_FIELDS = (
+    "inspection_items", "inspection_methods", "acceptance_criteria",
+    "frequency", "responsible_party", "notes",
+)
+
+def _match_standards(
+    db: Session, names_by_type: dict[str, set[str]], fuzzy_cutoff: float
+) -> dict[tuple[str, str], tuple[int, str, float]]:
+    """
+    回傳 (item_type, 正規化名稱) → (standard_id, method, score)。
+    1) 正規化名稱 hash 索引精確比對（同名多筆取 standard_id 最小者）
+    2) 未命中者依類別批次交給 n-gram 模糊索引，每個不同名稱只查一次
+    """
+    exact: dict[tuple[str, str], int] = {}
+    rows = db.execute(
+        select(QualityStandard.standard_id, QualityStandard.item_name, QualityStandard.item_type)
+        .where(QualityStandard.item_type.in_(list(names_by_type)))
+        .order_by(QualityStandard.standard_id)
+    )
+    for sid, name, item_type in rows:
+        exact.setdefault((item_type, normalize_name(name)), sid)
+
+    matches: dict[tuple[str, str], tuple[int, str, float]] = {}
+    for item_type, names in names_by_type.items():
+        misses = []
+        for norm in names:
+            sid = exact.get((item_type, norm))
+            if sid is not None:
+                matches[(item_type, norm)] = (sid, "exact", 1.0)
+            else:
+                misses.append(norm)
+        if not misses:
+            continue
+        index = get_standard_index(db, item_type)
+        for norm in misses:
+            hits = index.search(norm, limit=1, cutoff=fuzzy_cutoff)
+            if hits and hits[0]["score"] >= fuzzy_cutoff:
+                matches[(item_type, norm)] = (hits[0]["payload"]["standard_id"], "fuzzy", hits[0]["score"])
+    return matches
+
+@serialized
+def create_temp_standards(
+    db: Session, budget_id: str, spec_id: str | None = None, *, fuzzy_cutoff: float = 0.8
+):
+    # 取得預算項目（只取比對需要的欄位）
+    b_items = db.execute(
+        select(BudgetItem.item_id, BudgetItem.name, BudgetItem.type)
+        .where(BudgetItem.budget_id == budget_id)
+        .order_by(BudgetItem.item_id)
+    ).all()
     tfile = TempStandardFile(budget_id=budget_id, spec_id=spec_id)
     db.add(tfile)
     db.flush()
 
-    # 預設：嘗試匹配同名標準（簡單策略）
-    all_stds = db.query(QualityStandard).all()
-    std_map = {}
-    for s in all_stds:
-        std_map.setdefault(s.item_type, []).append(s)
+    targets = [b for b in b_items if b.type in ("material", "equipment")]
+    names_by_type: dict[str, set[str]] = {}
+    for b in targets:
+        names_by_type.setdefault(b.type, set()).add(normalize_name(b.name))
+    matches = _match_standards(db, names_by_type, fuzzy_cutoff) if targets else {}
 
-    matched_count = 0
-    for b in b_items:
-        if b.type not in ("material", "equipment"):
-            continue
-        candidates = std_map.get(b.type, [])
-        chosen = None
-        for c in candidates:
-            if c.item_name.lower() == b.name.lower():
-                chosen = c
-                break
-        item = TempStandardItem(
-            temp_file_id=tfile.temp_file_id,
-            budget_item_id=b.item_id,
-            item_name=b.name,
-            item_type=b.type,
-            reference_standard_id=chosen.standard_id if chosen else None,
-            inspection_items=chosen.inspection_items if chosen else None,
-            inspection_methods=chosen.inspection_methods if chosen else None,
-            acceptance_criteria=chosen.acceptance_criteria if chosen else None,
-            frequency=chosen.frequency if chosen else None,
-            responsible_party=chosen.responsible_party if chosen else None,
-            notes=chosen.notes if chosen else None
-        )
-        if chosen:
-            matched_count += 1
-        db.add(item)
+    # 只載入實際被選中的標準
+    chosen_ids = {m[0] for m in matches.values()}
+    standards: dict[int, QualityStandard] = {}
+    ids = sorted(chosen_ids)
+    for i in range(0, len(ids), 500):
+        for std in db.query(QualityStandard).filter(QualityStandard.standard_id.in_(ids[i:i + 500])):
+            standards[std.standard_id] = std
+
+    counts = {"exact": 0, "fuzzy": 0}
+
+    def rows():
+        for b in targets:
+            m = matches.get((b.type, normalize_name(b.name)))
+            chosen = standards.get(m[0]) if m else None
+            if chosen:
+                counts[m[1]] += 1
+            rec = {
+                "temp_file_id": tfile.temp_file_id,
+                "budget_item_id": b.item_id,
+                "item_name": b.name,
+                "item_type": b.type,
+                "reference_standard_id": chosen.standard_id if chosen else None,
+                "metadata_json": {
+                    "match_method": m[1] if chosen else None,
+                    "match_score": m[2] if chosen else None,
+                },
+            }
+            for f in _STANDARD_FIELDS:
+                rec[f] = getattr(chosen, f) if chosen else None
+            yield rec
+
+    bulk_insert_rows(db, TempStandardItem, rows())
     db.commit()
     return {
         "status": True,
         "message": "temp created",
         "temp_file_id": tfile.temp_file_id,
         "items_count": len(b_items),
-        "matched_count": matched_count
+        "matched_count": counts["exact"] + counts["fuzzy"],
+        "fuzzy_matched_count": counts["fuzzy"],
     }
 
-def get_temp_standards(db: Session, temp_file_id: int, item_id: int | None = None):
-    q = db.query(TempStandardItem).filter(TempStandardItem.temp_file_id == temp_file_id)
+def _serialize_temp_item(i: TempStandardItem) -> dict:
+    return {
+        "temp_item_id": i.temp_item_id,
+        "budget_item_id": i.budget_item_id,
+        "item_name": i.item_name,
+        "item_type": i.item_type,
+        "reference_standard_id": i.reference_standard_id,
+        "inspection_items": i.inspection_items,
+        "inspection_methods": i.inspection_methods,
+        "acceptance_criteria": i.acceptance_criteria,
+        "frequency": i.frequency,
+        "responsible_party": i.responsible_party,
+        "notes": i.notes,
+        "is_modified": i.is_modified,
+        "last_modified": i.last_modified.isoformat()
+    }
+
+def _temp_items_stmt(temp_file_id: int, after_temp_item_id: int | None, metadata_filters: dict | None = None):
+    # keyset 分頁：以 temp_item_id 遞增排序，從 after_temp_item_id 之後接續
+    stmt = (
+        select(TempStandardItem)
+        .where(TempStandardItem.temp_file_id == temp_file_id)
+        .order_by(TempStandardItem.temp_item_id)
+    )
+    if after_temp_item_id is not None:
+        stmt = stmt.where(TempStandardItem.temp_item_id > after_temp_item_id)
+    conds = budget_item_filters(**(metadata_filters or {}))
+    if conds:
+        # 依對應預算項目的 metadata 篩選（hierarchy_code / source_file_id / is_equipment）
+        stmt = stmt.join(BudgetItem, BudgetItem.item_id == TempStandardItem.budget_item_id).where(*conds)
+    return stmt
+
+def get_temp_standards(
+    db: Session,
+    temp_file_id: int,
+    item_id: int | None = None,
+    *,
+    after_temp_item_id: int | None = None,
+    limit: int | None = None,
+    metadata_filters: dict | None = None,
+):
+    """
+    limit 有值時回傳一頁，並附 next_after_temp_item_id（None 代表已到最後一頁）。
+    metadata_filters：依預算項目 metadata 篩選（見 budget_parser.budget_item_filters）。
+    """
+    stmt = _temp_items_stmt(temp_file_id, after_temp_item_id, metadata_filters)
     if item_id:
-        q = q.filter(TempStandardItem.temp_item_id == item_id)
-    items = q.all()
-    def serialize(i):
-        return {
-            "temp_item_id": i.temp_item_id,
-            "budget_item_id": i.budget_item_id,
-            "item_name": i.item_name,
-            "item_type": i.item_type,
-            "reference_standard_id": i.reference_standard_id,
-            "inspection_items": i.inspection_items,
-            "inspection_methods": i.inspection_methods,
-            "acceptance_criteria": i.acceptance_criteria,
-            "frequency": i.frequency,
-            "responsible_party": i.responsible_party,
-            "notes": i.notes,
-            "is_modified": i.is_modified,
-            "last_modified": i.last_modified.isoformat()
-        }
-    return {"status": True, "standards": [serialize(i) for i in items]}
+        stmt = stmt.where(TempStandardItem.temp_item_id == item_id)
+    if limit:
+        stmt = stmt.limit(limit)
+    items = db.scalars(stmt).all()
+    result = {"status": True, "standards": [_serialize_temp_item(i) for i in items]}
+    if limit:
+        result["next_after_temp_item_id"] = items[-1].temp_item_id if len(items) == limit else None
+    return result
+
+def iter_temp_standards_ndjson(
+    db: Session,
+    temp_file_id: int,
+    *,
+    after_temp_item_id: int | None = None,
+    yield_per: int = 500,
+    metadata_filters: dict | None = None,
+) -> Iterator[str]:
+    """
+    逐筆輸出 NDJSON（每行一個項目）；yield_per 分批取回，不一次載入整個暫存檔。
+    """
+    stmt = _temp_items_stmt(temp_file_id, after_temp_item_id, metadata_filters).execution_options(
+        yield_per=yield_per
+    )
+    for i in db.scalars(stmt):
+        yield json.dumps(_serialize_temp_item(i), ensure_ascii=False) + "\n"
+
+async def aiter_temp_standards_ndjson(
+    db: AsyncSession,
+    temp_file_id: int,
+    *,
+    after_temp_item_id: int | None = None,
+    yield_per: int = 500,
+    metadata_filters: dict | None = None,
+) -> AsyncIterator[str]:
+    """
+    iter_temp_standards_ndjson 的 async 版本（AsyncSession.stream_scalars，分批取回）。
+    """
+    stmt = _temp_items_stmt(temp_file_id, after_temp_item_id, metadata_filters).execution_options(
+        yield_per=yield_per
+    )
+    async for i in await db.stream_scalars(stmt):
+        yield json.dumps(_serialize_temp_item(i), ensure_ascii=False) + "\n"
 
 def update_temp_standard_item(db: Session, temp_item_id: int, updated: dict):
     item = db.query(TempStandardItem).filter_by(temp_item_id=temp_item_id).first()
@@ -113,35 +251,52 @@ def update_temp_standard_item(db: Session, temp_item_id: int, updated: dict):
     db.commit()
     return {"status": True, "message": "updated"}
 
+FORM_HEADERS = ["項目名稱", "類型", "檢驗項目", "檢驗方法", "驗收標準", "頻率", "責任單位", "備註"]
+
+def _form_row(it: TempStandardItem) -> list:
+    return [
+        it.item_name,
+        it.item_type,
+        ", ".join(it.inspection_items or []),
+        ", ".join(it.inspection_methods or []),
+        ", ".join(it.acceptance_criteria or []),
+        it.frequency or "",
+        it.responsible_party or "",
+        it.notes or ""
+    ]
+
+def write_form_xlsx(db: Session, temp_file_id: int, path, *, yield_per: int = 500) -> int:
+    """
+    以 openpyxl write_only 模式逐列寫出 Excel 至 path，項目以 yield_per 分批讀取；
+    工作簿不會整份留在記憶體。回傳寫出的項目數。
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("品質管理標準")
+    ws.append(FORM_HEADERS)
+    stmt = _temp_items_stmt(temp_file_id, None).execution_options(yield_per=yield_per)
+    count = 0
+    for it in db.scalars(stmt):
+        ws.append(_form_row(it))
+        count += 1
+    wb.save(path)
+    return count
+
+@serialized
 def generate_final_form(db: Session, temp_file_id: int, template_id: int, form_name: str):
     tfile = db.query(TempStandardFile).filter_by(temp_file_id=temp_file_id).first()
     tpl = db.query(BlankTemplate).filter_by(template_id=template_id).first()
     if not tfile or not tpl:
         return {"status": False, "message": "temp_file or template not found"}
-    items = db.query(TempStandardItem).filter_by(temp_file_id=temp_file_id).all()
-
-    # 生成 Excel (簡易)
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "品質管理標準"
-    headers = ["項目名稱", "類型", "檢驗項目", "檢驗方法", "驗收標準", "頻率", "責任單位", "備註"]
-    ws.append(headers)
-    for it in items:
-        ws.append([
-            it.item_name,
-            it.item_type,
-            ", ".join(it.inspection_items or []),
-            ", ".join(it.inspection_methods or []),
-            ", ".join(it.acceptance_criteria or []),
-            it.frequency or "",
-            it.responsible_party or "",
-            it.notes or ""
-        ])
-
-    bio = io.BytesIO()
-    wb.save(bio)
-    excel_bytes = bio.getvalue()
-    r = save_file(excel_bytes, f"{form_name}.xlsx", "generated/form", db=db)
+
+    # 生成 Excel（串流直接寫入儲存路徑，不經 BytesIO）
+    filename = f"{form_name}.xlsx"
+    path = new_storage_path(filename)
+    try:
+        rows = write_form_xlsx(db, temp_file_id, path)
+    except Exception:
+        path.unlink(missing_ok=True)
+        raise
+    r = register_file(path, filename, "generated/form", db=db)
 
     gf = GeneratedForm(
         temp_file_id=temp_file_id,
@@ -149,7 +304,7 @@ def generate_final_form(db: Session, temp_file_id: int, template_id: int, form_n
         form_name=form_name,
         file_id=r["file_id"],
         file_format="excel",
-        metadata_json={"generated_at": datetime.utcnow().isoformat()}
+        metadata_json={"generated_at": datetime.utcnow().isoformat(), "rows": rows}
     )
     db.add(gf)
     db.commit()
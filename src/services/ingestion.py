@@ -1,10 +1,63 @@
 # src/services/ingestion.py
+import hashlib
 import io
+import json
+from pathlib import Path
+from contextlib import nullcontext
+from typing import BinaryIO, Iterator
 import pandas as pd
 from sqlalchemy.orm import Session
+from ..config import settings
 from ..models import BudgetItem, SpecificationItem
+from ..core.bulk_insert import bulk_insert_rows, bulk_upsert_rows
+from ..core import parse_cache
+from ..core.file_storage import file_sha256, get_stored_file, release_file
+from ..core.pdf_extract import iter_pdf_pages
 from ..core.llm import get_llm_client
+from ..core.fuzzy_index import normalize_name
+from ..core.sqlite_perf import serialized
 
+# 預期欄位：Name, Type, Unit, Qty, UnitPrice, TotalPrice, Desc（大小寫 / 前後空白不拘）
+_BUDGET_COLUMNS = {
+    "Name": "name",
+    "Type": "type",
+    "Unit": "unit",
+    "Qty": "quantity",
+    "UnitPrice": "unit_price",
+    "TotalPrice": "total_price",
+    "Desc": "description",
+}
+_NUMERIC_FIELDS = ("quantity", "unit_price", "total_price")
+
+def _normalize_budget_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    欄位正規化 + 向量化轉型，回傳以 BudgetItem 屬性命名的 DataFrame（已濾除空白品名）。
+    """
+    by_lower = {str(c).strip().lower(): c for c in df.columns}
+
+    def column(src: str) -> pd.Series:
+        c = by_lower.get(src.lower())
+        if c is None:
+            return pd.Series(pd.NA, index=df.index, dtype="string")
+        return df[c]
+
+    def text(src: str) -> pd.Series:
+        return column(src).astype("string").str.strip()
+
+    out = pd.DataFrame(index=df.index)
+    out["name"] = text("Name")
+    out["type"] = text("Type").replace("", pd.NA).fillna("material")
+    out["unit"] = text("Unit").fillna("")
+    out["description"] = text("Desc").fillna("")
+    for src, field in _BUDGET_COLUMNS.items():
+        if field in _NUMERIC_FIELDS:
+            out[field] = pd.to_numeric(column(src), errors="coerce")
+
+    out = out[out["name"].notna() & (out["name"] != "")]
+    # NaN / <NA> → None，交給 DB 存 NULL
+    return out.astype(object).where(out.notna(), None)
+
+@serialized
 def import_budget_details(db: Session, file_bytes: bytes, file_type: str, budget_id: str):
     if file_type not in ("excel", "csv"):
         return {"status": False, "message": "unsupported file_type"}
@@ -13,26 +66,26 @@ def import_budget_details(db: Session, file_bytes: bytes, file_type: str, budget
     else:
         df = pd.read_csv(io.BytesIO(file_bytes))
 
-    # 預期欄位：Name, Type, Unit, Qty, UnitPrice, Desc (可調整)
-    inserted = 0
-    for _, r in df.iterrows():
-        name = str(r.get("Name") or "").strip()
-        if not name:
-            continue
-        bi = BudgetItem(
-            budget_id=budget_id,
-            name=name,
-            type=str(r.get("Type") or "material"),
-            unit=str(r.get("Unit") or ""),
-            quantity=float(r.get("Qty")) if r.get("Qty") else None,
-            unit_price=float(r.get("UnitPrice")) if r.get("UnitPrice") else None,
-            total_price=float(r.get("TotalPrice")) if r.get("TotalPrice") else None,
-            description=str(r.get("Desc") or "")
-        )
-        db.add(bi)
-        inserted += 1
+    frame = _normalize_budget_frame(df)
+    del df
+    fields = list(frame.columns)
+
+    def rows():
+        for values in frame.itertuples(index=False, name=None):
+            rec = dict(zip(fields, values))
+            rec["budget_id"] = budget_id
+            yield rec
+
+    written = bulk_insert_rows(db, BudgetItem, rows())
+    inserted = written["inserted"]
     db.commit()
-    return {"status": True, "message": f"imported {inserted} items", "budget_id": budget_id}
+    return {
+        "status": True,
+        "message": f"imported {inserted} items",
+        "budget_id": budget_id,
+        "inserted": inserted,
+        "id_ranges": written["id_ranges"],
+    }
 
 def parse_budget_items(db: Session, budget_id: str):
     q = db.query(BudgetItem).filter(BudgetItem.budget_id == budget_id).all()
@@ -45,38 +98,150 @@ def parse_budget_items(db: Session, budget_id: str):
         "equipment": [{"id": e.item_id, "name": e.name} for e in equipment]
     }
 
-def import_technical_specs(db: Session, file_bytes: bytes, file_type: str, spec_id: str):
-    text = ""
+_SPEC_FILE_TYPES = ("txt", "text", "docx", "pdf")
+# 規範解析版本（解析結果快取 key 的一部分）；調整擷取 / 解析流程時請遞增
+SPEC_PARSER_VERSION = "1"
+
+def _iter_spec_text(src: str | Path | BinaryIO, file_type: str, sha256: str | None = None) -> Iterator[str]:
+    """
+    依序產生待解析的文字區塊。PDF 每 PDF_EXTRACT_SHARD_PAGES 頁一塊：
+    頁面平行擷取、依序到達即送去解析，不必等整份文件完成。
+    """
+    if file_type == "pdf":
+        block: list[str] = []
+        for page_text in iter_pdf_pages(src, sha256=sha256):
+            block.append(page_text)
+            if len(block) >= settings.PDF_EXTRACT_SHARD_PAGES:
+                yield "\n".join(block)
+                block = []
+        if block:
+            yield "\n".join(block)
+        return
+    if isinstance(src, (str, Path)):
+        with open(src, "rb") as fh:
+            yield from _iter_spec_text(fh, file_type)
+        return
     if file_type in ("txt", "text"):
-        text = file_bytes.decode("utf-8", errors="ignore")
+        yield src.read().decode("utf-8", errors="ignore")
     elif file_type == "docx":
         import docx
-        f = io.BytesIO(file_bytes)
-        doc = docx.Document(f)
-        text = "\n".join(p.text for p in doc.paragraphs)
-    elif file_type == "pdf":
-        import pdfplumber
-        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-            pages = [p.extract_text() or "" for p in pdf.pages]
-            text = "\n".join(pages)
-    else:
+        doc = docx.Document(src)
+        yield "\n".join(p.text for p in doc.paragraphs)
+
+_SPEC_LIST_FIELDS = ("requirements", "standards", "testing_methods", "acceptance_criteria")
+
+def _merge_continuations(items: Iterator[dict]) -> Iterator[dict]:
+    """
+    文字塊（PDF 分批）開頭未遇到條文標題的內容（continuation）併入上一個條文；
+    因此上一個條文要等到下一個非續接項目出現才送出。
+    """
+    pending: dict | None = None
+    for it in items:
+        if it.get("continuation") and pending is not None:
+            pending["spec"] = (pending.get("spec") or "") + (it.get("spec") or "")
+            for f in _SPEC_LIST_FIELDS:
+                if f in it:
+                    merged = pending.setdefault(f, [])
+                    merged.extend(x for x in it[f] if f != "standards" or x not in merged)
+            continue
+        if pending is not None:
+            yield pending
+        pending = dict(it)
+    if pending is not None:
+        yield pending
+
+def spec_natural_key(spec_id: str, item_name: str | None, requirements: list | None) -> str:
+    """
+    規範項目自然鍵：sha256(spec_id | 正規化品名 | requirements 雜湊)；同一規範重複匯入時據此 upsert。
+    """
+    req = hashlib.sha256(
+        json.dumps(requirements, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    raw = "\x1f".join([spec_id, normalize_name(item_name or ""), req])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+@serialized
+def import_technical_specs(
+    db: Session,
+    file_bytes: bytes | BinaryIO | str | Path,
+    file_type: str,
+    spec_id: str,
+    *,
+    sha256: str | None = None,
+):
+    """
+    file_bytes 可為 bytes、可 seek 的二進位 file-like，或儲存區內的檔案路徑（PDF 可平行擷取）。
+    - sha256：來源檔雜湊（PDF 逐頁快取 / 解析結果快取的 key）；未提供時自行計算
+    """
+    if file_type not in _SPEC_FILE_TYPES:
         return {"status": False, "message": "unsupported file_type"}
+    if isinstance(file_bytes, (bytes, bytearray)):
+        if sha256 is None:
+            sha256 = hashlib.sha256(file_bytes).hexdigest()
+        file_bytes = io.BytesIO(file_bytes)
+    elif sha256 is None:
+        sha256 = file_sha256(file_bytes)
 
     llm = get_llm_client()
-    parsed = llm.parse_text(text, task_type="extract_specs")
-    raw_items = parsed["result"].get("raw_items", [])
-    count = 0
-    for it in raw_items:
-        db.add(SpecificationItem(
-            spec_id=spec_id,
-            item_name=it.get("name"),
-            item_type=None,
-            requirements=[it.get("spec")],
-            standards=None
-        ))
-        count += 1
+    # 解析結果依 LLM provider / model 而異，一併納入 key
+    key = parse_cache.cache_key(
+        "specs", sha256, f"{SPEC_PARSER_VERSION}:{file_type}",
+        provider=llm.provider, model=llm.model, prefilter=llm.prefilter,
+    )
+    entry = parse_cache.lookup(key)
+
+    def parsed_items() -> Iterator[dict]:
+        for text in _iter_spec_text(file_bytes, file_type, sha256):
+            parsed = llm.parse_text(text, task_type="extract_specs")
+            yield from parsed["result"].get("raw_items", [])
+
+    def rows(items: Iterator[dict]) -> Iterator[dict]:
+        for it in _merge_continuations(items):
+            # 規則引擎會直接給出分類欄位；一般 LLM / stub 只有 spec
+            requirements = it["requirements"] if "requirements" in it else [it.get("spec")]
+            yield {
+                "spec_id": spec_id,
+                "item_name": it.get("name"),
+                "item_type": None,
+                "requirements": requirements,
+                "standards": it.get("standards") or None,
+                "testing_methods": it.get("testing_methods") or None,
+                "acceptance_criteria": it.get("acceptance_criteria") or None,
+                "metadata_json": {"clause": it["clause"]} if it.get("clause") else None,
+                "natural_key": spec_natural_key(spec_id, it.get("name"), requirements),
+            }
+
+    with (parse_cache.writer(key) if entry is None else nullcontext()) as cache_w:
+        items = entry if entry is not None else cache_w.tee(parsed_items())
+        # 以自然鍵 upsert：重複匯入同一規範不會產生重複列，每批一次來回
+        count = bulk_upsert_rows(db, SpecificationItem, rows(items), conflict_keys=["natural_key"])["upserted"]
+        if cache_w is not None:
+            cache_w.finish()
     db.commit()
-    return {"status": True, "message": f"parsed {count} spec items", "spec_id": spec_id}
+    return {
+        "status": True,
+        "message": f"parsed {count} spec items",
+        "spec_id": spec_id,
+        "cache_hit": entry is not None,
+    }
+
+def import_stored_specs(db: Session, file_id: int, file_type: str, spec_id: str):
+    """
+    由儲存區的檔案匯入技術規範（以檔案路徑解析，不整檔讀入記憶體；PDF 可平行擷取並使用逐頁快取）。
+    """
+    sf = get_stored_file(file_id, db)
+    if sf is None:
+        return {"status": False, "message": "file not found"}
+    try:
+        r = import_technical_specs(db, sf.stored_path, file_type, spec_id, sha256=sf.sha256)
+    except Exception:
+        db.rollback()
+        release_file(file_id, db)
+        raise
+    if not r["status"]:
+        release_file(file_id, db)  # 本次上傳未被引用
+    r["source_file_id"] = file_id
+    return r
 
 def parse_technical_specs(db: Session, spec_id: str):
     # 已在 import 階段解析，這裡可以再做結構化聚合
@@ -0,0 +1,294 @@
+# src/services/jobs.py
+"""
+背景工作：大檔匯入 / 表單產生改為送出後輪詢，不佔用 request worker 與 DB 連線。
+- 狀態存於 jobs 資料表（僅用本機 DB，不需外部 broker）
+- 執行端為本機 worker pool：預設 ProcessPoolExecutor（spawn，適合 CPU-bound 解析），
+  可用 JOB_EXECUTOR=thread 改為執行緒池
+- worker 以 DB URL 自行建立 session，不共用 request 的 session
+- jobs 表即持久佇列：啟動時 recover_jobs() 將上次行程遺留的 running 標為 failed、queued 重新送出；
+  關機時被取消（尚未開始）的工作標為 failed，輪詢端不會無限等待
+- 進度：SQLite 匯入交易持有寫入鎖，無法另開連線寫進度，未完成的工作 progress 回傳 null（僅 Postgres 有中途進度）
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Callable
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Job, StoredFile
+
+logger = logging.getLogger(__name__)
+
+_EXECUTOR: Executor | None = None
+_EXECUTOR_LOCK = threading.Lock()
+
+# 進度寫入節流（秒）
+_PROGRESS_INTERVAL = 1.0
+
+
+# -----------------------------------------
+# 各類工作實作：handler(db, params, report) -> result dict
+# -----------------------------------------
+def _stored_path(db: Session, file_id: int) -> str:
+    sf = db.get(StoredFile, file_id)
+    if sf is None:
+        raise FileNotFoundError(f"stored file {file_id} not found")
+    return sf.stored_path
+
+
+def _run_budget_import(db: Session, params: dict, report: Callable[[float], None]) -> dict:
+    from . import budget_parser
+
+    path = _stored_path(db, params["file_id"])
+    size = os.path.getsize(path) or 1
+    with open(path, "rb") as fh:
+        # 以檔案讀取位置估算進度
+        r = budget_parser.import_complex_budget(
+            db,
+            fh,
+            params["filename"],
+            params["budget_id"],
+            source_file_id=params["file_id"],
+            on_progress=lambda _rows: report(min(fh.tell() / size, 0.99)),
+            incremental=params.get("incremental", False),
+        )
+    return r
+
+
+def _run_specs_import(db: Session, params: dict, report: Callable[[float], None]) -> dict:
+    from . import ingestion
+
+    return ingestion.import_stored_specs(db, params["file_id"], params["file_type"], params["spec_id"])
+
+
+def _run_generate_form(db: Session, params: dict, report: Callable[[float], None]) -> dict:
+    from . import form_generation
+
+    return form_generation.generate_final_form(
+        db, params["temp_file_id"], params["template_id"], params["form_name"]
+    )
+
+
+JOB_HANDLERS: dict[str, Callable[[Session, dict, Callable[[float], None]], dict]] = {
+    "budget_complex.import": _run_budget_import,
+    "specs.import": _run_specs_import,
+    "form.generate": _run_generate_form,
+}
+
+
+# -----------------------------------------
+# Worker 端
+# -----------------------------------------
+def _worker_session(db_url: str) -> Session:
+    from ..db import get_sessionmaker
+
+    return get_sessionmaker(db_url)()
+
+
+def _update_job(db_url: str, job_id: int, **fields) -> None:
+    db = _worker_session(db_url)
+    try:
+        job = db.get(Job, job_id)
+        for k, v in fields.items():
+            setattr(job, k, v)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _set_status_if(db_url: str, job_id: int, expected: tuple[str, ...], **fields) -> bool:
+    """
+    僅在目前狀態屬於 expected 時更新（條件 UPDATE）；回傳是否有更新。
+    """
+    db = _worker_session(db_url)
+    try:
+        n = db.execute(
+            update(Job).where(Job.job_id == job_id, Job.status.in_(expected)).values(**fields)
+        ).rowcount
+        db.commit()
+        return n == 1
+    finally:
+        db.close()
+
+
+def _make_reporter(db_url: str, job_id: int) -> Callable[[float], None]:
+    # SQLite 僅允許單一寫入者：匯入交易進行中另開連線寫進度會被鎖住，因此只在結束時更新（get_job 回傳 null）
+    if db_url.startswith("sqlite"):
+        return lambda progress: None
+
+    last = [0.0]
+
+    def report(progress: float) -> None:
+        now = time.monotonic()
+        if now - last[0] < _PROGRESS_INTERVAL:
+            return
+        last[0] = now
+        try:
+            _update_job(db_url, job_id, progress=round(progress, 4))
+        except Exception:  # noqa: BLE001  進度回報失敗不影響工作本身
+            logger.warning("job %s progress update failed", job_id, exc_info=True)
+
+    return report
+
+
+def _execute_job(db_url: str, job_id: int) -> None:
+    """
+    worker 入口（需為模組層級函式，供 ProcessPoolExecutor pickle）。
+    以 queued → running 條件更新領取工作；已被領取或已結束（重複送出）時直接略過。
+    """
+    if not _set_status_if(db_url, job_id, ("queued",), status="running", started_at=datetime.utcnow()):
+        logger.info("job %s already claimed, skipping", job_id)
+        return
+    db = _worker_session(db_url)
+    try:
+        job = db.get(Job, job_id)
+        handler = JOB_HANDLERS[job.job_type]
+        result = handler(db, dict(job.params or {}), _make_reporter(db_url, job_id))
+    except Exception as e:  # noqa: BLE001
+        db.rollback()
+        logger.exception("job %s failed", job_id)
+        _update_job(
+            db_url, job_id,
+            status="failed", error=f"{type(e).__name__}: {e}", finished_at=datetime.utcnow(),
+        )
+        return
+    finally:
+        db.close()
+
+    ok = bool(result.get("status", True))
+    # 產出物連結：表單 → GeneratedForm + 產出檔；匯入 → 原始檔
+    fields: dict = {}
+    if "download_file_id" in result:
+        fields["stored_file_id"] = int(result["download_file_id"])
+    elif "source_file_id" in result:
+        fields["stored_file_id"] = int(result["source_file_id"])
+    if "form_id" in result:
+        fields["generated_form_id"] = result["form_id"]
+    if ok:
+        fields["progress"] = 1.0
+    _update_job(
+        db_url, job_id,
+        status="succeeded" if ok else "failed",
+        result=result,
+        error=None if ok else result.get("message"),
+        finished_at=datetime.utcnow(),
+        **fields,
+    )
+
+
+# -----------------------------------------
+# 送出 / 查詢（API 端）
+# -----------------------------------------
+def get_executor() -> Executor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            workers = settings.JOB_MAX_WORKERS
+            if settings.JOB_EXECUTOR == "thread":
+                _EXECUTOR = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+            else:
+                # spawn：避免在多執行緒的 web server 內 fork
+                _EXECUTOR = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                )
+        return _EXECUTOR
+
+
+def shutdown_executor(wait: bool = False) -> None:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=wait, cancel_futures=not wait)
+            _EXECUTOR = None
+
+
+def _on_future_done(db_url: str, job_id: int, fut: Future) -> None:
+    # 關機取消（尚未開始）或 worker 行程異常終止（BrokenProcessPool）：工作不會再更新，標為 failed
+    if fut.cancelled():
+        error = "cancelled: server shutting down"
+    elif fut.exception() is not None:
+        error = f"worker crashed: {type(fut.exception()).__name__}: {fut.exception()}"
+    else:
+        return
+    try:
+        _set_status_if(
+            db_url, job_id, ("queued", "running"),
+            status="failed", error=error, finished_at=datetime.utcnow(),
+        )
+    except Exception:  # noqa: BLE001
+        logger.warning("job %s could not be marked failed", job_id, exc_info=True)
+
+
+def _dispatch(db_url: str, job_id: int) -> None:
+    fut = get_executor().submit(_execute_job, db_url, job_id)
+    fut.add_done_callback(partial(_on_future_done, db_url, job_id))
+
+
+def submit_job(db: Session, job_type: str, params: dict) -> dict:
+    if job_type not in JOB_HANDLERS:
+        return {"status": False, "message": f"unknown job_type: {job_type}"}
+    job = Job(job_type=job_type, status="queued", progress=0.0, params=params)
+    db.add(job)
+    db.commit()
+
+    _dispatch(db.bind.url.render_as_string(hide_password=False), job.job_id)
+    return {"status": True, "job_id": job.job_id, "job_status": job.status}
+
+
+def recover_jobs(db: Session) -> dict:
+    """
+    啟動時處理上次行程遺留的工作（JOB_RECOVER_ON_STARTUP）：
+    - running：執行它的 worker 已隨行程結束 → failed
+    - queued：重新送出（領取為條件更新，重複送出不會重跑）
+    多個 web 行程共用同一資料庫時，請只讓其中一個行程執行（其他行程執行中的工作會被標為 failed）。
+    """
+    now = datetime.utcnow()
+    interrupted = db.execute(
+        update(Job)
+        .where(Job.status == "running")
+        .values(status="failed", error="interrupted: server stopped while running", finished_at=now)
+    ).rowcount
+    db.commit()
+    queued = db.scalars(select(Job.job_id).where(Job.status == "queued").order_by(Job.job_id)).all()
+    db_url = db.bind.url.render_as_string(hide_password=False)
+    for job_id in queued:
+        _dispatch(db_url, job_id)
+    if interrupted or queued:
+        logger.info("recovered jobs: %d interrupted, %d resubmitted", interrupted, len(queued))
+    return {"interrupted": interrupted, "resubmitted": len(queued)}
+
+
+def get_job(db: Session, job_id: int) -> dict:
+    job = db.get(Job, job_id)
+    if job is None:
+        return {"status": False, "message": "not found"}
+    db.refresh(job)
+    progress = job.progress
+    if job.status in ("queued", "running") and db.bind.dialect.name == "sqlite":
+        progress = None  # SQLite 無中途進度（見模組說明）
+    return {
+        "status": True,
+        "job": {
+            "job_id": job.job_id,
+            "job_type": job.job_type,
+            "status": job.status,
+            "progress": progress,
+            "result": job.result,
+            "error": job.error,
+            "stored_file_id": job.stored_file_id,
+            "generated_form_id": job.generated_form_id,
+            "created_at": job.created_at.isoformat(),
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        },
+    }
@@ -1,46 +1,132 @@
 # src/services/reference_data.py
 from sqlalchemy.orm import Session
 from ..models import QualityStandard, BlankTemplate, ReferenceFile
-from ..core.file_storage import save_file
-import difflib
+from ..core.file_storage import release_file, save_file
+from .standard_index import get_standard_index
+from sqlalchemy import func, or_, select, text
 
-def import_reference_data(db: Session, file_bytes: bytes, filename: str, category: str, description: str | None):
-    # 簡化：直接存檔 (原始參考文件)，不做解析
-    r = save_file(file_bytes, filename, "reference/"+category, db=db)
+def import_reference_data(
+    db: Session, file_bytes: bytes | None, filename: str, category: str, description: str | None,
+    *, file_id: int | None = None
+):
+    # 簡化：直接存檔 (原始參考文件)，不做解析；file_id：上傳已串流存檔時傳入，略過重複存檔
+    if file_id is None:
+        file_id = save_file(file_bytes, filename, "reference/"+category, db=db)["file_id"]
     rf = ReferenceFile(
         category=category,
         description=description,
-        file_id=r["file_id"]
+        file_id=file_id,
+        # 去重後 StoredFile 保留第一次上傳的檔名；本次上傳的檔名記錄於此
+        metadata_json={"original_name": filename},
     )
-    db.add(rf)
-    db.commit()
+    try:
+        db.add(rf)
+        db.commit()
+    except Exception:
+        db.rollback()
+        release_file(int(file_id), db)
+        raise
     return {"status": True, "reference_id": rf.id, "message": "uploaded"}
 
-def import_blank_qm_template(db: Session, file_bytes: bytes, filename: str, template_name: str, description: str | None):
-    r = save_file(file_bytes, filename, "template", db=db)
-    tpl = BlankTemplate(template_name=template_name, file_id=r["file_id"], description=description)
-    db.add(tpl)
-    db.commit()
+def import_blank_qm_template(
+    db: Session, file_bytes: bytes | None, filename: str, template_name: str, description: str | None,
+    *, file_id: int | None = None
+):
+    if file_id is None:
+        file_id = save_file(file_bytes, filename, "template", db=db)["file_id"]
+    tpl = BlankTemplate(template_name=template_name, file_id=file_id, description=description)
+    try:
+        db.add(tpl)
+        db.commit()
+    except Exception:
+        # 如 template_name 重複：本次上傳未被引用
+        db.rollback()
+        release_file(int(file_id), db)
+        raise
     return {"status": True, "template_id": tpl.template_id}
 
-def search_reference_data(db: Session, keyword: str | None, category: str | None):
-    q = db.query(QualityStandard)
+# engine url → 是否可用 pg_trgm
+_TRGM_AVAILABLE: dict[str, bool] = {}
+
+def _has_pg_trgm(db: Session) -> bool:
+    bind = db.bind  # 只需方言 / URL；不帶語句的 get_bind() 在讀寫分流 session 中會走主庫
+    if bind.dialect.name != "postgresql":
+        return False
+    key = str(bind.url)
+    if key not in _TRGM_AVAILABLE:
+        _TRGM_AVAILABLE[key] = db.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        ).first() is not None
+    return _TRGM_AVAILABLE[key]
+
+def _escape_like(s: str) -> str:
+    return s.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+def _search_trgm(db: Session, keyword: str, category: str | None, limit: int, cutoff: float):
+    # set_config(..., true)：僅作用於目前交易，讓 % 運算子採用與原本 difflib 相同的門檻
+    db.execute(
+        text("SELECT set_config('pg_trgm.similarity_threshold', :c, true)"),
+        {"c": str(cutoff)},
+    )
+    score = func.similarity(QualityStandard.item_name, keyword)
+    stmt = (
+        select(
+            QualityStandard.standard_id,
+            QualityStandard.item_name,
+            QualityStandard.item_type,
+            QualityStandard.source,
+            score.label("score"),
+        )
+        .where(
+            or_(
+                QualityStandard.item_name.op("%")(keyword),
+                QualityStandard.item_name.ilike(f"%{_escape_like(keyword)}%", escape="/"),
+            )
+        )
+        .order_by(score.desc(), QualityStandard.standard_id)
+        .limit(limit)
+    )
     if category:
-        q = q.filter(QualityStandard.item_type == category)
-    results = q.all()
-    if keyword:
-        # fuzzy filter
-        names = [r.item_name for r in results]
-        matches = set(difflib.get_close_matches(keyword, names, n=20, cutoff=0.2))
-        results = [r for r in results if r.item_name in matches or keyword.lower() in r.item_name.lower()]
-    return {"status": True, "results": [
-        {
-            "standard_id": r.standard_id,
-            "item_name": r.item_name,
-            "item_type": r.item_type,
-            "source": r.source
-        } for r in results
-    ]}
+        stmt = stmt.where(QualityStandard.item_type == category)
+    return [dict(r._mapping) for r in db.execute(stmt)]
+
+def _search_index(db: Session, keyword: str, category: str | None, limit: int, cutoff: float):
+    hits = get_standard_index(db, category).search(keyword, limit=limit, cutoff=cutoff)
+    return [{**h["payload"], "score": h["score"]} for h in hits][:limit]
+
+def search_reference_data(
+    db: Session,
+    keyword: str | None,
+    category: str | None,
+    *,
+    limit: int = 20,
+    cutoff: float = 0.2,
+):
+    """
+    - Postgres 且已安裝 pg_trgm：資料庫端 similarity() / % + LIMIT（走 GIN 索引）
+    - 其他（SQLite 等）：行程內 n-gram 索引
+    未給 keyword 時維持原行為：列出（指定類別的）全部標準。
+    """
+    if not keyword:
+        q = db.query(QualityStandard)
+        if category:
+            q = q.filter(QualityStandard.item_type == category)
+        return {"status": True, "results": [
+            {
+                "standard_id": r.standard_id,
+                "item_name": r.item_name,
+                "item_type": r.item_type,
+                "source": r.source
+            } for r in q.all()
+        ]}
+
+    if _has_pg_trgm(db):
+        results = _search_trgm(db, keyword, category, limit, cutoff)
+        mode = "pg_trgm"
+    else:
+        results = _search_index(db, keyword, category, limit, cutoff)
+        mode = "ngram_index"
+    return {"status": True, "mode": mode, "results": results}
 
 def get_templates(db: Session):
     tpls = db.query(BlankTemplate).all()
@@ -0,0 +1,122 @@
+# src/services/standard_index.py
+"""
+QualityStandard 名稱的模糊索引（依 item_type 分開），惰性建立並快取於行程內。
+失效時機：
+- 本行程透過 ORM 新增 / 修改 / 刪除 QualityStandard（mapper event，flush 時與 commit 後各清除一次，
+  避免其他執行緒在 flush 與 commit 之間以未提交前的資料重建）
+- 本行程的 ORM bulk insert / update / delete（do_orm_execute）
+- 建立超過 STANDARD_INDEX_TTL_SECONDS：涵蓋其他行程或 Core 直接寫入的變更
+查詢本身不再對資料庫做任何檢查。
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from ..config import settings
+from ..core.fuzzy_index import NgramIndex
+from ..models import QualityStandard
+
+# key: (engine url, item_type | None) → (建立時間 monotonic, index)
+_INDEXES: dict[tuple[str, str | None], tuple[float, NgramIndex]] = {}
+_LOCK = threading.Lock()
+_CHANGED = "standard_index_changed"  # Session.info 旗標
+
+
+def _type_filter(stmt, item_type: str | None):
+    if item_type is not None:
+        stmt = stmt.where(QualityStandard.item_type == item_type)
+    return stmt
+
+
+def _fresh(built_at: float) -> bool:
+    ttl = settings.STANDARD_INDEX_TTL_SECONDS
+    return ttl <= 0 or time.monotonic() - built_at < ttl
+
+
+def _build(db: Session, item_type: str | None) -> NgramIndex:
+    index = NgramIndex()
+    stmt = _type_filter(
+        select(
+            QualityStandard.standard_id,
+            QualityStandard.item_name,
+            QualityStandard.item_type,
+            QualityStandard.source,
+        ),
+        item_type,
+    )
+    for row in db.execute(stmt):
+        index.add(
+            row.item_name,
+            {
+                "standard_id": row.standard_id,
+                "item_name": row.item_name,
+                "item_type": row.item_type,
+                "source": row.source,
+            },
+        )
+    return index
+
+
+def get_standard_index(db: Session, item_type: str | None) -> NgramIndex:
+    """
+    取得（必要時重建）指定 item_type 的索引；item_type=None 代表全部類別。
+    """
+    # db.bind：不帶語句的 get_bind() 在讀寫分流 session 中會走主庫
+    key = (str(db.bind.url), item_type)
+    with _LOCK:
+        cached = _INDEXES.get(key)
+        if cached and _fresh(cached[0]):
+            return cached[1]
+    built_at = time.monotonic()  # 取讀取前的時間，TTL 不會多算建立所花的時間
+    index = _build(db, item_type)
+    with _LOCK:
+        _INDEXES[key] = (built_at, index)
+    return index
+
+
+def invalidate_standard_index(item_type: str | None = None) -> None:
+    """
+    使索引失效；item_type=None 時清除全部。全類別索引（key 為 None）一併清除。
+    """
+    with _LOCK:
+        for key in list(_INDEXES):
+            if item_type is None or key[1] in (item_type, None):
+                del _INDEXES[key]
+
+
+@event.listens_for(QualityStandard, "after_insert")
+@event.listens_for(QualityStandard, "after_update")
+@event.listens_for(QualityStandard, "after_delete")
+def _on_standard_changed(mapper, connection, target) -> None:
+    # 修改可能變更 item_type，保守起見全部清除
+    invalidate_standard_index(None)
+    session = object_session(target)
+    if session is not None:
+        session.info[_CHANGED] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_orm_execute(state) -> None:
+    # ORM bulk insert / update / delete（session.execute(update(QualityStandard)...)）不觸發 mapper event
+    if (state.is_insert or state.is_update or state.is_delete) and any(
+        m.class_ is QualityStandard for m in state.all_mappers
+    ):
+        invalidate_standard_index(None)
+        state.session.info[_CHANGED] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session: Session) -> None:
+    if session.info.pop(_CHANGED, False):
+        invalidate_standard_index(None)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _on_rollback(session: Session, previous_transaction) -> None:
+    # 未提交的變更已被 flush 時清除過；回復後再清一次，避免留下含未提交資料的索引
+    if session.info.pop(_CHANGED, False):
+        invalidate_standard_index(None)
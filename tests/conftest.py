@@ -4,7 +4,8 @@ import pytest
 from alembic import command
 from alembic.config import Config
 
-from src.db import reset_engine_for_test, SessionLocal  # 你原本就有的
+import src.db as db_module
+from src.db import reset_engine_for_test  # 你原本就有的
 
 # 專案根 = tests 上一層
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
@@ -49,19 +50,45 @@ def migrate():
     yield
     # (可選) 測試後若是 sqlite file，可清除
     if db_url.startswith("sqlite:///./test.sqlite"):
-        try:
-            Path("test.sqlite").unlink()
-        except OSError:
-            pass
+        # WAL 模式另有 -wal / -shm，寫入佇列另有 .writelock
+        db_module.dispose_engine_on_shutdown()
+        for name in ("test.sqlite", "test.sqlite-wal", "test.sqlite-shm", "test.sqlite.writelock"):
+            try:
+                Path(name).unlink()
+            except OSError:
+                pass
 
 @pytest.fixture
 def db_session():
     """
     每個測試獨立 session；測試後 rollback & close。
     """
-    session = SessionLocal()
+    # reset_engine_for_test 會重綁 SessionLocal，需於呼叫時再取
+    session = db_module.SessionLocal()
     try:
         yield session
         session.rollback()
     finally:
         session.close()
+
+@pytest.fixture
+def storage_root(tmp_path, monkeypatch):
+    """
+    將檔案儲存根目錄導向暫存資料夾，避免測試寫入 data/files。
+    """
+    from src.config import settings
+    monkeypatch.setattr(settings, "FILE_STORAGE_ROOT", str(tmp_path / "files"))
+    return tmp_path / "files"
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """
+    PDF 逐頁快取、解析結果快取與 LLM 回應快取導向暫存資料夾，避免測試之間互相命中或寫入 data/cache。
+    """
+    from src.config import settings
+    from src.core import llm, parse_cache
+    monkeypatch.setattr(settings, "PDF_PAGE_CACHE_DIR", str(tmp_path / "cache" / "pdf_pages"))
+    monkeypatch.setattr(settings, "PARSE_CACHE_DIR", str(tmp_path / "cache" / "parse"))
+    monkeypatch.setattr(settings, "LLM_CACHE_PATH", str(tmp_path / "cache" / "llm_cache.sqlite3"))
+    monkeypatch.setattr(llm, "_llm_client", None)  # 依上述設定重建 LLM client（含回應快取）
+    parse_cache.reset_stats()
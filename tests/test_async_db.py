@@ -0,0 +1,65 @@
+import asyncio
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import src.db as db_module
+from src.main import app
+from src.models import BudgetItem, QualityStandard, SpecificationItem, TempStandardFile, TempStandardItem
+
+
+def test_to_async_url():
+    assert db_module.to_async_url("postgresql+psycopg2://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert db_module.to_async_url("sqlite:///./x.db") == "sqlite+aiosqlite:///./x.db"
+    assert db_module.to_async_url("postgresql+asyncpg://h/db") == "postgresql+asyncpg://h/db"
+
+
+def test_async_engine_follows_sync_engine_and_reset():
+    sync_url = db_module.get_engine().url
+    engine = db_module.get_async_engine()
+    assert engine.url.database == sync_url.database
+    assert engine.url.drivername == "sqlite+aiosqlite"
+    assert db_module.get_async_engine() is engine
+
+    async def select_one():
+        async with db_module.get_async_sessionmaker()() as s:
+            return (await s.execute(text("SELECT 1"))).scalar()
+
+    assert asyncio.run(select_one()) == 1
+
+    db_module.reset_engine_for_test(sync_url.render_as_string(hide_password=False))
+    assert db_module.get_async_engine() is not engine
+
+
+def test_read_routes_on_async_session(db_session):
+    suffix = uuid.uuid4().hex[:8]
+    budget_id, spec_id = f"AS-{suffix}", f"ASPEC-{suffix}"
+    items = [
+        BudgetItem(budget_id=budget_id, name=f"電纜{suffix}", type="material"),
+        BudgetItem(budget_id=budget_id, name="安裝", type="work"),
+    ]
+    db_session.add_all(items)
+    db_session.add(QualityStandard(item_name=f"電纜{suffix}", item_type=f"cat-{suffix}"))
+    db_session.add(SpecificationItem(spec_id=spec_id, item_name="電纜", requirements=["CNS 679"]))
+    tf = TempStandardFile(budget_id=budget_id)
+    db_session.add(tf)
+    db_session.flush()
+    db_session.add_all([
+        TempStandardItem(temp_file_id=tf.temp_file_id, budget_item_id=b.item_id, item_name=b.name, item_type=b.type)
+        for b in items
+    ])
+    db_session.commit()
+    client = TestClient(app)
+
+    r = client.get(f"/form/identify/{budget_id}").json()
+    assert [i["name"] for i in r["items"]] == [f"電纜{suffix}"]
+
+    r = client.get(f"/form/temp/{tf.temp_file_id}", params={"limit": 1}).json()
+    assert len(r["standards"]) == 1 and r["next_after_temp_item_id"] is not None
+
+    r = client.get("/reference/search", params={"keyword": f"電纜{suffix}", "category": f"cat-{suffix}"}).json()
+    assert r["results"][0]["item_name"] == f"電纜{suffix}"
+
+    r = client.get(f"/specs/{spec_id}/parsed").json()
+    assert r["specs_data"][0]["requirements"] == ["CNS 679"]
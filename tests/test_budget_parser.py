@@ -0,0 +1,164 @@
+import hashlib
+import uuid
+
+from src.models import BudgetItem, StoredFile, TempStandardFile, TempStandardItem
+from src.services import budget_parser
+
+SAMPLE_CSV = """工程名稱,測試工程,,,,,
+項 次,項目及說明,單位,數量,單價,複價,編碼
+壹,發包工程費,,,,,
+一,監視系統,,,,,
+1,智慧影像攝影機,台,4,12000,48000,#A001
+,含支架及配件,,,,,
+2,光纜,M,300,50,15000,#B002
+,,,,,,
+3,攝影機安裝測試,式,1,8000,8000,#C003
+,小計,,,,71000,
+二,資訊設備,,,,,
+1,伺服器,台,x,90000,90000,#D004
+"""
+
+
+def _budget_id():
+    return f"T-{uuid.uuid4().hex[:8]}"
+
+
+def test_import_complex_budget_streaming(db_session, storage_root):
+    budget_id = _budget_id()
+    r = budget_parser.import_complex_budget(
+        db_session, SAMPLE_CSV.encode("utf-8"), "budget.csv", budget_id, chunk_size=2
+    )
+    assert r["status"] is True
+    assert r["inserted"] == 4
+    assert r["stats"]["by_type"] == {"equipment": 2, "material": 1, "work": 1}
+    assert r["warnings"] == ["quantity_parse_fail:1:伺服器"]
+
+    items = (
+        db_session.query(BudgetItem)
+        .filter(BudgetItem.budget_id == budget_id)
+        .order_by(BudgetItem.item_id)
+        .all()
+    )
+    assert [i.name for i in items] == ["智慧影像攝影機含支架及配件", "光纜", "攝影機安裝測試", "伺服器"]
+    assert items[0].metadata_json["merged_segments"] == ["智慧影像攝影機", "含支架及配件"]
+    assert items[0].metadata_json["raw_name"] == "智慧影像攝影機"
+    assert items[0].metadata_json["source_file_id"] == r["source_file_id"]
+    assert items[3].quantity is None
+
+
+def test_import_complex_budget_accepts_file_like(db_session, storage_root):
+    import io
+
+    budget_id = _budget_id()
+    r = budget_parser.import_complex_budget(
+        db_session, io.BytesIO(SAMPLE_CSV.encode("utf-8")), "budget.csv", budget_id
+    )
+    assert r["inserted"] == 4
+
+
+def test_import_complex_budget_header_not_found(db_session, storage_root):
+    data = f"a,b,c\n1,2,{uuid.uuid4().hex}\n".encode()
+    r = budget_parser.import_complex_budget(db_session, data, "x.csv", _budget_id())
+    assert r == {"status": False, "message": "header_not_found"}
+    # 未被任何預算項目引用的上傳檔即釋放
+    assert db_session.query(StoredFile).filter_by(sha256=hashlib.sha256(data).hexdigest()).count() == 0
+
+
+def _items(db_session, budget_id):
+    return {
+        i.name: i
+        for i in db_session.query(BudgetItem).filter(BudgetItem.budget_id == budget_id)
+    }
+
+
+def test_incremental_reimport_applies_only_the_diff(db_session, storage_root):
+    budget_id = _budget_id()
+    budget_parser.import_complex_budget(db_session, SAMPLE_CSV.encode("utf-8"), "v1.csv", budget_id)
+    before = _items(db_session, budget_id)
+
+    # 暫存品管項目引用即將被刪除的「伺服器」：一筆已人工修改、一筆未修改
+    tf = TempStandardFile(budget_id=budget_id)
+    db_session.add(tf)
+    db_session.flush()
+    edited = TempStandardItem(
+        temp_file_id=tf.temp_file_id, budget_item_id=before["伺服器"].item_id,
+        item_name="伺服器", item_type="equipment", is_modified=True, notes="審查意見",
+    )
+    db_session.add_all([edited, TempStandardItem(
+        temp_file_id=tf.temp_file_id, budget_item_id=before["伺服器"].item_id,
+        item_name="伺服器", item_type="equipment",
+    )])
+    db_session.commit()
+
+    v2 = (
+        SAMPLE_CSV.replace("2,光纜,M,300,50,15000", "2,光纜,M,350,50,17500")
+        .replace("1,伺服器,台,x,90000,90000,#D004\n", "2,交換器,台,2,30000,60000,#E005\n")
+    )
+    r = budget_parser.import_complex_budget(
+        db_session, v2.encode("utf-8"), "v2.csv", budget_id, incremental=True, chunk_size=2
+    )
+    assert (r["inserted"], r["updated"], r["deleted"], r["unchanged"]) == (1, 1, 1, 2)
+    assert (r["temp_items_detached"], r["temp_items_deleted"]) == (1, 1)
+
+    db_session.expire_all()
+    after = _items(db_session, budget_id)
+    assert set(after) == {"智慧影像攝影機含支架及配件", "光纜", "攝影機安裝測試", "交換器"}
+    # 未變動與更新的項目保留原 item_id
+    for name in ("智慧影像攝影機含支架及配件", "光纜", "攝影機安裝測試"):
+        assert after[name].item_id == before[name].item_id
+    assert after["光纜"].quantity == 350
+    # 已修改的暫存項目保留（解除關聯），未修改者刪除
+    kept = db_session.query(TempStandardItem).filter_by(temp_file_id=tf.temp_file_id).all()
+    assert [(i.temp_item_id, i.budget_item_id, i.notes) for i in kept] == [(edited.temp_item_id, None, "審查意見")]
+
+    # 相同內容再匯入一次：不寫入任何列
+    r = budget_parser.import_complex_budget(db_session, v2.encode("utf-8"), "v2.csv", budget_id, incremental=True)
+    assert (r["inserted"], r["updated"], r["deleted"], r["unchanged"]) == (0, 0, 0, 4)
+
+
+def test_incremental_reimport_collapses_duplicate_and_legacy_rows(db_session, storage_root):
+    budget_id = _budget_id()
+    data = SAMPLE_CSV.encode("utf-8")
+    budget_parser.import_complex_budget(db_session, data, "a.csv", budget_id)
+    budget_parser.import_complex_budget(db_session, data, "a.csv", budget_id)
+    # 模擬舊版匯入（沒有 row_key / row_hash）
+    db_session.query(BudgetItem).filter_by(budget_id=budget_id).update({"row_key": None, "row_hash": None})
+    db_session.commit()
+
+    r = budget_parser.import_complex_budget(db_session, data, "a.csv", budget_id, incremental=True)
+    assert (r["inserted"], r["deleted"]) == (0, 4)
+    # 舊列命中時回填 row_key / row_hash
+    assert r["updated"] == 4
+    rows = db_session.query(BudgetItem).filter_by(budget_id=budget_id).all()
+    assert len(rows) == 4 and all(i.row_key and i.row_hash for i in rows)
+
+
+def test_classify_type_precedence():
+    # 安裝類優先於設備；設備優先於材料（配線機櫃同時含「配線」與「機櫃」）
+    assert budget_parser.classify_type("攝影機安裝") == "work"
+    assert budget_parser.classify_type("配線機櫃") == "equipment"
+    assert budget_parser.classify_type("電纜托架") == "material"
+    assert budget_parser.classify_type("其他雜項") == "material"
+
+
+def test_ignore_keywords_match_nbsp_variant():
+    assert budget_parser._is_ignored("小計")
+    assert budget_parser._is_ignored("合　計") is False
+    assert budget_parser._is_ignored("計\xa0")
+
+
+def test_reimport_releases_superseded_source_files(db_session, storage_root):
+    budget_id = _budget_id()
+    v1 = SAMPLE_CSV.replace("測試工程", f"測試工程{budget_id}").encode("utf-8")
+    r1 = budget_parser.import_complex_budget(db_session, v1, "v1.csv", budget_id)
+    # 同內容再匯入同一預算：檔案參照數不累加
+    budget_parser.import_complex_budget(db_session, v1, "v1.csv", budget_id, incremental=True)
+    assert db_session.get(StoredFile, r1["source_file_id"]).ref_count == 1
+
+    v2 = "項 次,項目及說明,單位,數量,單價,複價,編碼\n1,路由器,台,1,5000,5000,#R001\n".encode("utf-8")
+    r2 = budget_parser.import_complex_budget(db_session, v2, "v2.csv", budget_id, incremental=True)
+    assert r2["deleted"] == 4
+    # 舊版原始檔已無列引用：釋放並刪除
+    db_session.expire_all()
+    assert db_session.get(StoredFile, r1["source_file_id"]) is None
+    assert db_session.get(StoredFile, r2["source_file_id"]).ref_count == 1
@@ -0,0 +1,69 @@
+import uuid
+from datetime import datetime
+
+from src.core import bulk_insert
+from src.models import BudgetItem, SpecificationItem
+
+
+def _rows(budget_id, n):
+    for i in range(n):
+        yield {
+            "budget_id": budget_id,
+            "name": f"item-{i}",
+            "type": "material",
+            "quantity": float(i),
+            "metadata_json": {"seq": i},
+        }
+
+
+def test_bulk_insert_rows_batches_and_returns_id_ranges(db_session):
+    budget_id = f"BULK-{uuid.uuid4().hex[:8]}"
+    r = bulk_insert.bulk_insert_rows(
+        db_session, BudgetItem, _rows(budget_id, 25), batch_size=10
+    )
+    assert r["inserted"] == 25
+    first, last = r["id_ranges"][0]
+    assert last - first == 24 and len(r["id_ranges"]) == 1
+
+    items = db_session.query(BudgetItem).filter_by(budget_id=budget_id).order_by(BudgetItem.item_id).all()
+    assert [i.item_id for i in items] == list(range(first, last + 1))
+    assert items[3].metadata_json == {"seq": 3}
+
+
+def test_bulk_insert_rows_empty(db_session):
+    assert bulk_insert.bulk_insert_rows(db_session, BudgetItem, []) == {"inserted": 0, "id_ranges": []}
+
+
+def test_id_ranges_compacts_gaps():
+    assert bulk_insert._id_ranges([5, 1, 2, 3, 7, 8]) == [[1, 3], [5, 5], [7, 8]]
+    assert bulk_insert._merge_ranges([[4, 6], [1, 3], [10, 11]]) == [[1, 6], [10, 11]]
+
+
+def test_copy_line_escapes_and_nulls():
+    line = bulk_insert._copy_line(
+        [1, None, True, "a\tb\\c\nd", {"k": "值"}, datetime(2025, 1, 2, 3, 4, 5)]
+    )
+    assert line == '1\t\\N\tt\ta\\tb\\\\c\\nd\t{"k": "值"}\t2025-01-02 03:04:05\n'
+
+
+def test_bulk_upsert_rows_updates_and_dedupes_within_batch(db_session):
+    spec_id = f"UPS-{uuid.uuid4().hex[:8]}"
+
+    def rows(suffix):
+        for i in range(5):
+            yield {"spec_id": spec_id, "item_name": f"n{i}{suffix}", "natural_key": f"{spec_id}-{i}",
+                   "metadata_json": {"v": suffix}}
+
+    assert bulk_insert.bulk_upsert_rows(
+        db_session, SpecificationItem, rows("a"), conflict_keys=["natural_key"], batch_size=2
+    ) == {"upserted": 5}
+    # 同一批內重複的鍵：後者為準
+    dup = [{"spec_id": spec_id, "item_name": "x", "natural_key": f"{spec_id}-0", "metadata_json": {"v": "x"}},
+           {"spec_id": spec_id, "item_name": "y", "natural_key": f"{spec_id}-0", "metadata_json": {"v": "y"}}]
+    bulk_insert.bulk_upsert_rows(db_session, SpecificationItem, list(rows("b")) + dup, conflict_keys=["natural_key"])
+    db_session.commit()
+
+    items = {i.natural_key: i for i in db_session.query(SpecificationItem).filter_by(spec_id=spec_id)}
+    assert len(items) == 5
+    assert items[f"{spec_id}-0"].item_name == "y"
+    assert items[f"{spec_id}-3"].metadata_json == {"v": "b"}
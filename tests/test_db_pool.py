@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc as sa_exc, text
+
+from src.core.db_pool import InstrumentedQueuePool, instrument_pool, pool_status, resolve_pool_options
+from src.main import app
+
+
+def _settings(**kw):
+    base = {"APP_ENV": "dev", "DB_POOL_PROFILE": "", "DB_POOL_SIZE": None, "DB_MAX_OVERFLOW": None,
+            "DB_POOL_TIMEOUT": None, "DB_POOL_RECYCLE": None, "DB_POOL_PRE_PING": None}
+    return SimpleNamespace(**{**base, **kw})
+
+
+def test_resolve_pool_options_profiles_and_overrides():
+    assert resolve_pool_options(_settings())["pool_pre_ping"] is True
+    prod = resolve_pool_options(_settings(APP_ENV="production"))
+    assert prod["pool_pre_ping"] is False and prod["pool_recycle"] > 0
+    # 個別設定覆蓋 profile；DB_POOL_PROFILE 優先於 APP_ENV
+    opts = resolve_pool_options(_settings(APP_ENV="dev", DB_POOL_PROFILE="prod", DB_POOL_SIZE=3))
+    assert opts["pool_size"] == 3 and opts["max_overflow"] == 20
+
+
+def test_instrumented_pool_records_overflow_timeouts_and_invalidations(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.sqlite'}",
+        poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=1, pool_timeout=0.05,
+    )
+    instrument_pool(engine.pool)
+    c1 = engine.connect()
+    c2 = engine.connect()  # overflow
+    with pytest.raises(sa_exc.TimeoutError):
+        engine.connect()
+    c2.invalidate()
+    c2.close()
+    c1.execute(text("SELECT 1"))
+    c1.close()
+
+    st = pool_status(engine)
+    assert st["checkouts"] == 2 and st["overflow_checkouts"] == 1 and st["overflow_peak"] == 1
+    assert st["timeouts"] == 1
+    assert st["invalidations"] == 1
+    assert st["checked_out"] == 0
+    # dispose() 重建連線池後沿用同一組計數
+    engine.dispose()
+    assert pool_status(engine)["checkouts"] == 2
+
+
+def test_debug_db_pool_endpoint(db_session):
+    resp = TestClient(app).get("/debug/db_pool")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert "checkouts" in body and "wait_ms" in body
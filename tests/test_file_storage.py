@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import io
+import os
+import uuid
+
+from src.core import file_storage
+from src.models import StoredFile
+
+
+class _AsyncSource:
+    """模擬 UploadFile：僅提供 async read(n)，並記錄每次讀取的大小。"""
+
+    def __init__(self, data: bytes):
+        self._buf = io.BytesIO(data)
+        self.reads: list[int] = []
+
+    async def read(self, n: int = -1) -> bytes:
+        self.reads.append(n)
+        return self._buf.read(n)
+
+
+def test_save_file_content_addressed_and_deduplicated(db_session, storage_root):
+    data = f"budget {uuid.uuid4().hex}\n".encode() * 100
+    sha = hashlib.sha256(data).hexdigest()
+
+    r1 = file_storage.save_file(data, "a.csv", "budget/raw", db=db_session)
+    assert r1["sha256"] == sha and r1["deduplicated"] is False
+    assert r1["path"] == str(storage_root / sha[:2] / sha[2:4] / f"{sha}.csv")
+
+    r2 = file_storage.save_file(data, "b.csv", "budget/raw", db=db_session)
+    assert r2["file_id"] == r1["file_id"] and r2["deduplicated"] is True
+    sf = db_session.get(StoredFile, r1["file_id"])
+    assert sf.ref_count == 2 and sf.size_bytes == len(data)
+    # 暫存檔皆已搬移或清除
+    assert os.listdir(storage_root / ".tmp") == []
+
+    assert file_storage.release_file(r1["file_id"], db_session) is False
+    assert file_storage.release_file(r1["file_id"], db_session) is True
+    assert not os.path.exists(r1["path"])
+
+
+def test_save_stream_reads_in_chunks(db_session, storage_root, monkeypatch):
+    from src.config import settings
+
+    monkeypatch.setattr(settings, "FILE_STORAGE_CHUNK_SIZE", 1024)
+    data = os.urandom(5000)
+    src = _AsyncSource(data)
+    r = asyncio.run(file_storage.save_stream(src, "spec.pdf", "spec/raw", db=db_session))
+
+    assert src.reads and all(n == 1024 for n in src.reads)
+    assert r["sha256"] == hashlib.sha256(data).hexdigest()
+    with open(r["path"], "rb") as f:
+        assert f.read() == data
+
+
+def test_missing_blob_is_restored_on_reupload(db_session, storage_root):
+    data = os.urandom(256)
+    r1 = file_storage.save_file(data, "x.bin", "misc", db=db_session)
+    os.remove(r1["path"])
+    r2 = file_storage.save_file(data, "x.bin", "misc", db=db_session)
+    assert r2["file_id"] == r1["file_id"]
+    sf, content = file_storage.read_file(r2["file_id"], db_session)
+    assert content == data
+
+
+def test_concurrent_insert_conflict_keeps_caller_changes(db_session, storage_root, monkeypatch):
+    from src import db as db_module
+    from src.models import BudgetItem
+
+    data = os.urandom(512)
+    sha = hashlib.sha256(data).hexdigest()
+    real_replace = os.replace
+
+    def racing_replace(src, dst):
+        # 模擬另一個上傳者在查重之後、insert 之前先提交了相同內容
+        real_replace(src, dst)
+        with db_module.SessionLocal() as other:
+            other.add(StoredFile(original_name="other.bin", stored_path=str(dst), mime_type="misc",
+                                 size_bytes=len(data), sha256=sha, ref_count=1))
+            other.commit()
+
+    monkeypatch.setattr(file_storage.os, "replace", racing_replace)
+    budget_id = f"FS-{uuid.uuid4().hex[:8]}"
+    with db_session.no_autoflush:
+        db_session.add(BudgetItem(budget_id=budget_id, name="pending", type="material"))
+        r = file_storage.save_file(data, "mine.bin", "misc", db=db_session)
+
+    assert r["deduplicated"] is True
+    assert db_session.get(StoredFile, r["file_id"]).ref_count == 2
+    # SAVEPOINT 只回復衝突的 insert，呼叫端先前的變更仍被提交
+    assert db_session.query(BudgetItem).filter_by(budget_id=budget_id).count() == 1
+
+
+def test_release_racing_reupload_keeps_row_and_blob(db_session, storage_root, monkeypatch):
+    from sqlalchemy import text
+
+    r = file_storage.save_file(os.urandom(128), "a.bin", "misc", db=db_session)
+    real_select = file_storage.select
+    raced = []
+
+    def racing_select(*cols):
+        # release 判斷「只剩一個參照」之後、刪除之前，另一次上傳遞增了參照數
+        if not raced:
+            raced.append(True)
+            db_session.execute(
+                text("UPDATE stored_files SET ref_count = ref_count + 1 WHERE file_id = :id"), {"id": r["file_id"]}
+            )
+        return real_select(*cols)
+
+    monkeypatch.setattr(file_storage, "select", racing_select)
+    assert file_storage.release_file(r["file_id"], db_session) is False
+    db_session.expire_all()
+    assert db_session.get(StoredFile, r["file_id"]).ref_count == 1
+    assert os.path.exists(r["path"])
+
+
+def test_dedup_racing_release_recreates_record(db_session, storage_root, monkeypatch):
+    from sqlalchemy import delete
+
+    data = os.urandom(128)
+    r1 = file_storage.save_file(data, "a.bin", "misc", db=db_session)
+    real_exists = file_storage.os.path.exists
+    raced = []
+
+    def racing_exists(path):
+        # 查到既有紀錄之後、遞增之前，該紀錄被另一方 release 刪除
+        if path == r1["path"] and not raced:
+            raced.append(True)
+            db_session.execute(delete(StoredFile).where(StoredFile.file_id == r1["file_id"]))
+            os.remove(path)
+        return real_exists(path)
+
+    monkeypatch.setattr(file_storage.os.path, "exists", racing_exists)
+    r2 = file_storage.save_file(data, "b.bin", "misc", db=db_session)
+    assert raced and r2["deduplicated"] is False
+    sf, content = file_storage.read_file(r2["file_id"], db_session)
+    assert sf.ref_count == 1 and content == data
@@ -0,0 +1,81 @@
+import os
+
+from fastapi.testclient import TestClient
+
+from src.core import file_storage
+from src.main import app
+
+
+def _stored(db_session, data: bytes, name: str = "來源預算.csv") -> dict:
+    return file_storage.save_file(data, name, "budget/raw", db=db_session)
+
+
+def test_download_full_with_etag_and_304(db_session, storage_root):
+    data = os.urandom(10_000)
+    r = _stored(db_session, data)
+    client = TestClient(app)
+
+    resp = client.get(f"/files/{r['file_id']}")
+    assert resp.status_code == 200
+    assert resp.content == data
+    assert resp.headers["etag"] == f'"{r["sha256"]}"'
+    assert resp.headers["accept-ranges"] == "bytes"
+    assert "filename*=utf-8''" in resp.headers["content-disposition"]
+
+    resp = client.get(f"/files/{r['file_id']}", headers={"If-None-Match": resp.headers["etag"]})
+    assert resp.status_code == 304
+
+
+def test_download_ranges(db_session, storage_root):
+    data = os.urandom(4096)
+    r = _stored(db_session, data, "a.bin")
+    client = TestClient(app)
+    url = f"/files/{r['file_id']}"
+
+    resp = client.get(url, headers={"Range": "bytes=100-199"})
+    assert resp.status_code == 206
+    assert resp.content == data[100:200]
+    assert resp.headers["content-range"] == "bytes 100-199/4096"
+
+    resp = client.get(url, headers={"Range": "bytes=-10"})
+    assert resp.status_code == 206 and resp.content == data[-10:]
+
+    resp = client.get(url, headers={"Range": "bytes=4000-"})
+    assert resp.status_code == 206 and resp.content == data[4000:]
+
+    resp = client.get(url, headers={"Range": "bytes=5000-6000"})
+    assert resp.status_code == 416
+    assert resp.headers["content-range"] == "bytes */4096"
+
+    # If-Range 與 ETag 不符 → 回完整內容
+    resp = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert resp.status_code == 200 and resp.content == data
+
+
+def test_download_missing_file_404(db_session, storage_root):
+    assert TestClient(app).get("/files/987654321").status_code == 404
+
+
+def test_open_mmap(db_session, storage_root):
+    data = b"header,line\n" + os.urandom(2048)
+    r = _stored(db_session, data, "m.csv")
+    with file_storage.open_mmap(r["file_id"], db_session) as (sf, buf):
+        assert sf.file_id == r["file_id"]
+        assert buf[:12] == b"header,line\n"
+        assert len(buf) == len(data)
+    with file_storage.open_mmap(987654321, db_session) as (sf, buf):
+        assert sf is None and buf is None
+
+
+def test_download_filename_override(db_session, storage_root):
+    data = os.urandom(256)
+    r = _stored(db_session, data, "first.csv")
+    _stored(db_session, data, "second.xlsx")  # 去重：StoredFile 保留第一次的檔名
+    client = TestClient(app)
+
+    assert 'filename="first.csv"' in client.get(f"/files/{r['file_id']}").headers["content-disposition"]
+    resp = client.get(f"/files/{r['file_id']}", params={"filename": "../dir/second.xlsx"})
+    assert resp.headers["content-disposition"] == 'attachment; filename="second.xlsx"'
+    assert resp.headers["content-type"].startswith(
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
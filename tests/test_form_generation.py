@@ -0,0 +1,99 @@
+import uuid
+
+from src.models import BudgetItem, QualityStandard, TempStandardItem
+from src.services import form_generation
+
+
+def _seed(db_session):
+    """
+    建立一組獨立的 budget_id 與 item_type，避免與其他測試資料互相干擾。
+    """
+    suffix = uuid.uuid4().hex[:8]
+    budget_id = f"FG-{suffix}"
+    mat, equip = "material", "equipment"
+    db_session.add_all([
+        QualityStandard(item_name=f"ＰＶＣ 電管{suffix}", item_type=mat, inspection_items=["外觀"]),
+        QualityStandard(item_name=f"網路交換器{suffix}", item_type=equip, frequency="每批"),
+    ])
+    db_session.add_all([
+        BudgetItem(budget_id=budget_id, name=f"pvc電管{suffix}", type=mat),
+        BudgetItem(budget_id=budget_id, name=f"網路交換器{suffix}A", type=equip),
+        BudgetItem(budget_id=budget_id, name="完全不相干的品項", type=mat),
+        BudgetItem(budget_id=budget_id, name="安裝測試", type="work"),
+    ])
+    db_session.commit()
+    return budget_id
+
+
+def test_create_temp_standards_exact_and_fuzzy(db_session):
+    budget_id = _seed(db_session)
+    r = form_generation.create_temp_standards(db_session, budget_id)
+    assert r["items_count"] == 4
+    assert r["matched_count"] == 2
+    assert r["fuzzy_matched_count"] == 1
+
+    items = (
+        db_session.query(TempStandardItem)
+        .filter_by(temp_file_id=r["temp_file_id"])
+        .order_by(TempStandardItem.temp_item_id)
+        .all()
+    )
+    assert len(items) == 3
+    exact, fuzzy, miss = items
+    assert exact.metadata_json == {"match_method": "exact", "match_score": 1.0}
+    assert exact.inspection_items == ["外觀"]
+    assert fuzzy.metadata_json["match_method"] == "fuzzy"
+    assert fuzzy.frequency == "每批"
+    assert miss.reference_standard_id is None
+    assert miss.metadata_json == {"match_method": None, "match_score": None}
+    assert miss.is_modified is False
+
+
+def test_get_temp_standards_keyset_pagination_and_ndjson(db_session):
+    import json
+
+    from fastapi.testclient import TestClient
+    from src.main import app
+
+    budget_id = _seed(db_session)
+    temp_file_id = form_generation.create_temp_standards(db_session, budget_id)["temp_file_id"]
+
+    page1 = form_generation.get_temp_standards(db_session, temp_file_id, limit=2)
+    assert len(page1["standards"]) == 2
+    page2 = form_generation.get_temp_standards(
+        db_session, temp_file_id, after_temp_item_id=page1["next_after_temp_item_id"], limit=2
+    )
+    assert len(page2["standards"]) == 1
+    assert page2["next_after_temp_item_id"] is None
+
+    full = form_generation.get_temp_standards(db_session, temp_file_id)
+    assert "next_after_temp_item_id" not in full
+
+    resp = TestClient(app).get(f"/form/temp/{temp_file_id}", params={"format": "ndjson"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(l) for l in resp.text.splitlines()]
+    assert [l["temp_item_id"] for l in lines] == [s["temp_item_id"] for s in full["standards"]]
+
+
+def test_generate_final_form_writes_xlsx_to_storage(db_session, storage_root):
+    from openpyxl import load_workbook
+
+    from src.models import BlankTemplate, StoredFile
+
+    budget_id = _seed(db_session)
+    temp_file_id = form_generation.create_temp_standards(db_session, budget_id)["temp_file_id"]
+    tpl = BlankTemplate(template_name=f"tpl-{budget_id}", file_id="0")
+    db_session.add(tpl)
+    db_session.commit()
+
+    r = form_generation.generate_final_form(db_session, temp_file_id, tpl.template_id, "表單")
+    assert r["status"] is True
+
+    sf = db_session.get(StoredFile, int(r["download_file_id"]))
+    assert sf.stored_path.startswith(str(storage_root))
+    ws = load_workbook(sf.stored_path, read_only=True)["品質管理標準"]
+    rows = list(ws.values)
+    assert list(rows[0]) == form_generation.FORM_HEADERS
+    assert len(rows) == 4
+    assert rows[1][2] == "外觀"
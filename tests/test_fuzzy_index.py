@@ -0,0 +1,93 @@
+import uuid
+
+from src.core.fuzzy_index import NgramIndex, normalize_name
+from src.models import QualityStandard
+from src.services import form_generation
+
+
+def test_normalize_name_fullwidth_and_spaces():
+    assert normalize_name("ＰＶＣ　電 管") == "pvc電管"
+
+
+def test_ngram_index_ranks_and_keeps_substring_hits():
+    idx = NgramIndex()
+    for i, name in enumerate(["鋼筋", "鋼筋續接器", "水泥", "預拌混凝土", "鋼管"]):
+        idx.add(name, i)
+    hits = idx.search("鋼筋", cutoff=0.6)
+    assert [h["name"] for h in hits] == ["鋼筋", "鋼筋續接器"]
+    assert hits[0]["score"] == 1.0
+
+    # 單字查詢走線性掃描
+    assert {h["name"] for h in idx.search("管", cutoff=0.9)} == {"鋼管"}
+    assert idx.search("") == []
+
+
+def test_search_quality_standards_uses_index_and_sees_new_rows(db_session):
+    item_type = f"t-{uuid.uuid4().hex[:8]}"
+    db_session.add(QualityStandard(item_name="鋼筋", item_type=item_type, source="A"))
+    db_session.commit()
+
+    r = form_generation.search_quality_standards(db_session, item_type, "鋼筋")
+    assert [s["item_name"] for s in r["standards"]] == ["鋼筋"]
+
+    # 新增後索引需失效重建
+    db_session.add(QualityStandard(item_name="鋼筋續接器", item_type=item_type, source="B"))
+    db_session.commit()
+    r = form_generation.search_quality_standards(db_session, item_type, "鋼筋")
+    assert {s["item_name"] for s in r["standards"]} == {"鋼筋", "鋼筋續接器"}
+
+    r = form_generation.search_quality_standards(db_session, item_type, "鋼筋", fuzzy=False)
+    assert [s["source"] for s in r["standards"]] == ["A"]
+
+
+def test_search_reference_data_falls_back_to_index_on_sqlite(db_session):
+    from src.services import reference_data
+
+    item_type = f"t-{uuid.uuid4().hex[:8]}"
+    db_session.add_all([
+        QualityStandard(item_name="預拌混凝土", item_type=item_type),
+        QualityStandard(item_name="混凝土試體", item_type=item_type),
+        QualityStandard(item_name="鋼管", item_type=item_type),
+    ])
+    db_session.commit()
+
+    r = reference_data.search_reference_data(db_session, "混凝土", item_type, limit=5)
+    assert r["mode"] == "ngram_index"
+    assert {x["item_name"] for x in r["results"]} == {"預拌混凝土", "混凝土試體"}
+    assert all(x["item_type"] == item_type for x in r["results"])
+
+    r = reference_data.search_reference_data(db_session, None, item_type)
+    assert len(r["results"]) == 3
+
+
+def test_standard_index_has_no_per_query_check_and_expires(db_session, monkeypatch):
+    from sqlalchemy import event, update
+
+    from src.config import settings
+    from src.services import standard_index
+
+    item_type = f"t-{uuid.uuid4().hex[:8]}"
+    db_session.add(QualityStandard(item_name="鋼筋", item_type=item_type, source="A"))
+    db_session.commit()
+    index = standard_index.get_standard_index(db_session, item_type)
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert standard_index.get_standard_index(db_session, item_type) is index
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert statements == []  # 快取命中時不查資料庫
+
+    # ORM bulk update：commit 後失效
+    db_session.execute(update(QualityStandard).where(QualityStandard.item_type == item_type).values(source="B"))
+    db_session.commit()
+    rebuilt = standard_index.get_standard_index(db_session, item_type)
+    assert rebuilt is not index and rebuilt.search("鋼筋")[0]["payload"]["source"] == "B"
+
+    # 其他行程的寫入看不到事件：超過 TTL 後重建
+    monkeypatch.setattr(settings, "STANDARD_INDEX_TTL_SECONDS", 1)
+    monkeypatch.setattr(standard_index.time, "monotonic", lambda: 1e12)
+    assert standard_index.get_standard_index(db_session, item_type) is not rebuilt
@@ -0,0 +1,65 @@
+import uuid
+
+from src.models import BudgetItem, SpecificationItem
+from src.services import ingestion
+
+BUDGET_CSV = b""" Name ,TYPE,Unit,Qty,UnitPrice,TotalPrice,Desc
+\xe9\x8b\xbc\xe7\xad\x8b,material,t,3,x,,rebar
+,material,,1,,,
+  ,equipment,,2,,,
+Pump,,set,,1200,1200,
+"""
+
+
+def test_import_budget_details_vectorized(db_session):
+    budget_id = f"ING-{uuid.uuid4().hex[:8]}"
+    r = ingestion.import_budget_details(db_session, BUDGET_CSV, "csv", budget_id)
+    assert r["status"] is True
+    assert r["inserted"] == 2
+
+    items = db_session.query(BudgetItem).filter_by(budget_id=budget_id).order_by(BudgetItem.item_id).all()
+    assert [(i.name, i.type, i.unit) for i in items] == [("鋼筋", "material", "t"), ("Pump", "material", "set")]
+    assert items[0].quantity == 3 and items[0].unit_price is None
+    assert items[1].quantity is None and items[1].total_price == 1200
+
+
+def test_import_budget_details_rejects_unknown_type(db_session):
+    assert ingestion.import_budget_details(db_session, b"", "pdf", "X")["status"] is False
+
+
+def test_reimport_specs_is_idempotent(db_session):
+    spec_id = f"SPEC-{uuid.uuid4().hex[:8]}"
+    text = "電纜: 應符合 CNS 679\n配管: 採用鋼管\n".encode("utf-8")
+    for _ in range(2):
+        assert ingestion.import_technical_specs(db_session, text, "txt", spec_id)["status"] is True
+    items = db_session.query(SpecificationItem).filter_by(spec_id=spec_id).all()
+    assert sorted(i.item_name for i in items) == ["配管", "電纜"]
+    assert all(i.natural_key for i in items)
+
+    # 同品名但內容不同 → 視為不同項目
+    ingestion.import_technical_specs(db_session, "電纜: 應符合 IEC 60502\n".encode("utf-8"), "txt", spec_id)
+    assert db_session.query(SpecificationItem).filter_by(spec_id=spec_id).count() == 3
+
+
+def test_spec_natural_key_normalizes_name():
+    assert ingestion.spec_natural_key("S", "電 纜", ["a"]) == ingestion.spec_natural_key("S", "電纜", ["a"])
+    assert ingestion.spec_natural_key("S", "電纜", ["a"]) != ingestion.spec_natural_key("S", "電纜", ["b"])
+
+
+def test_migration_natural_key_matches_app():
+    # migration 4a3f43614434 內的凍結副本須與目前的 spec_natural_key 一致（否則回填的鍵與 upsert 對不上）
+    import importlib.util
+    from pathlib import Path
+
+    path = Path(__file__).parents[1] / "migrations" / "versions" / "4a3f43614434_spec_items_natural_key.py"
+    spec = importlib.util.spec_from_file_location("_mig_4a3f43614434", path)
+    mig = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mig)
+
+    cases = [
+        ("S1", "ＰＶＣ　電 管", [{"name": "CNS 1", "min": 1.5}]),
+        ("S2", None, None),
+        ("S3", "Cable", ["耐燃", 3]),
+    ]
+    for args in cases:
+        assert mig._spec_natural_key(*args) == ingestion.spec_natural_key(*args)
@@ -0,0 +1,108 @@
+import threading
+import time
+import uuid
+
+import pytest
+
+from src.config import settings
+from src.models import Job
+from src.services import jobs
+
+BUDGET_CSV = """項 次,項目及說明,單位,數量,單價,複價,編碼
+1,智慧影像攝影機,台,4,12000,48000,#A001
+2,光纜,M,300,50,15000,#B002
+3,攝影機安裝測試,式,1,8000,8000,#C003
+"""
+
+
+@pytest.fixture
+def thread_jobs(monkeypatch):
+    jobs.shutdown_executor(wait=True)
+    monkeypatch.setattr(settings, "JOB_EXECUTOR", "thread")
+    yield
+    jobs.shutdown_executor(wait=True)
+
+
+def _wait(db_session, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.get_job(db_session, job_id)["job"]
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_budget_import_job_runs_in_background(db_session, storage_root, thread_jobs):
+    from src.core.file_storage import save_file
+
+    budget_id = f"JOB-{uuid.uuid4().hex[:8]}"
+    stored = save_file(BUDGET_CSV.encode("utf-8"), "budget.csv", "budget/raw", db=db_session)
+    r = jobs.submit_job(db_session, "budget_complex.import", {
+        "budget_id": budget_id, "file_id": stored["file_id"], "filename": "budget.csv",
+    })
+    assert r["status"] is True and r["job_status"] == "queued"
+
+    job = _wait(db_session, r["job_id"])
+    assert job["status"] == "succeeded", job["error"]
+    assert job["progress"] == 1.0
+    assert job["result"]["inserted"] == 3
+    assert job["stored_file_id"] == stored["file_id"]
+
+
+def test_failed_job_records_error(db_session, thread_jobs):
+    r = jobs.submit_job(db_session, "form.generate", {
+        "temp_file_id": -1, "template_id": -1, "form_name": "x",
+    })
+    job = _wait(db_session, r["job_id"])
+    assert job["status"] == "failed"
+    assert job["error"] == "temp_file or template not found"
+
+
+def test_unknown_job_type(db_session):
+    assert jobs.submit_job(db_session, "nope", {})["status"] is False
+
+
+def test_recover_jobs_fails_running_and_resubmits_queued(db_session, thread_jobs):
+    running = Job(job_type="form.generate", status="running", progress=0.3, params={})
+    queued = Job(job_type="form.generate", status="queued", progress=0.0, params={
+        "temp_file_id": -1, "template_id": -1, "form_name": "x",
+    })
+    db_session.add_all([running, queued])
+    db_session.commit()
+
+    r = jobs.recover_jobs(db_session)
+    assert r["interrupted"] >= 1 and r["resubmitted"] >= 1
+
+    job = jobs.get_job(db_session, running.job_id)["job"]
+    assert job["status"] == "failed" and job["error"].startswith("interrupted")
+    # queued 工作確實重新執行（handler 的錯誤訊息）
+    assert _wait(db_session, queued.job_id)["error"] == "temp_file or template not found"
+
+    # 重複送出已結束的工作不會重跑
+    jobs._execute_job(db_session.bind.url.render_as_string(hide_password=False), queued.job_id)
+    assert jobs.get_job(db_session, queued.job_id)["job"]["status"] == "failed"
+
+
+def test_shutdown_marks_cancelled_jobs_failed(db_session, thread_jobs, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_MAX_WORKERS", 1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking(db, params, report):
+        started.set()
+        release.wait(10)
+        return {"status": True}
+
+    monkeypatch.setitem(jobs.JOB_HANDLERS, "test.block", blocking)
+    first = jobs.submit_job(db_session, "test.block", {})["job_id"]
+    assert started.wait(10)
+    second = jobs.submit_job(db_session, "test.block", {})["job_id"]
+    # SQLite：未完成的工作沒有中途進度
+    assert jobs.get_job(db_session, second)["job"]["progress"] is None
+
+    jobs.shutdown_executor()
+    job = jobs.get_job(db_session, second)["job"]
+    assert job["status"] == "failed" and job["error"].startswith("cancelled")
+
+    release.set()
+    assert _wait(db_session, first)["status"] == "succeeded"
@@ -0,0 +1,95 @@
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import JSONB
+
+from src.core.json_types import json_contains, json_text_startswith
+from src.main import app
+from src.models import BudgetItem, SpecificationItem
+from src.services import budget_parser, form_generation
+
+BUDGET_CSV = """項 次,項目及說明,單位,數量,單價,複價,編碼
+1.1,智慧影像攝影機,台,4,12000,48000,#A001
+1.2,光纜,M,300,50,15000,#B002
+1.10,伺服器,台,1,90000,90000,#D004
+2.1,交換器,台,2,30000,60000,#E005
+2.2,攝影機安裝測試,式,1,8000,8000,#C003
+"""
+
+
+def _import(db_session):
+    budget_id = f"JF-{uuid.uuid4().hex[:8]}"
+    r = budget_parser.import_complex_budget(db_session, BUDGET_CSV.encode("utf-8"), "b.csv", budget_id)
+    return budget_id, r["source_file_id"]
+
+
+def _names(result, key="items", field="name"):
+    return [i[field] for i in result[key]]
+
+
+def test_json_columns_are_jsonb_on_postgres():
+    pg = postgresql.dialect()
+    assert isinstance(BudgetItem.__table__.c.metadata.type.dialect_impl(pg), JSONB)
+    assert isinstance(SpecificationItem.__table__.c.requirements.type.dialect_impl(pg), JSONB)
+
+    stmt = select(BudgetItem.item_id).where(
+        json_contains(BudgetItem.metadata_json, {"is_equipment": True}),
+        json_text_startswith(BudgetItem.metadata_json, "hierarchy_code", "1."),
+    )
+    pg_sql = str(stmt.compile(dialect=pg))
+    assert "metadata @> " in pg_sql
+    assert "(budget_items.metadata ->> 'hierarchy_code') LIKE" in pg_sql
+    assert "JSON_EXTRACT" in str(stmt.compile(dialect=sqlite.dialect()))
+
+
+def test_list_budget_items_filters(db_session, storage_root):
+    budget_id, file_id = _import(db_session)
+    ls = budget_parser.list_budget_items
+
+    assert _names(ls(db_session, budget_id, metadata_filters={"is_equipment": True})) == [
+        "智慧影像攝影機", "伺服器", "交換器",
+    ]
+    # 同一語句結構、不同參數值（驗證語句快取不沿用舊值）
+    assert _names(ls(db_session, budget_id, metadata_filters={"is_equipment": False})) == [
+        "光纜", "攝影機安裝測試",
+    ]
+    assert _names(ls(db_session, budget_id, metadata_filters={"hierarchy_code": "1.10"})) == ["伺服器"]
+    assert _names(ls(db_session, budget_id, metadata_filters={"hierarchy_prefix": "2."})) == [
+        "交換器", "攝影機安裝測試",
+    ]
+    assert len(ls(db_session, budget_id, metadata_filters={"source_file_id": file_id})["items"]) == 5
+    assert ls(db_session, budget_id, metadata_filters={"source_file_id": file_id + 1000})["items"] == []
+
+    page = ls(db_session, budget_id, metadata_filters={"is_equipment": True}, limit=2)
+    assert _names(page) == ["智慧影像攝影機", "伺服器"]
+    page = ls(
+        db_session, budget_id, metadata_filters={"is_equipment": True},
+        after_item_id=page["next_after_item_id"], limit=2,
+    )
+    assert _names(page) == ["交換器"] and page["next_after_item_id"] is None
+
+
+def test_filter_routes(db_session, storage_root):
+    budget_id, file_id = _import(db_session)
+    temp = form_generation.create_temp_standards(db_session, budget_id)
+    client = TestClient(app)
+
+    r = client.get(
+        f"/budget_complex/{budget_id}/items",
+        params={"is_equipment": "true", "hierarchy_prefix": "1.", "source_file_id": file_id},
+    ).json()
+    assert [(i["name"], i["hierarchy_code"]) for i in r["items"]] == [("智慧影像攝影機", "1.1"), ("伺服器", "1.10")]
+
+    # 只掛在 /budget_complex 之下（不被根路徑的舊 router 掛載帶出）
+    paths = {getattr(route, "path", None) for route in app.routes}
+    assert "/budget_complex/{budget_id}/items" in paths and "/{budget_id}/items" not in paths
+
+    r = client.get(f"/form/temp/{temp['temp_file_id']}", params={"hierarchy_prefix": "2."}).json()
+    assert _names(r, "standards", "item_name") == ["交換器"]  # work 項目不進暫存檔
+
+    r = client.get(
+        f"/form/temp/{temp['temp_file_id']}", params={"is_equipment": "false", "format": "ndjson"}
+    )
+    assert [line for line in r.text.splitlines() if "光纜" in line] and "伺服器" not in r.text
@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+
+from src.core import llm
+from src.core.llm import LLMClient, LLMError, TokenBucket, estimate_tokens, split_text
+
+
+def test_split_text_respects_token_budget():
+    text = "\n".join(f"項目{i}: 規格說明 spec text {i}" for i in range(200))
+    chunks = split_text(text, 50)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(c) <= 50 for c in chunks)
+    assert "\n".join(chunks) == text
+
+    long_line = "x" * 1000
+    assert all(estimate_tokens(c) <= 50 for c in split_text(long_line, 50))
+    assert "".join(split_text(long_line, 50)) == long_line
+
+
+@pytest.fixture
+def provider():
+    """本機測試 provider：記錄併發數，前 fail_first 次呼叫丟出例外。"""
+    state = {"active": 0, "peak": 0, "calls": 0, "fail_first": 0}
+
+    async def fn(client, text, task_type, context):
+        state["calls"] += 1
+        if state["calls"] <= state["fail_first"]:
+            raise ConnectionError("temporary")
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return {"raw_items": [{"name": l, "spec": ""} for l in text.splitlines()]}
+
+    llm.register_provider("test-local", fn)
+    yield state
+    llm._PROVIDERS.pop("test-local", None)
+
+
+def test_fan_out_limits_concurrency_and_keeps_order(provider):
+    client = LLMClient("test-local", "m", 20, max_concurrency=3, retry_backoff=0)
+    lines = [f"line-{i:03d}" for i in range(40)]
+    r = client.parse_text("\n".join(lines), task_type="extract_specs")
+    assert r["chunks"] > 3
+    assert provider["peak"] == 3
+    assert [it["name"] for it in r["result"]["raw_items"]] == lines
+
+
+def test_retry_with_backoff(provider):
+    provider["fail_first"] = 2
+    client = LLMClient("test-local", "m", 1000, max_retries=3, retry_backoff=0)
+    r = client.parse_text("a\nb", task_type="extract_specs")
+    assert [it["name"] for it in r["result"]["raw_items"]] == ["a", "b"]
+    assert provider["calls"] == 3
+
+    provider.update(calls=0, fail_first=10)
+    with pytest.raises(LLMError):
+        LLMClient("test-local", "m", 1000, max_retries=1, retry_backoff=0).parse_text("a", "extract_specs")
+
+
+def test_token_bucket_rate_limits():
+    bucket = TokenBucket(rate_per_minute=600, capacity=1)  # 每秒 10 個
+
+    async def take(n):
+        for _ in range(n):
+            await bucket.acquire(1)
+
+    start = time.monotonic()
+    asyncio.run(take(4))
+    assert time.monotonic() - start >= 0.25
+
+
+def test_parse_text_inside_running_loop():
+    client = LLMClient("stub", "m", 1000)
+
+    async def main():
+        return client.parse_text("電纜: CNS 標準", task_type="extract_specs")
+
+    r = asyncio.run(main())
+    assert r["result"]["raw_items"] == [{"name": "電纜", "spec": "CNS 標準"}]
@@ -0,0 +1,73 @@
+import time
+
+from src.core import llm
+from src.core.llm import LLMClient
+from src.core.llm_cache import MemoryLRUCache, SQLiteCache, TieredCache, make_key
+
+
+def _key(text, model="m", prompt_version="1"):
+    return make_key(text, task_type="extract_specs", provider="p", model=model, prompt_version=prompt_version)
+
+
+def test_key_normalizes_whitespace_and_varies_by_model():
+    assert _key("電纜:  CNS 標準 \n\n") == _key("電纜: CNS 標準")
+    assert _key("a") != _key("a", model="other")
+    assert _key("a") != _key("a", prompt_version="2")
+
+
+def test_memory_lru_evicts_and_expires(monkeypatch):
+    c = MemoryLRUCache(max_entries=2, ttl_seconds=60)
+    c.set("a", {"v": 1})
+    c.set("b", {"v": 2})
+    assert c.get("a") == {"v": 1}  # a 變為最近使用
+    c.set("c", {"v": 3})
+    assert c.get("b") is None and c.get("a") is not None
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert c.get("a") is None
+    st = c.stats()
+    assert st["evictions"] == 2 and st["hits"] == 2
+
+
+def test_sqlite_persists_and_trims(tmp_path):
+    path = tmp_path / "c.sqlite3"
+    c1 = SQLiteCache(path, max_entries=3)
+    for i in range(5):
+        c1.set(f"k{i}", {"i": i})
+    assert c1.evict() == 2
+    c1.close()
+
+    c2 = SQLiteCache(path, max_entries=3)
+    assert c2.get("k0") is None and c2.get("k4") == {"i": 4}
+    assert c2.stats()["entries"] == 3
+
+
+def test_client_uses_tiered_cache(tmp_path):
+    calls = []
+
+    async def fn(client, text, task_type, context):
+        calls.append(text)
+        return {"raw_items": [{"name": text.split(":")[0], "spec": "x"}]}
+
+    llm.register_provider("test-cache", fn)
+    try:
+        disk = SQLiteCache(tmp_path / "c.sqlite3")
+        client = LLMClient("test-cache", "m", 1000, cache=TieredCache(MemoryLRUCache(), disk))
+        client.parse_text("通則: 依 CNS 規定", "extract_specs")
+        client.parse_text("通則:  依 CNS 規定\n", "extract_specs")
+        assert len(calls) == 1
+
+        # 新的行程（記憶體層為空）仍可由磁碟層命中，並回填記憶體
+        client2 = LLMClient("test-cache", "m", 1000, cache=TieredCache(MemoryLRUCache(), disk))
+        r = client2.parse_text("通則: 依 CNS 規定", "extract_specs")
+        assert len(calls) == 1 and r["result"]["raw_items"][0]["name"] == "通則"
+        assert client2.cache_stats()["disk"]["hits"] == 1
+        assert client2.cache_stats()["memory"]["entries"] == 1
+    finally:
+        llm._PROVIDERS.pop("test-cache", None)
+
+
+def test_get_llm_client_has_cache_from_settings():
+    client = llm.get_llm_client()
+    assert isinstance(client.cache, TieredCache) and client.cache.disk is not None
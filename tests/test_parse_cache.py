@@ -0,0 +1,79 @@
+import os
+import time
+import uuid
+
+from src.config import settings
+from src.core import parse_cache
+from src.core.llm import get_llm_client
+from src.models import BudgetItem, SpecificationItem
+from src.services import budget_parser, ingestion
+
+BUDGET_CSV = """項 次,項目及說明,單位,數量,單價,複價,編碼
+1,智慧影像攝影機,台,4,12000,48000,#A001
+2,光纜,M,abc,50,15000,#B002
+"""
+
+
+def _items(db_session, budget_id):
+    return sorted(
+        (b.name, b.type, b.quantity, b.metadata_json["source_file_original_name"])
+        for b in db_session.query(BudgetItem).filter_by(budget_id=budget_id)
+    )
+
+
+def test_budget_reimport_hits_cache(db_session, storage_root):
+    data = (BUDGET_CSV + f"3,備註{uuid.uuid4().hex[:6]},式,1,1,1,#C\n").encode("utf-8")
+    b1, b2 = f"PC-{uuid.uuid4().hex[:8]}", f"PC-{uuid.uuid4().hex[:8]}"
+
+    r1 = budget_parser.import_complex_budget(db_session, data, "a.csv", b1)
+    r2 = budget_parser.import_complex_budget(db_session, data, "b.csv", b2)
+
+    assert r1["cache_hit"] is False and r2["cache_hit"] is True
+    assert r1["inserted"] == r2["inserted"] == 3
+    assert r1["warnings"] == r2["warnings"] and r1["warnings"]
+    assert r1["stats"] == r2["stats"]
+    assert [i[:3] for i in _items(db_session, b1)] == [i[:3] for i in _items(db_session, b2)]
+    assert {i[3] for i in _items(db_session, b2)} == {"b.csv"}
+    st = parse_cache.stats()
+    assert st["hits"] == 1 and st["misses"] == 1 and st["writes"] == 1
+
+
+def test_spec_cache_keyed_by_llm_model(db_session, monkeypatch):
+    text = f"電纜{uuid.uuid4().hex[:6]}: CNS 標準\n".encode("utf-8")
+    s1, s2, s3 = (f"SC-{uuid.uuid4().hex[:8]}" for _ in range(3))
+
+    assert ingestion.import_technical_specs(db_session, text, "txt", s1)["cache_hit"] is False
+    assert ingestion.import_technical_specs(db_session, text, "txt", s2)["cache_hit"] is True
+    assert db_session.query(SpecificationItem).filter_by(spec_id=s2).count() == 1
+
+    monkeypatch.setattr(get_llm_client(), "model", "another-model")
+    assert ingestion.import_technical_specs(db_session, text, "txt", s3)["cache_hit"] is False
+
+
+def _put(key, n):
+    with parse_cache.writer(key) as w:
+        list(w.tee({"i": i, "pad": os.urandom(64).hex()} for i in range(n)))
+        w.finish({"n": n})
+
+
+def test_eviction_by_size_and_age(monkeypatch):
+    monkeypatch.setattr(settings, "PARSE_CACHE_MAX_BYTES", 10 ** 9)
+    k_old, k_new = parse_cache.cache_key("t", "old", "1"), parse_cache.cache_key("t", "new", "1")
+    _put(k_old, 200)
+    old_path = parse_cache._entry_path(parse_cache._root(), k_old)
+    os.utime(old_path, (time.time() - 100, time.time() - 100))
+    _put(k_new, 200)
+    new_path = parse_cache._entry_path(parse_cache._root(), k_new)
+
+    # 容量只夠一筆 → 淘汰最久未使用者
+    monkeypatch.setattr(settings, "PARSE_CACHE_MAX_BYTES", max(map(os.path.getsize, (old_path, new_path))))
+    assert parse_cache.evict() == 1
+    assert parse_cache.lookup(k_old) is None
+    entry = parse_cache.lookup(k_new)
+    assert len(list(entry)) == 200 and entry.meta == {"n": 200}
+
+    # 過期
+    monkeypatch.setattr(settings, "PARSE_CACHE_MAX_AGE_DAYS", 0)
+    time.sleep(0.01)
+    assert parse_cache.lookup(k_new) is None
+    assert parse_cache.stats()["evictions"] >= 2
@@ -0,0 +1,82 @@
+import hashlib
+import uuid
+
+import pytest
+
+from src.config import settings
+from src.core import pdf_extract
+from src.services import ingestion
+from src.models import SpecificationItem
+
+
+def _make_pdf(pages: list[str]) -> bytes:
+    """產生最小的多頁 PDF（每頁一行 Helvetica 文字）。"""
+    n = len(pages)
+    objs = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (4 + 2 * i) for i in range(n)) + b"] /Count %d >>" % n,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(pages):
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode("ascii") + b") Tj ET"
+        objs.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (5 + 2 * i)
+        )
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    return bytes(out)
+
+
+@pytest.fixture
+def pdf_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PDF_PAGE_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(settings, "PDF_EXTRACT_SHARD_PAGES", 2)
+    monkeypatch.setattr(settings, "PDF_EXTRACT_WORKERS", 2)
+    yield tmp_path
+    pdf_extract.shutdown_pdf_executor(wait=True)
+
+
+def test_parallel_matches_serial_and_keeps_page_order(pdf_settings):
+    texts = [f"Item{i}: spec line {i}" for i in range(7)]
+    path = pdf_settings / "spec.pdf"
+    path.write_bytes(_make_pdf(texts))
+
+    serial = list(pdf_extract.iter_pdf_pages(str(path), parallel=False))
+    parallel = list(pdf_extract.iter_pdf_pages(str(path), parallel=True))
+    assert serial == parallel
+    assert [t.strip() for t in parallel] == texts
+
+
+def test_page_cache_keyed_by_hash(pdf_settings):
+    data = _make_pdf(["A: 1", "B: 2", "C: 3"])
+    sha = hashlib.sha256(data).hexdigest()
+    path = pdf_settings / "spec.pdf"
+    path.write_bytes(data)
+
+    first = list(pdf_extract.iter_pdf_pages(str(path), sha256=sha, parallel=False))
+    cache_dir = pdf_settings / "cache" / sha[:2] / sha
+    assert sorted(p.name for p in cache_dir.iterdir()) == ["000000.txt", "000001.txt", "000002.txt", "page_count"]
+
+    # 改寫快取內容，確認重新擷取時讀的是快取；全部命中時不再開啟 PDF（連頁數都不必計算）
+    (cache_dir / "000001.txt").write_text("CACHED", encoding="utf-8")
+    path.unlink()
+    again = list(pdf_extract.iter_pdf_pages(str(path), sha256=sha, parallel=False))
+    assert again == [first[0], "CACHED", first[2]]
+
+
+def test_import_technical_specs_pdf(db_session, pdf_settings):
+    spec_id = f"PDF-{uuid.uuid4().hex[:8]}"
+    data = _make_pdf([f"Cable{i}: CNS {i}" for i in range(5)])
+    r = ingestion.import_technical_specs(db_session, data, "pdf", spec_id)
+    assert r["status"] is True
+    names = sorted(i.item_name for i in db_session.query(SpecificationItem).filter_by(spec_id=spec_id))
+    assert names == [f"Cable{i}" for i in range(5)]
@@ -0,0 +1,140 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.orm import Session
+
+import src.db as db_module
+from src.db import Base
+from src.main import app
+from src.models import BudgetItem, QualityStandard
+
+
+@pytest.fixture()
+def replicas(tmp_path):
+    """
+    兩個 SQLite 檔當作唯讀副本（schema 以 create_all 建立）；回傳 (urls, 寫入副本資料的函式)。
+    """
+    urls = [f"sqlite:///{tmp_path}/replica{i}.sqlite" for i in range(2)]
+    for url in urls:
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        engine.dispose()
+
+    def seed(url, *objs):
+        engine = create_engine(url)
+        with Session(engine) as s:
+            s.add_all(objs)
+            s.commit()
+        engine.dispose()
+
+    yield urls, seed
+    db_module.configure_read_replicas(None)
+
+
+def _marker(s: Session, budget_id: str):
+    return s.scalars(select(BudgetItem.name).where(BudgetItem.budget_id == budget_id)).all()
+
+
+def test_without_replicas_reads_primary(db_session):
+    budget_id = f"RR-{uuid.uuid4().hex[:8]}"
+    db_session.add(BudgetItem(budget_id=budget_id, name="primary", type="material"))
+    db_session.commit()
+    db_module.configure_read_replicas([])
+    with db_module.get_read_sessionmaker()() as s:
+        assert _marker(s, budget_id) == ["primary"]
+
+
+def test_reads_round_robin_across_replicas(replicas):
+    urls, seed = replicas
+    budget_id = f"RR-{uuid.uuid4().hex[:8]}"
+    for i, url in enumerate(urls):
+        seed(url, BudgetItem(budget_id=budget_id, name=f"replica{i}", type="material"))
+    db_module.configure_read_replicas(urls)
+
+    # 每個 session 選定一個副本（session 之間輪流）
+    seen = []
+    for _ in range(4):
+        with db_module.get_read_sessionmaker()() as s:
+            seen.append(_marker(s, budget_id)[0])
+    assert sorted(seen) == ["replica0", "replica0", "replica1", "replica1"]
+    assert seen[0] != seen[1] and seen[1] != seen[2]
+    assert len(db_module.get_pool_status()["replicas"]) == 2
+
+
+def test_writes_and_later_reads_go_to_primary(replicas):
+    urls, seed = replicas
+    budget_id = f"RR-{uuid.uuid4().hex[:8]}"
+    seed(urls[0], BudgetItem(budget_id=budget_id, name="replica", type="material"))
+    db_module.configure_read_replicas(urls[:1])
+
+    with db_module.get_read_sessionmaker()() as s:
+        assert _marker(s, budget_id) == ["replica"]
+        s.add(BudgetItem(budget_id=budget_id, name="primary", type="material"))
+        s.commit()
+        # 寫入後同一 session 的讀取固定走主庫（副本可能尚未同步）
+        assert _marker(s, budget_id) == ["primary"]
+        assert s.execute(text("SELECT 1")).scalar() == 1
+
+    with db_module.SessionLocal() as s:
+        assert _marker(s, budget_id) == ["primary"]
+
+
+def test_read_routes_use_replica(replicas):
+    urls, seed = replicas
+    budget_id = f"RR-{uuid.uuid4().hex[:8]}"
+    seed(urls[0], BudgetItem(budget_id=budget_id, name=f"電纜{budget_id}", type="material"))
+    db_module.configure_read_replicas(urls[:1])
+
+    r = TestClient(app).get(f"/form/identify/{budget_id}").json()
+    assert [i["name"] for i in r["items"]] == [f"電纜{budget_id}"]
+
+
+def test_bare_get_bind_does_not_pin_session_to_primary(replicas):
+    urls, seed = replicas
+    budget_id = f"RR-{uuid.uuid4().hex[:8]}"
+    seed(urls[0], BudgetItem(budget_id=budget_id, name="replica", type="material"))
+    db_module.configure_read_replicas(urls[:1])
+
+    with db_module.get_read_sessionmaker()() as s:
+        assert s.get_bind() is db_module.get_engine()
+        assert s.bind is db_module.get_engine()
+        assert _marker(s, budget_id) == ["replica"]
+
+
+def test_standard_search_uses_replica(replicas):
+    urls, seed = replicas
+    item_type = f"cat-{uuid.uuid4().hex[:8]}"
+    seed(urls[0], QualityStandard(item_name="智慧影像攝影機", item_type=item_type))
+    db_module.configure_read_replicas(urls[:1])
+    client = TestClient(app)
+
+    for fuzzy in ("false", "true"):
+        r = client.get(
+            "/form/standards/search",
+            params={"item_type": item_type, "item_name": "智慧影像攝影機", "fuzzy": fuzzy},
+        ).json()
+        assert [h["item_name"] for h in r["standards"]] == ["智慧影像攝影機"], fuzzy
+
+    r = client.get("/reference/search", params={"keyword": "智慧影像攝影機", "category": item_type}).json()
+    assert r["results"][0]["item_name"] == "智慧影像攝影機"
+
+
+def test_session_sticks_to_one_replica(replicas):
+    urls, seed = replicas
+    db_module.configure_read_replicas(urls)
+
+    # 以連線層函式模擬 Postgres 的 set_config(..., true) / current_setting（設定只存在於該連線）
+    for engine in db_module.get_read_engines():
+        @event.listens_for(engine, "connect")
+        def _functions(dbapi_conn, record):
+            settings_ = {}
+            dbapi_conn.create_function("set_config", 3, lambda k, v, local: settings_.__setitem__(k, v) or v)
+            dbapi_conn.create_function("current_setting", 1, lambda k: settings_.get(k))
+
+    for _ in range(2):  # 不論第一次選到哪個副本
+        with db_module.get_read_sessionmaker()() as s:
+            s.execute(text("SELECT set_config('pg_trgm.similarity_threshold', :c, true)"), {"c": "0.7"})
+            for _ in range(3):
+                assert s.execute(text("SELECT current_setting('pg_trgm.similarity_threshold')")).scalar() == "0.7"
@@ -0,0 +1,78 @@
+import uuid
+
+from src.config import settings
+from src.core import llm
+from src.core.llm import LLMClient
+from src.core.spec_rules import extract_spec_items, prefilter_text
+from src.models import SpecificationItem
+from src.services import ingestion
+
+SPEC_TEXT = """第一條 總則
+本規範適用於本工程之一般事項。
+第二條 電纜：應符合CNS 679及IEC 60502-1規定。
+導體截面積誤差±2%。絕緣電阻不得小於 100 MΩ；
+出廠前應依 ASTM D 1557 辦理耐壓試驗。
+3.2.1 鋼筋
+鋼筋應符合 CNS 560，降伏強度≧ 420 MPa。
+2.5 mm 以下之鋼線不得使用。
+"""
+
+
+def test_extract_clauses_and_classify():
+    items = {it["name"]: it for it in extract_spec_items(SPEC_TEXT)}
+    assert set(items) == {"總則", "電纜", "鋼筋"}
+
+    cable = items["電纜"]
+    assert cable["clause"] == "第二條"
+    assert cable["standards"] == ["CNS 679", "IEC 60502-1", "ASTM D 1557"]
+    assert cable["testing_methods"] == ["出廠前應依 ASTM D 1557 辦理耐壓試驗。"]
+    assert "導體截面積誤差±2%。" in cable["acceptance_criteria"]
+    assert "絕緣電阻不得小於 100 MΩ；" in cable["acceptance_criteria"]
+    assert cable["requirements"] == ["應符合CNS 679及IEC 60502-1規定。"]
+
+    # 「2.5 mm」為數值，不是條號
+    rebar = items["鋼筋"]
+    assert rebar["clause"] == "3.2.1"
+    assert len(rebar["acceptance_criteria"]) == 2
+
+
+def test_prefilter_drops_clauses_without_signal():
+    filtered = prefilter_text(SPEC_TEXT)
+    assert "總則" not in filtered and "本規範適用" not in filtered
+    assert "第二條 電纜" in filtered and "3.2.1 鋼筋" in filtered
+
+
+def test_rules_provider_and_prefilter_on_llm_client():
+    r = LLMClient("rules", "n/a", 10).parse_text(SPEC_TEXT, task_type="extract_specs")
+    assert r["chunks"] == 1  # 本機規則引擎不切塊
+    assert len(r["result"]["raw_items"]) == 3
+
+    seen = []
+
+    async def fn(client, text, task_type, context):
+        seen.append(text)
+        return {"raw_items": []}
+
+    llm.register_provider("test-prefilter", fn)
+    try:
+        LLMClient("test-prefilter", "m", 1000, prefilter=True).parse_text(SPEC_TEXT, "extract_specs")
+        assert "本規範適用" not in "".join(seen)
+    finally:
+        llm._PROVIDERS.pop("test-prefilter", None)
+
+
+def test_import_specs_with_rules_merges_continuations(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "rules")
+    spec_id = f"RS-{uuid.uuid4().hex[:8]}"
+    # 模擬 PDF 分批：第二塊開頭為上一條文的續接內容
+    blocks = ["第五條 配管：應採用 CNS 1298 鋼管。", "管徑誤差±1%。\n第六條 接地：接地電阻應在 10 Ω 以下。"]
+    monkeypatch.setattr(ingestion, "_iter_spec_text", lambda *a, **k: iter(blocks))
+
+    r = ingestion.import_technical_specs(db_session, b"placeholder", "txt", spec_id)
+    assert r["status"] is True
+    items = {i.item_name: i for i in db_session.query(SpecificationItem).filter_by(spec_id=spec_id)}
+    assert set(items) == {"配管", "接地"}
+    assert items["配管"].standards == ["CNS 1298"]
+    assert items["配管"].acceptance_criteria == ["管徑誤差±1%。"]
+    assert items["配管"].metadata_json == {"clause": "第五條"}
+    assert items["接地"].acceptance_criteria == ["接地電阻應在 10 Ω 以下。"]
@@ -0,0 +1,116 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+import src.db as db_module
+from src.core import file_storage
+from src.core.sqlite_perf import SQLiteWriteQueue, queue_writes, sqlite_pragmas, write_queue_for
+from src.models import BudgetItem
+from src.services import budget_parser
+
+BUDGET_CSV = """項 次,項目及說明,單位,數量,單價,複價,編碼
+1,智慧影像攝影機,台,4,12000,48000,#A001
+2,光纜,M,300,50,15000,#B002
+3,攝影機安裝測試,式,1,8000,8000,#C003
+4,伺服器,台,1,90000,90000,#D004
+"""
+
+
+def test_engine_connections_use_wal_and_pragmas():
+    with db_module.get_engine().connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar().lower() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+
+def test_sqlite_pragmas_validates_values():
+    cfg = SimpleNamespace(
+        SQLITE_JOURNAL_MODE="wal; DROP TABLE x", SQLITE_MMAP_SIZE=0, SQLITE_SYNCHRONOUS="NORMAL",
+        SQLITE_CACHE_SIZE=-1000, SQLITE_TEMP_STORE="MEMORY", SQLITE_BUSY_TIMEOUT_MS=100,
+    )
+    with pytest.raises(ValueError):
+        sqlite_pragmas(cfg)
+    # 記憶體資料庫不設定 journal_mode
+    assert not any("journal_mode" in p for p in sqlite_pragmas(cfg, memory=True))
+
+
+def test_write_queue_is_exclusive_fifo_and_reentrant(tmp_path):
+    q = SQLiteWriteQueue(str(tmp_path / "db.writelock"))
+    active = 0
+    overlaps = 0
+    order = []
+    lock = threading.Lock()
+
+    def writer(i):
+        nonlocal active, overlaps
+        with q.acquire():
+            with q.acquire():  # 重入不會自鎖
+                with lock:
+                    active += 1
+                    overlaps += active > 1
+                    order.append(i)
+                time.sleep(0.005)
+                with lock:
+                    active -= 1
+
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        list(ex.map(writer, range(16)))
+    assert overlaps == 0
+    assert sorted(order) == list(range(16))
+    st = q.stats()
+    assert st["writes"] == 16 and st["queued"] == 0
+
+
+def test_concurrent_budget_imports_do_not_fail(storage_root):
+    data = BUDGET_CSV.encode("utf-8")
+    budget_ids = [f"W-{uuid.uuid4().hex[:8]}" for _ in range(6)]
+
+    def run(budget_id):
+        with db_module.SessionLocal() as db:
+            return budget_parser.import_complex_budget(db, data, "b.csv", budget_id, chunk_size=1)
+
+    with ThreadPoolExecutor(max_workers=6) as ex:
+        results = list(ex.map(run, budget_ids))
+    assert all(r["status"] and r["inserted"] == 4 for r in results)
+    with db_module.SessionLocal() as db:
+        assert db.query(BudgetItem).filter(BudgetItem.budget_id.in_(budget_ids)).count() == 24
+
+
+def _acquired_within(q, timeout: float) -> bool:
+    """在另一個執行緒嘗試取得佇列；timeout 內取得回傳 True。"""
+    got = threading.Event()
+
+    def worker():
+        with q.acquire():
+            got.set()
+
+    threading.Thread(target=worker, daemon=True).start()
+    return got.wait(timeout)
+
+
+def test_queue_writes_holds_queue_only_during_write_transaction(db_session):
+    q = write_queue_for(db_session.get_bind())
+    budget_id = f"W-{uuid.uuid4().hex[:8]}"
+    with queue_writes(db_session):
+        # 寫入前（解析階段）不佔佇列
+        db_session.query(BudgetItem).filter_by(budget_id=budget_id).count()
+        assert _acquired_within(q, 1.0)
+
+        db_session.add(BudgetItem(budget_id=budget_id, name="a", type="material"))
+        db_session.flush()
+        assert not _acquired_within(q, 0.2)  # 寫入交易進行中：其他寫入者排隊
+        db_session.commit()
+    assert _acquired_within(q, 1.0)
+
+
+def test_commit_blob_goes_through_write_queue(db_session, storage_root):
+    q = write_queue_for(db_session.get_bind())
+    before = q.stats()["writes"]
+    file_storage.save_file(uuid.uuid4().bytes, "a.bin", "misc", db=db_session)
+    assert q.stats()["writes"] == before + 1
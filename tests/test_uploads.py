@@ -0,0 +1,54 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.models import BudgetItem, ReferenceFile, SpecificationItem, StoredFile
+
+BUDGET_CSV = """項 次,項目及說明,單位,數量,單價,複價,編碼
+1,智慧影像攝影機,台,4,12000,48000,#A001
+2,光纜,M,300,50,15000,#B002
+"""
+
+
+def test_budget_complex_upload_is_spooled_and_parsed(db_session, storage_root):
+    budget_id = f"UP-{uuid.uuid4().hex[:8]}"
+    resp = TestClient(app).post(
+        "/budget_complex/import",
+        data={"budget_id": budget_id},
+        files={"file": ("budget.csv", BUDGET_CSV.encode("utf-8"), "text/csv")},
+    )
+    r = resp.json()
+    assert r["status"] is True and r["inserted"] == 2
+
+    sf = db_session.get(StoredFile, r["source_file_id"])
+    assert sf.stored_path.startswith(str(storage_root)) and sf.sha256
+    names = {b.name for b in db_session.query(BudgetItem).filter_by(budget_id=budget_id)}
+    assert names == {"智慧影像攝影機", "光纜"}
+
+
+def test_specs_upload_parses_from_stored_file(db_session, storage_root):
+    spec_id = f"SP-{uuid.uuid4().hex[:8]}"
+    text = "電纜: 需符合 CNS 標準\n交換器: 24 埠\n"
+    resp = TestClient(app).post(
+        "/specs/import",
+        data={"spec_id": spec_id},
+        files={"file": ("spec.txt", text.encode("utf-8"), "text/plain")},
+    )
+    r = resp.json()
+    assert r["status"] is True and r["source_file_id"]
+    items = db_session.query(SpecificationItem).filter_by(spec_id=spec_id).all()
+    assert sorted(i.item_name for i in items) == ["交換器", "電纜"]
+
+
+def test_reference_upload_stores_file(db_session, storage_root):
+    payload = uuid.uuid4().bytes * 64
+    resp = TestClient(app).post(
+        "/reference/upload",
+        data={"category": "cns"},
+        files={"file": ("ref.pdf", payload, "application/pdf")},
+    )
+    r = resp.json()
+    rf = db_session.get(ReferenceFile, r["reference_id"])
+    with open(db_session.get(StoredFile, rf.file_id).stored_path, "rb") as f:
+        assert f.read() == payload